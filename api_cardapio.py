@@ -9,24 +9,37 @@ VERSÃO 4.2 - Integração com Supabase
 - Atualização automática da tabela Printa com link público
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException, BackgroundTasks
-from fastapi.responses import FileResponse, JSONResponse
+from fastapi import FastAPI, File, UploadFile, HTTPException, Query
+from fastapi.responses import FileResponse, JSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.concurrency import run_in_threadpool
+from pydantic import BaseModel, Field
 from pathlib import Path
 import tempfile
 import shutil
 import uuid
 import logging
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
-import pythoncom
 import os
 import time
+import asyncio
+import hashlib
+import json
 from supabase import create_client, Client
 
 # Importar o módulo de build
 import build_cardapio_dinamico as builder
+from corel_pool import CorelPool
+from job_queue import JobQueue, QueueFull
+from job_store import JobStore, LeaseHeartbeat
+from job_events import JobEvents, WebhookDispatcher, TERMINAL_STAGES, format_sse
+from render_cache import RenderCache, render_key
+from template_cache import template_hash
+import macro_render
+import pdf_renderer
+import svg_preview
 
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
@@ -56,6 +69,9 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Respostas grandes (ex: /cardapio/listar) comprimidas quando o cliente aceita gzip
+app.add_middleware(GZipMiddleware, minimum_size=1024)
+
 # Diretórios
 BASE_DIR = Path(__file__).parent
 TEMPLATES_DIR = BASE_DIR / "templates"
@@ -65,8 +81,74 @@ TEMP_DIR = BASE_DIR / "temp"
 OUTPUT_DIR.mkdir(exist_ok=True)
 TEMP_DIR.mkdir(exist_ok=True)
 
-# Cache de jobs
-jobs_cache = {}
+def remove_job_files(job_id: str):
+    """Apaga a pasta de saída de um job (e a entrada em temp/ de versões antigas)"""
+    job_output = OUTPUT_DIR / job_id
+    if job_output.exists():
+        shutil.rmtree(job_output, ignore_errors=True)
+
+    temp_input = TEMP_DIR / f"{job_id}_input.txt"
+    if temp_input.exists():
+        temp_input.unlink()
+
+# Jobs persistentes (SQLite/WAL); finalizados expiram após o TTL
+JOBS_DB = Path(os.environ.get("CARDAPIO_JOBS_DB", str(BASE_DIR / "jobs.db")))
+JOB_TTL_DAYS = float(os.environ.get("CARDAPIO_JOB_TTL_DAYS", "7"))
+# Lease dos jobs em andamento: renovado por heartbeat; vencido = processo
+# dono morreu e outro worker pode assumir o job
+JOB_LEASE_SECONDS = float(os.environ.get("CARDAPIO_JOB_LEASE_SECONDS", "30"))
+job_store = JobStore(
+    JOBS_DB, ttl_seconds=JOB_TTL_DAYS * 24 * 3600, on_expired=remove_job_files,
+    lease_seconds=JOB_LEASE_SECONDS
+)
+
+# Pool de sessões CorelDRAW persistentes (aquecidas no startup)
+COREL_SESSIONS = int(os.environ.get("CARDAPIO_COREL_SESSIONS", "1"))
+COREL_MAX_JOBS = int(os.environ.get("CARDAPIO_COREL_MAX_JOBS", "0"))  # 0 = sem reciclagem
+corel_pool = CorelPool(
+    size=COREL_SESSIONS,
+    app_factory=lambda: builder.get_corel_app(visible=False),
+    max_jobs=COREL_MAX_JOBS or None
+)
+
+# Fila limitada de jobs, consumida por workers dedicados (um por sessão)
+RENDER_WORKERS = int(os.environ.get("CARDAPIO_WORKERS", str(COREL_SESSIONS)))
+QUEUE_SIZE = int(os.environ.get("CARDAPIO_QUEUE_SIZE", "20"))
+render_queue = JobQueue(maxsize=QUEUE_SIZE, workers=RENDER_WORKERS)
+
+# Push de progresso: SSE (/cardapio/eventos) e webhooks (callback_url)
+job_events = JobEvents()
+webhooks = WebhookDispatcher(
+    batch_window=float(os.environ.get("CARDAPIO_WEBHOOK_BATCH_SECONDS", "1.0")),
+    max_attempts=int(os.environ.get("CARDAPIO_WEBHOOK_ATTEMPTS", "5"))
+)
+
+# Cache de resultados: cardápio idêntico (mesmo texto parseado, fonte,
+# tamanho e template) reaproveita o PDF e a URL do Supabase do job anterior
+RENDER_CACHE_DIR = Path(os.environ.get("CARDAPIO_RENDER_CACHE_DIR", str(BASE_DIR / "render_cache")))
+RENDER_CACHE_MB = float(os.environ.get("CARDAPIO_RENDER_CACHE_MB", "1024"))
+render_cache = RenderCache(RENDER_CACHE_DIR, max_bytes=int(RENDER_CACHE_MB * 1024 * 1024))
+
+@app.on_event("startup")
+def start_corel_pool():
+    """Aquece as sessões CorelDRAW antes do primeiro job"""
+    logger.info(f"🔥 Aquecendo {COREL_SESSIONS} sessão(ões) CorelDRAW...")
+    corel_pool.start()
+    # Índice das fontes instaladas agora, não no primeiro render/preview
+    builder.font_metrics.build_index()
+    render_queue.start()
+    webhooks.start()
+    job_store.purge_expired()
+    requeue_unfinished_jobs()
+    lease_heartbeat.start()
+
+@app.on_event("shutdown")
+def stop_corel_pool():
+    """Fecha as instâncias CorelDRAW do pool"""
+    lease_heartbeat.shutdown(timeout=5)
+    render_queue.shutdown(timeout=30)
+    corel_pool.shutdown(timeout=30)
+    webhooks.shutdown(timeout=30)
 
 class JobStatus(BaseModel):
     job_id: str
@@ -77,15 +159,54 @@ class JobStatus(BaseModel):
     created_at: str
     completed_at: Optional[str] = None
 
+# Tamanho da fonte pedido (pt): positivo e com teto, para o ajuste de
+# tamanho e a composição das colunas nunca receberem 0 ou negativo
+FONT_SIZE_MAX_PT = 72.0
+
 class CardapioConfig(BaseModel):
     font: str = "Arial"
-    font_size: float = 10.0
+    font_size: float = Field(10.0, gt=0, le=FONT_SIZE_MAX_PT)
+    render_mode: str = "com"  # "com" (chamadas finas) ou "macro" (1 RunMacro)
+    renderer: str = "corel"   # "corel" (CDR + PDF) ou "pdf" (PDF nativo, sem CorelDRAW)
+    text_flow: str = "columns"  # "columns" (colunas divididas aqui) ou "linked" (caixas vinculadas)
+    callback_url: Optional[str] = None  # webhook de conclusão/falha
 
 class FormatRequest(BaseModel):
     id: str
     text: str
     font: str = "Arial"
-    font_size: float = 10.0
+    font_size: float = Field(10.0, gt=0, le=FONT_SIZE_MAX_PT)
+    render_mode: str = "com"
+    renderer: str = "corel"
+    text_flow: str = "columns"
+    callback_url: Optional[str] = None
+
+class BatchItem(BaseModel):
+    id: Optional[str] = None  # job_id do item (padrão: {batch_id}-{n})
+    text: str
+
+class BatchRequest(BaseModel):
+    items: List[BatchItem]
+    font: str = "Arial"
+    font_size: float = Field(10.0, gt=0, le=FONT_SIZE_MAX_PT)
+    render_mode: str = "com"
+    renderer: str = "corel"
+    text_flow: str = "columns"
+    callback_url: Optional[str] = None
+
+class PreviewRequest(BaseModel):
+    text: str
+    font: str = "Arial"
+    font_size: float = Field(10.0, gt=0, le=FONT_SIZE_MAX_PT)
+    svg: bool = True
+
+RENDER_MODES = ("com", "macro")
+RENDERERS = ("corel", "pdf")
+TEXT_FLOWS = ("columns", "linked")
+
+def validate_callback_url(callback_url: Optional[str]):
+    if callback_url and not callback_url.startswith(("http://", "https://")):
+        raise HTTPException(status_code=400, detail="callback_url deve começar com http:// ou https://")
 
 @app.get("/")
 async def root():
@@ -106,7 +227,12 @@ async def root():
             "ping": "/ping (GET)",
             "upload": "/cardapio/gerar (POST)",
             "formatar": "/cardapio/formatar (POST) - Aceita texto direto + Integração Supabase",
+            "preview": "/cardapio/preview (POST) - Layout JSON + SVG, síncrono, sem CorelDRAW",
+            "lote": "/cardapio/lote (POST) - Vários cardápios em uma sessão CorelDRAW",
+            "lote_status": "/cardapio/lote/{batch_id} (GET)",
+            "relatorio": "/cardapio/relatorio (POST) - Um cardápio por restaurante de um relatório",
             "status": "/cardapio/status/{job_id} (GET)",
+            "eventos": "/cardapio/eventos/{job_id} (GET) - Stream SSE das etapas do job",
             "download": "/cardapio/download/{job_id}/{file_type} (GET)",
             "listar": "/cardapio/listar (GET)",
             "limpar": "/cardapio/limpar/{job_id} (DELETE)"
@@ -116,26 +242,19 @@ async def root():
 @app.get("/health")
 async def health_check():
     """Verificar saúde da API (teste completo)"""
-    try:
-        pythoncom.CoInitialize()
-        try:
-            corel = builder.get_corel_app(visible=False)
-            corel_status = "available"
-            try:
-                corel.Quit()
-            except:
-                pass
-        except Exception as e:
-            corel_status = f"unavailable: {str(e)}"
-        finally:
-            pythoncom.CoUninitialize()
-    except Exception as e:
-        corel_status = f"error: {str(e)}"
+    # Não abrir/fechar o CorelDRAW aqui: isso derrubaria as sessões do pool
+    pool_status = corel_pool.status()
+    ready = sum(1 for sess in pool_status["sessions"] if sess["corel_ready"])
+    corel_status = "available" if ready else "unavailable"
 
     return {
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "corel_draw": corel_status,
+        "corel_pool": pool_status,
+        "queue": render_queue.status(),
+        "webhooks": webhooks.status(),
+        "render_cache": render_cache.status(),
         "templates": {
             "tplA": (TEMPLATES_DIR / "tplA.cdr").exists(),
             "tplB": (TEMPLATES_DIR / "tplB.cdr").exists(),
@@ -234,9 +353,11 @@ def update_printa_table(job_id: str, public_url: str) -> bool:
         logger.error(f"[{job_id}] ❌ Erro ao atualizar tabela Printa: {e}", exc_info=True)
         return False
 
-def apply_proper_formatting(doc, shape, font_name="Arial", font_size_pt=10.0):
+def apply_proper_formatting(doc, shape, font_name="Arial", font_size_pt=10.0, spans=None):
     """
     Aplica formatação simplificada usando apenas propriedades que funcionam
+
+    spans: spans de categoria vindos de builder.compose_text_block
     """
     try:
         # Obter o texto story
@@ -268,30 +389,15 @@ def apply_proper_formatting(doc, shape, font_name="Arial", font_size_pt=10.0):
         # Solução: O texto já vem formatado com pontos (.) para alinhar preços
         logger.info("   ℹ️ Usando pontos de preenchimento para alinhar preços (TabStops não disponível)")
             
-        # Aplicar negrito apenas nas categorias (linhas em MAIÚSCULO)
+        # Aplicar negrito/tamanho nas categorias a partir dos spans
+        # pré-calculados (sem ler Story.Text de volta via COM)
         try:
-            text_content = text_range.Text
-            lines = text_content.split('\r\n')
-            char_pos = 0
-            
-            for line in lines:
-                # Verificar se é uma categoria (tudo maiúsculo, sem R$)
-                if line and line.isupper() and 'R$' not in line:
-                    # É uma categoria - aplicar negrito
-                    start = char_pos + 1  # CorelDRAW usa índice 1-based
-                    end = start + len(line) - 1
-                    
-                    try:
-                        text_range.Characters.Range(start, end).Bold = True
-                        text_range.Characters.Range(start, end).Size = float(font_size_pt + 1)
-                    except:
-                        pass
-                
-                char_pos += len(line) + 2  # +2 para \r\n
-                
+            if spans is None:
+                spans = builder.spans_from_text(text_range.Text)
+            builder.apply_spans(text_range, spans, font_size_pt)
         except Exception as e:
             logger.debug(f"   Negrito não aplicado: {e}")
-        
+
         # Configurar espaçamento de linha se possível
         try:
             text_range.LineSpacing = 1.2  # 120% do tamanho da fonte
@@ -301,316 +407,628 @@ def apply_proper_formatting(doc, shape, font_name="Arial", font_size_pt=10.0):
     except Exception as e:
         logger.warning(f"   ⚠️ Erro geral na formatação: {e}")
 
-def process_cardapio(job_id: str, input_path: Path, config: CardapioConfig):
+def render_with_corel(session, job_id: str, data: dict, config: CardapioConfig, tpl: str, job_output: Path):
     """
-    Processar cardápio com formatação correta e salvamento robusto
+    Renderiza o cardápio em uma sessão CorelDRAW do pool
+
+    Roda na thread STA da sessão (via session.call), então todos os objetos
+    COM criados aqui morrem aqui. O CorelDRAW NÃO é fechado ao final: apenas
+    o documento do job, para que o próximo job reaproveite a instância
+    aquecida e os templates já carregados.
+
+    Returns:
+        (files_saved, cdr_saved, out_cdr_temp)
     """
-    
-    # Inicializar COM na thread de background
-    try:
-        pythoncom.CoInitialize()
-    except Exception as e:
-        logger.error(f"[{job_id}] Erro ao inicializar COM: {e}")
-        jobs_cache[job_id].update({
-            "status": "failed",
-            "message": f"Erro ao inicializar COM: {str(e)}",
-            "completed_at": datetime.now().isoformat()
-        })
-        return
-    
-    corel = None
+    corel = session.app
     doc = None
-    
-    try:
-        logger.info(f"[{job_id}] Iniciando processamento...")
-        jobs_cache[job_id]["status"] = "processing"
-        
-        # Diretório de saída
-        job_output = OUTPUT_DIR / job_id
-        job_output.mkdir(exist_ok=True)
-        
-        # Templates
-        tpl_a = TEMPLATES_DIR / "tplA.cdr"
-        tpl_b = TEMPLATES_DIR / "tplB.cdr"
-        
-        if not tpl_a.exists() or not tpl_b.exists():
-            raise FileNotFoundError("Templates CDR não encontrados.")
-        
-        # Parse do arquivo
-        logger.info(f"[{job_id}] Fazendo parse do arquivo...")
-        data = builder.parse_txt(input_path)
 
-        # NÃO gerar arquivos de auditoria (JSON, CSV) - desabilitado
-        # builder.write_auditoria(job_output, data)
-        
-        # Inicializar CorelDRAW
-        logger.info(f"[{job_id}] Inicializando CorelDRAW...")
-        corel = builder.get_corel_app(visible=False)
-        
-        # Abrir template
-        tpl = str(tpl_a if data["model"] == "A" else tpl_b)
+    try:
         logger.info(f"[{job_id}] Abrindo template {data['model']} ({data['total_items']} itens)...")
-        
-        doc = corel.OpenDocument(os.path.abspath(tpl))
-        
-        # Aguardar documento carregar
-        time.sleep(0.5)
-        
+        # Documento novo a partir do template pristino em cache na sessão
+        # (sem reabrir o .cdr do disco nem varrer shapes a cada job)
+        doc = session.templates.checkout(corel, tpl)
+        # Geometria pré-computada (sidecar JSON): frames e título sem COM
+        meta = session.templates.metadata(tpl)
+
         page = doc.ActivePage
-        layer = page.ActiveLayer
-        
-        # Limpar TODOS os textos existentes do template
-        logger.info(f"[{job_id}] Limpando textos do template...")
-        texts_removed = 0
-        try:
-            shapes = page.Shapes
-            total_shapes = shapes.Count
-            logger.info(f"[{job_id}] Template tem {total_shapes} shapes")
 
-            for i in range(shapes.Count, 0, -1):
-                try:
-                    s = shapes.Item(i)
-                    # Tipos de texto: 6 = cdrTextShape (genérico)
-                    # Tentar remover qualquer coisa que pareça texto
-                    if s.Type == 6:  # cdrTextShape
-                        s.Delete()
-                        texts_removed += 1
-                except Exception as e:
-                    logger.debug(f"[{job_id}] Não foi possível remover shape {i}: {e}")
-                    pass
-
-            logger.info(f"[{job_id}] ✅ {texts_removed} textos removidos do template")
-        except Exception as e:
-            logger.warning(f"[{job_id}] Aviso ao limpar template: {e}")
-        
-        # Criar título do restaurante
-        logger.info(f"[{job_id}] Criando título: {data['restaurant']}")
-        try:
-            pw = float(page.SizeWidth)
-            ph = float(page.SizeHeight)
-            title_x = pw / 2.0
-            title_y = ph - 1.0
-            
-            title_shape = layer.CreateArtisticText(0.0, title_y, data["restaurant"])
-            title_shape.Text.Story.Font = config.font
-            title_shape.Text.Story.Size = 24
-            title_shape.Text.Story.Bold = True
-            
-            # Centralizar título
-            try:
-                text_width = float(title_shape.SizeWidth)
-                title_shape.LeftX = title_x - (text_width / 2.0)
-            except:
-                pass
-                
-        except Exception as e:
-            logger.warning(f"[{job_id}] Erro ao criar título: {e}")
-        
-        # Criar conteúdo do cardápio
-        logger.info(f"[{job_id}] Criando conteúdo do cardápio...")
-        frames = builder.ensure_area_frames(page, doc, data["model"])
+        # Layout em Python puro: frames, texto e spans de cada coluna
+        logger.info(f"[{job_id}] 📝 Gerando texto (com debug)...")
+        frames = builder.ensure_area_frames(page, doc, data["model"], metadata=meta)
+        columns = builder.compose_columns(
+            data["categories"], frames, config.font_size, debug=True, font_name=config.font,
+            linked=uses_linked_frames(config)
+        )
+        for i, col in enumerate(columns, 1):
+            left, bottom, right, top = col["frame"]
+            logger.info(f"[{job_id}] 📏 Coluna {i} (página {col['page']}): {abs(right - left):.2f} unidades = {col['width_pt']:.1f}pt")
+        n_pages = max(col["page"] for col in columns)
+        if n_pages > 1:
+            logger.info(f"[{job_id}] 📑 {n_pages} páginas")
+
+        title_x, title_y = builder.title_position(page, meta)
 
         shapes_before = page.Shapes.Count
         logger.info(f"[{job_id}] Shapes antes de criar conteúdo: {shapes_before}")
 
-        if data["model"] == "A":
-            # Modelo A: 1 coluna
-            logger.info(f"[{job_id}] Criando 1 caixa de texto (Modelo A)")
-            left, bottom, right, top = frames[0]
-            frame_width = abs(right - left)
-
-            # Calcular largura em caracteres
-            target_width = builder.calculate_char_width_for_frame(frame_width, config.font_size)
-            logger.info(f"[{job_id}] 📏 Largura da caixa: {frame_width:.2f} unidades = ~{target_width} caracteres")
-
-            seq = builder.flatten_with_headers(data["categories"])
-            logger.info(f"[{job_id}] 📝 Gerando texto (com debug)...")
-            text_block = builder.compose_text_block(seq, use_dots=True, target_width=target_width, debug=True)
+        rendered = False
+        if config.render_mode == "macro":
+            # Layout inteiro em uma única chamada GMSManager.RunMacro
+            logger.info(f"[{job_id}] 📦 Renderizando via macro...")
+            payload = macro_render.build_render_payload(
+                data["restaurant"], title_x, title_y, columns,
+                font_name=config.font, font_size_pt=config.font_size
+            )
+            try:
+                macro_render.run_render_macro(corel, payload)
+                rendered = True
+            except Exception as e:
+                if page.Shapes.Count != shapes_before or doc.Pages.Count != 1:
+                    raise
+                logger.warning(f"[{job_id}] ⚠️ Macro indisponível ({e}), usando chamadas COM")
 
-            shp = builder.create_paragraph_text(layer, left, bottom, right, top)
+        if not rendered:
+            # Páginas extras (cópias do template) antes de qualquer texto
+            pages = builder.add_pages(doc, n_pages)
 
-            # Preencher texto primeiro
-            builder.fill_paragraph(shp, text_block)
+            # Criar título do restaurante (em todas as páginas)
+            logger.info(f"[{job_id}] Criando título: {data['restaurant']}")
+            try:
+                for p in pages:
+                    builder.create_title(p.ActiveLayer, data["restaurant"], title_x, title_y, font_name=config.font)
+            except Exception as e:
+                logger.warning(f"[{job_id}] Erro ao criar título: {e}")
+
+            # Criar conteúdo do cardápio
+            logger.info(f"[{job_id}] Criando {len(columns)} caixa(s) de texto (Modelo {data['model']})")
+            for i, col in enumerate(columns, 1):
+                logger.info(f"[{job_id}] Criando coluna {i}...")
+                layer = pages[col["page"] - 1].ActiveLayer
+                shp = builder.create_paragraph_text(layer, *col["frame"], name=builder.column_shape_name(i))
+
+                if col["linked"]:
+                    # Continuação da caixa anterior: o CorelDRAW faz o fluxo
+                    builder.link_text_frame(prev, shp)
+                else:
+                    # Preencher texto primeiro
+                    builder.fill_paragraph(shp, col["text"])
 
-            # Aplicar formatação correta (sem justificar)
-            apply_proper_formatting(doc, shp, font_name=config.font, font_size_pt=config.font_size)
+                    # Aplicar formatação correta (sem justificar)
+                    apply_proper_formatting(doc, shp, font_name=config.font, font_size_pt=config.font_size, spans=col["spans"])
+                prev = shp
 
-        else:
-            # Modelo B: 2 colunas
-            logger.info(f"[{job_id}] Criando 2 caixas de texto (Modelo B)")
-            col1, col2 = builder.split_two_columns_preserving_order(data["categories"])
-
-            frame1, frame2 = frames
-            left1, bottom1, right1, top1 = frame1
-            left2, bottom2, right2, top2 = frame2
-
-            # Calcular largura para cada coluna
-            frame_width1 = abs(right1 - left1)
-            frame_width2 = abs(right2 - left2)
-            target_width1 = builder.calculate_char_width_for_frame(frame_width1, config.font_size)
-            target_width2 = builder.calculate_char_width_for_frame(frame_width2, config.font_size)
-
-            logger.info(f"[{job_id}] 📏 Coluna 1: {frame_width1:.2f} unidades = ~{target_width1} caracteres")
-            logger.info(f"[{job_id}] 📏 Coluna 2: {frame_width2:.2f} unidades = ~{target_width2} caracteres")
-
-            logger.info(f"[{job_id}] 📝 Gerando texto coluna 1 (com debug)...")
-            tb1 = builder.compose_text_block(col1, use_dots=True, target_width=target_width1, debug=True)
-            logger.info(f"[{job_id}] 📝 Gerando texto coluna 2 (com debug)...")
-            tb2 = builder.compose_text_block(col2, use_dots=True, target_width=target_width2, debug=True)
-
-            # Coluna 1
-            logger.info(f"[{job_id}] Criando coluna 1...")
-            shp1 = builder.create_paragraph_text(layer, left1, bottom1, right1, top1)
-            builder.fill_paragraph(shp1, tb1)
-            apply_proper_formatting(doc, shp1, font_name=config.font, font_size_pt=config.font_size)
-
-            # Coluna 2
-            logger.info(f"[{job_id}] Criando coluna 2...")
-            shp2 = builder.create_paragraph_text(layer, left2, bottom2, right2, top2)
-            builder.fill_paragraph(shp2, tb2)
-            apply_proper_formatting(doc, shp2, font_name=config.font, font_size_pt=config.font_size)
-
-        shapes_after = page.Shapes.Count
+        # Páginas novas: shapes copiadas do template entram na conta
+        shapes_after = sum(doc.Pages.Item(i).Shapes.Count for i in range(1, doc.Pages.Count + 1))
         shapes_created = shapes_after - shapes_before
         logger.info(f"[{job_id}] Shapes depois de criar conteúdo: {shapes_after}")
         logger.info(f"[{job_id}] ✅ {shapes_created} shapes criadas")
-        
-        # SALVAR ARQUIVOS
-        logger.info(f"[{job_id}] Salvando arquivos...")
-        out_cdr_temp = TEMP_DIR / f"cardapio_{job_id}.cdr"  # CDR temporário para upload
-        out_pdf = job_output / "cardapio.pdf"
 
-        files_saved = {}
+        return export_corel_document(doc, job_id, tpl, job_output)
 
-        # Salvar CDR TEMPORARIAMENTE (só para upload no Supabase)
-        cdr_saved = False
+    finally:
+        if doc:
+            try:
+                doc.Close()
+                logger.info(f"[{job_id}] Documento fechado")
+            except Exception as e:
+                logger.debug(f"[{job_id}] Aviso ao fechar documento: {e}")
 
-        # Método 1: Export como CDR (mais confiável que SaveAs)
-        try:
-            cdr_path_str = os.path.abspath(str(out_cdr_temp))
-            logger.info(f"[{job_id}] Tentando exportar CDR temporário para: {cdr_path_str}")
+def export_corel_document(doc, job_id: str, tpl: str, job_output: Path):
+    """
+    Exporta o documento do job: CDR temporário (para o Supabase) + PDF
 
-            # cdrCDR = 48 (formato CDR)
-            # cdrNormalSave = 0
-            doc.Export(cdr_path_str, 48, 0)
-            cdr_saved = True
-            logger.info(f"[{job_id}] ✅ CDR exportado temporariamente")
-        except Exception as e1:
-            logger.warning(f"[{job_id}] Export CDR falhou: {e1}")
+    Returns:
+        (files_saved, cdr_saved, out_cdr_temp)
+    """
+    # SALVAR ARQUIVOS
+    logger.info(f"[{job_id}] Salvando arquivos...")
+    job_events.publish(job_id, "exporting", "Exportando CDR/PDF")
+    out_cdr_temp = TEMP_DIR / f"cardapio_{job_id}.cdr"  # CDR temporário para upload
+    out_pdf = job_output / "cardapio.pdf"
 
-            # Método 2: Tentar apenas salvar o documento (Save sem nome = salva no local atual)
-            try:
-                logger.info(f"[{job_id}] Tentando doc.Save()...")
-                doc.Save()
-                time.sleep(0.5)
-
-                # Procurar arquivo salvo nos templates
-                possible_saved = Path(tpl).with_name(f"cardapio_{job_id}.cdr")
-                if possible_saved.exists():
-                    shutil.copy2(possible_saved, out_cdr_temp)
-                    possible_saved.unlink()
-                    cdr_saved = True
-                    logger.info(f"[{job_id}] ✅ CDR salvo via doc.Save() e movido")
-            except Exception as e2:
-                logger.warning(f"[{job_id}] doc.Save() falhou: {e2}")
-
-        # Se não salvou CDR, copiar template como fallback
-        if not cdr_saved:
-            try:
-                shutil.copy2(tpl, out_cdr_temp)
-                logger.warning(f"[{job_id}] ⚠️ CDR: template copiado (edições podem não estar salvas)")
+    files_saved = {}
+
+    # Salvar CDR TEMPORARIAMENTE (só para upload no Supabase)
+    cdr_saved = False
+
+    # Método 1: Export como CDR (mais confiável que SaveAs)
+    try:
+        cdr_path_str = os.path.abspath(str(out_cdr_temp))
+        logger.info(f"[{job_id}] Tentando exportar CDR temporário para: {cdr_path_str}")
+
+        # cdrCDR = 48 (formato CDR)
+        # cdrNormalSave = 0
+        doc.Export(cdr_path_str, 48, 0)
+        cdr_saved = True
+        logger.info(f"[{job_id}] ✅ CDR exportado temporariamente")
+    except Exception as e1:
+        logger.warning(f"[{job_id}] Export CDR falhou: {e1}")
+
+        # Método 2: Tentar apenas salvar o documento (Save sem nome = salva no local atual)
+        try:
+            logger.info(f"[{job_id}] Tentando doc.Save()...")
+            doc.Save()
+            time.sleep(0.5)
+
+            # Procurar arquivo salvo nos templates
+            possible_saved = Path(tpl).with_name(f"cardapio_{job_id}.cdr")
+            if possible_saved.exists():
+                shutil.copy2(possible_saved, out_cdr_temp)
+                possible_saved.unlink()
                 cdr_saved = True
-            except Exception as e3:
-                logger.error(f"[{job_id}] Falha ao copiar template: {e3}")
-        
-        # Exportar PDF
-        pdf_saved = False
+                logger.info(f"[{job_id}] ✅ CDR salvo via doc.Save() e movido")
+        except Exception as e2:
+            logger.warning(f"[{job_id}] doc.Save() falhou: {e2}")
+
+    # Se não salvou CDR, copiar template como fallback
+    if not cdr_saved:
         try:
-            pdf_path = str(out_pdf.absolute()).replace('/', '\\')
-            doc.PublishToPDF(pdf_path)
-            pdf_saved = True
-            logger.info(f"[{job_id}] ✅ PDF exportado com sucesso")
-        except Exception as e:
-            logger.warning(f"[{job_id}] ⚠️ Erro ao gerar PDF: {e}")
+            shutil.copy2(tpl, out_cdr_temp)
+            logger.warning(f"[{job_id}] ⚠️ CDR: template copiado (edições podem não estar salvas)")
+            cdr_saved = True
+        except Exception as e3:
+            logger.error(f"[{job_id}] Falha ao copiar template: {e3}")
 
-        if pdf_saved:
-            files_saved["pdf"] = out_pdf.name
+    # Exportar PDF
+    pdf_saved = False
+    try:
+        pdf_path = str(out_pdf.absolute()).replace('/', '\\')
+        doc.PublishToPDF(pdf_path)
+        pdf_saved = True
+        logger.info(f"[{job_id}] ✅ PDF exportado com sucesso")
+    except Exception as e:
+        logger.warning(f"[{job_id}] ⚠️ Erro ao gerar PDF: {e}")
 
-        # Upload do CDR para Supabase e atualização da tabela Printa
-        public_url = None
-        if cdr_saved and out_cdr_temp.exists():
-            logger.info(f"[{job_id}] 🚀 Iniciando integração com Supabase...")
+    if pdf_saved:
+        files_saved["pdf"] = out_pdf.name
 
-            # Upload do arquivo CDR temporário
-            public_url = upload_cdr_to_supabase(out_cdr_temp, job_id)
+    return files_saved, cdr_saved, out_cdr_temp
 
-            # Deletar CDR temporário após upload
-            try:
-                out_cdr_temp.unlink()
-                logger.info(f"[{job_id}] 🗑️ CDR temporário removido")
-            except Exception as e:
-                logger.warning(f"[{job_id}] Não foi possível remover CDR temporário: {e}")
+def patch_with_corel(session, job_id: str, old_data: dict, data: dict, config: CardapioConfig,
+                     tpl: str, base_cdr: Path, job_output: Path):
+    """
+    Reprocessamento só de preços: abre o CDR da versão anterior e reescreve
+    apenas as linhas que mudaram, em vez de refazer o documento do template
 
-            if public_url:
-                # Atualizar tabela Printa
-                update_success = update_printa_table(job_id, public_url)
+    Roda na thread STA da sessão, como render_with_corel.
 
-                if update_success:
-                    files_saved["supabase_url"] = public_url
-                    logger.info(f"[{job_id}] ✅ Integração Supabase completa!")
-                else:
-                    logger.warning(f"[{job_id}] ⚠️ Upload feito, mas falha ao atualizar tabela")
-            else:
-                logger.warning(f"[{job_id}] ⚠️ Falha no upload para Supabase")
-
-        # Atualizar status
-        jobs_cache[job_id].update({
-            "status": "completed",
-            "message": f"Cardápio processado com sucesso!",
-            "completed_at": datetime.now().isoformat(),
-            "files": files_saved,
-            "supabase_url": public_url  # Adicionar URL pública do Supabase
-        })
+    Returns:
+        (files_saved, cdr_saved, out_cdr_temp), ou None se o texto novo não
+        couber nas mesmas posições (o chamador renderiza do zero)
+    """
+    corel = session.app
+    doc = None
+    # Cópia de trabalho: o arquivo do cache não é aberto nem alterado
+    work_cdr = TEMP_DIR / f"{job_id}_base.cdr"
+    shutil.copy2(base_cdr, work_cdr)
+
+    try:
+        meta = session.templates.metadata(tpl)
+        doc = corel.OpenDocument(os.path.abspath(str(work_cdr)))
+        page = doc.ActivePage
+
+        # Mesmos frames da renderização completa -> mesmo texto por coluna
+        frames = builder.ensure_area_frames(page, doc, data["model"], metadata=meta)
+        linked = uses_linked_frames(config)
+        old_columns = builder.compose_columns(
+            old_data["categories"], frames, config.font_size, font_name=config.font, linked=linked
+        )
+        new_columns = builder.compose_columns(
+            data["categories"], frames, config.font_size, font_name=config.font, linked=linked
+        )
+        patches = builder.price_patches(old_columns, new_columns)
+        if patches is None:
+            logger.info(f"[{job_id}] Linhas mudaram de tamanho, renderização completa")
+            return None
+
+        changed = 0
+        for i, ranges in enumerate(patches, 1):
+            if not ranges:
+                continue
+            shape = doc.Pages.Item(new_columns[i - 1]["page"]).Shapes.FindShape(builder.column_shape_name(i))
+            if shape is None:
+                raise RuntimeError(f"Caixa {builder.column_shape_name(i)} não encontrada no CDR anterior")
+            story = shape.Text.Story
+            # Do fim para o começo: cada troca não mexe nas posições anteriores
+            for start, end, text in reversed(ranges):
+                story.Characters.Range(start, end).Text = text
+                changed += text.count("\r\n") + 1
+        logger.info(f"[{job_id}] ✏️ {changed} linha(s) de preço atualizada(s) no CDR anterior")
+
+        return export_corel_document(doc, job_id, tpl, job_output)
 
-        logger.info(f"[{job_id}] ✅ Processamento concluído!")
-        logger.info(f"[{job_id}] Arquivos gerados: {', '.join(files_saved.keys())}")
-        
-    except Exception as e:
-        logger.error(f"[{job_id}] Erro geral: {str(e)}", exc_info=True)
-        jobs_cache[job_id].update({
-            "status": "failed",
-            "message": f"Erro no processamento: {str(e)}",
-            "completed_at": datetime.now().isoformat()
-        })
-    
     finally:
-        # Limpeza
         if doc:
             try:
                 doc.Close()
                 logger.info(f"[{job_id}] Documento fechado")
             except Exception as e:
                 logger.debug(f"[{job_id}] Aviso ao fechar documento: {e}")
-        
-        if corel:
+        try:
+            work_cdr.unlink()
+        except OSError:
+            pass
+
+def finish_job(job_id: str, config: CardapioConfig, status: str, message: str, **fields):
+    """
+    Grava o resultado do job e avisa quem acompanha (SSE + webhook)
+    """
+    job_store.update(
+        job_id,
+        status=status,
+        message=message,
+        completed_at=datetime.now().isoformat(),
+        **fields
+    )
+    stage = "done" if status == "completed" else "failed"
+    event = job_events.publish(job_id, stage, message, status=status, **fields)
+
+    if config.callback_url:
+        webhooks.enqueue(config.callback_url, event)
+        logger.info(f"[{job_id}] 🔔 Webhook agendado para {config.callback_url}")
+
+def current_template_hash(model: str) -> Optional[str]:
+    tpl = TEMPLATES_DIR / ("tplA.cdr" if model == "A" else "tplB.cdr")
+    try:
+        return template_hash(tpl)
+    except OSError:
+        return None
+
+def uses_linked_frames(config: CardapioConfig) -> bool:
+    """Caixas vinculadas (text_flow "linked"): só no CorelDRAW; o PDF nativo divide as colunas"""
+    return config.renderer == "corel" and config.text_flow == "linked"
+
+def render_cache_key(data: dict, config: CardapioConfig) -> str:
+    """Chave do cache de resultados (render_mode não muda o resultado)"""
+    return render_key(data, config.font, config.font_size, config.renderer,
+                      current_template_hash(data["model"]), linked=uses_linked_frames(config))
+
+# Última versão renderizada de cada job (base do reprocessamento só de preços)
+RENDER_STATE_FILE = "render_state.json"
+
+def save_render_state(job_id: str, data: dict, config: CardapioConfig):
+    """Guarda o cardápio renderizado (CorelDRAW) na pasta de saída do job"""
+    if config.renderer == "pdf":
+        return
+    state = {
+        "cache_key": render_cache_key(data, config),
+        "font": config.font,
+        "font_size": config.font_size,
+        "linked": uses_linked_frames(config),
+        "template": current_template_hash(data["model"]),
+        "data": data,
+    }
+    try:
+        (OUTPUT_DIR / job_id / RENDER_STATE_FILE).write_text(
+            json.dumps(state, ensure_ascii=False), encoding="utf-8"
+        )
+    except OSError as e:
+        logger.warning(f"[{job_id}] ⚠️ Não foi possível salvar o estado da renderização: {e}")
+
+def incremental_base(job_id: str, data: dict, config: CardapioConfig):
+    """
+    Versão anterior do mesmo job que serve de base para atualizar só preços
+
+    Vale quando o cardápio anterior tem a mesma estrutura (título, modelo,
+    categorias e nomes), a mesma fonte/tamanho, o mesmo tipo de caixa
+    (vinculadas ou não) e o mesmo template, e o CDR
+    dele ainda está no cache de resultados.
+
+    Returns:
+        (dados anteriores, Path do CDR anterior) ou None
+    """
+    if config.renderer == "pdf":
+        return None
+    try:
+        state = json.loads((OUTPUT_DIR / job_id / RENDER_STATE_FILE).read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+
+    if (state["font"], state["font_size"]) != (config.font, config.font_size):
+        return None
+    if state.get("linked", False) != uses_linked_frames(config):
+        return None
+    if state["template"] is None or state["template"] != current_template_hash(data["model"]):
+        return None
+    if builder.menu_structure(state["data"]) != builder.menu_structure(data):
+        return None
+
+    base_cdr = render_cache.file(state["cache_key"], "cdr")
+    if base_cdr is None:
+        return None
+    return state["data"], base_cdr
+
+def serve_from_cache(job_id: str, data: dict, config: CardapioConfig) -> bool:
+    """
+    Finaliza o job com o resultado de um cardápio idêntico já renderizado
+
+    Copia o PDF guardado e envia o CDR guardado ao Supabase com o nome deste
+    job ({job_id}.cdr), sem CorelDRAW. A URL de outro job nunca é
+    reaproveitada: se aquele job for reprocessado com outro conteúdo, o
+    upsert dele trocaria o arquivo por baixo deste.
+
+    Returns:
+        True se o job foi finalizado pelo cache
+    """
+    if render_cache.max_bytes <= 0:
+        return False
+    entry = render_cache.get(render_cache_key(data, config))
+    if entry is None:
+        return False
+
+    cached_cdr = None
+    if config.renderer != "pdf":
+        if "cdr" not in entry["files"]:
+            return False
+        cached_cdr = entry["dir"] / entry["files"]["cdr"]
+
+    try:
+        files_saved = render_cache.restore(entry, OUTPUT_DIR / job_id, kinds=("pdf",))
+    except OSError as e:
+        logger.warning(f"[{job_id}] ⚠️ Falha ao copiar resultado do cache, renderizando: {e}")
+        return False
+
+    public_url = None
+    if cached_cdr is not None:
+        job_events.publish(job_id, "uploading", "Enviando CDR para o Supabase")
+        public_url = upload_cdr_to_supabase(cached_cdr, job_id)
+        if public_url:
+            if update_printa_table(job_id, public_url):
+                files_saved["supabase_url"] = public_url
+            else:
+                logger.warning(f"[{job_id}] ⚠️ Upload feito, mas falha ao atualizar tabela")
+        else:
+            logger.warning(f"[{job_id}] ⚠️ Falha no upload para Supabase")
+
+    logger.info(f"[{job_id}] ♻️ Cardápio idêntico já renderizado: resultado reaproveitado do cache")
+    save_render_state(job_id, data, config)
+    finish_job(
+        job_id, config, "completed", "Cardápio processado com sucesso! (cache)",
+        files=files_saved,
+        supabase_url=public_url
+    )
+    return True
+
+def store_in_cache(job_id: str, data: dict, config: CardapioConfig, files_saved: dict,
+                   out_cdr: Optional[Path], public_url: Optional[str]):
+    """Guarda o resultado completo do job no cache (falhas só geram aviso)"""
+    if render_cache.max_bytes <= 0 or "pdf" not in files_saved:
+        return
+    # Sem URL o resultado está incompleto (upload falhou): melhor renderizar de novo
+    if config.renderer != "pdf" and not public_url:
+        return
+
+    files = {"pdf": OUTPUT_DIR / job_id / files_saved["pdf"]}
+    if out_cdr is not None and out_cdr.exists():
+        files["cdr"] = out_cdr
+    try:
+        render_cache.put(render_cache_key(data, config), files, public_url)
+    except OSError as e:
+        logger.warning(f"[{job_id}] ⚠️ Não foi possível guardar o resultado no cache: {e}")
+
+def fit_menu(job_id: str, data: dict, config: CardapioConfig):
+    """
+    Escolhe modelo e tamanho da fonte para o cardápio caber nos frames
+
+    Roda offline (métricas de fonte + sidecar dos templates), antes do cache
+    e do CorelDRAW, que recebe um tamanho que já cabe. O font_size pedido é
+    o máximo.
+
+    Returns:
+        (data, config) ajustados (cópias)
+    """
+    layouts = builder.template_layouts(TEMPLATES_DIR / "tplA.cdr", TEMPLATES_DIR / "tplB.cdr")
+    model, size, pages, fits = builder.fit_layout(
+        data["categories"], layouts, config.font, config.font_size, linked=uses_linked_frames(config)
+    )
+    if not fits:
+        logger.warning(f"[{job_id}] ⚠️ Linhas mais largas que a coluna nem com fonte {size}pt: o texto vai transbordar")
+    elif (model, size, pages) != (data["model"], config.font_size, 1):
+        logger.info(f"[{job_id}] 📐 Ajustado para modelo {model}, fonte {size}pt, {pages} página(s)")
+    return dict(data, model=model), config.model_copy(update={"font_size": size})
+
+def render_job(job_id: str, data: dict, config: CardapioConfig, session=None):
+    """
+    Renderiza um cardápio já parseado e finaliza o job (upload + status)
+
+    Args:
+        session: Sessão CorelDRAW já emprestada do pool (renderer "corel");
+            o lote usa a mesma sessão para todos os itens
+
+    Raises:
+        Exception: qualquer falha; o chamador marca o job como failed
+    """
+    # Diretório de saída
+    job_output = OUTPUT_DIR / job_id
+    job_output.mkdir(exist_ok=True)
+
+    # Templates
+    tpl_a = TEMPLATES_DIR / "tplA.cdr"
+    tpl_b = TEMPLATES_DIR / "tplB.cdr"
+
+    # NÃO gerar arquivos de auditoria (JSON, CSV) - desabilitado
+    # builder.write_auditoria(job_output, data)
+
+    tpl = str(tpl_a if data["model"] == "A" else tpl_b)
+    message = "Cardápio processado com sucesso!"
+    job_events.publish(
+        job_id, "rendering", f"Renderizando modelo {data['model']}",
+        model=data["model"], total_items=data["total_items"], font_size=config.font_size
+    )
+
+    if config.renderer == "pdf":
+        # PDF nativo em Python: sem CorelDRAW (e portanto sem CDR/Supabase)
+        logger.info(f"[{job_id}] 📄 Gerando PDF nativo (sem CorelDRAW)...")
+        out_pdf = job_output / "cardapio.pdf"
+        pdf_renderer.render_menu_pdf(
+            data, out_pdf,
+            font_name=config.font,
+            font_size_pt=config.font_size,
+            metadata=builder.load_template_metadata(tpl)
+        )
+        files_saved, cdr_saved, out_cdr_temp = {"pdf": out_pdf.name}, False, None
+    else:
+        if not tpl_a.exists() or not tpl_b.exists():
+            raise FileNotFoundError("Templates CDR não encontrados.")
+
+        # Só os preços mudaram desde a última versão deste job: atualizar o
+        # CDR anterior em vez de refazer tudo a partir do template
+        result = None
+        base = incremental_base(job_id, data, config)
+        if base is not None:
+            old_data, base_cdr = base
             try:
-                corel.Quit()
-                logger.info(f"[{job_id}] CorelDRAW fechado")
+                result = session.call(
+                    patch_with_corel, job_id, old_data, data, config, tpl, base_cdr, job_output
+                )
             except Exception as e:
-                logger.debug(f"[{job_id}] Aviso ao fechar CorelDRAW: {e}")
-        
-        # Finalizar COM
+                logger.warning(f"[{job_id}] ⚠️ Atualização incremental falhou ({e}), renderizando do zero")
+            if result is not None:
+                message = "Cardápio processado com sucesso! (preços atualizados)"
+
+        if result is None:
+            # Renderizar na sessão CorelDRAW já aquecida
+            result = session.call(
+                render_with_corel, job_id, data, config, tpl, job_output
+            )
+        files_saved, cdr_saved, out_cdr_temp = result
+
+    # Upload do CDR para Supabase e atualização da tabela Printa
+    public_url = None
+    if cdr_saved and out_cdr_temp.exists():
+        logger.info(f"[{job_id}] 🚀 Iniciando integração com Supabase...")
+        job_events.publish(job_id, "uploading", "Enviando CDR para o Supabase")
+
+        # Upload do arquivo CDR temporário
+        public_url = upload_cdr_to_supabase(out_cdr_temp, job_id)
+
+        if public_url:
+            # Atualizar tabela Printa
+            update_success = update_printa_table(job_id, public_url)
+
+            if update_success:
+                files_saved["supabase_url"] = public_url
+                logger.info(f"[{job_id}] ✅ Integração Supabase completa!")
+            else:
+                logger.warning(f"[{job_id}] ⚠️ Upload feito, mas falha ao atualizar tabela")
+        else:
+            logger.warning(f"[{job_id}] ⚠️ Falha no upload para Supabase")
+
+    store_in_cache(job_id, data, config, files_saved, out_cdr_temp, public_url)
+    save_render_state(job_id, data, config)
+
+    # Deletar CDR temporário após upload (o cache guarda sua própria cópia)
+    if out_cdr_temp is not None and out_cdr_temp.exists():
         try:
-            pythoncom.CoUninitialize()
-        except:
-            pass
+            out_cdr_temp.unlink()
+            logger.info(f"[{job_id}] 🗑️ CDR temporário removido")
+        except Exception as e:
+            logger.warning(f"[{job_id}] Não foi possível remover CDR temporário: {e}")
 
-def process_cardapio_from_text(job_id: str, text_content: str, config: CardapioConfig):
+    # Atualizar status
+    finish_job(
+        job_id, config, "completed", message,
+        files=files_saved,
+        supabase_url=public_url  # URL pública do arquivo CDR no Supabase
+    )
+
+    logger.info(f"[{job_id}] ✅ Processamento concluído!")
+    logger.info(f"[{job_id}] Arquivos gerados: {', '.join(files_saved.keys())}")
+
+def process_cardapio(job_id: str, source, config: CardapioConfig):
     """
-    Processar cardápio a partir de texto direto (sem arquivo)
+    Processar cardápio com formatação correta e salvamento robusto
+
+    Args:
+        source: Cardápio já parseado (dict) ou qualquer entrada de
+            builder.parse_txt (texto, bytes, Path, stream)
+    """
+    try:
+        logger.info(f"[{job_id}] Iniciando processamento...")
+        job_store.update(job_id, status="processing", message="Em processamento")
+
+        if isinstance(source, dict):
+            data = source
+        else:
+            # Parse em streaming, direto da entrada (sem arquivo temporário)
+            logger.info(f"[{job_id}] Fazendo parse do relatório...")
+            job_events.publish(job_id, "parsing", "Lendo o relatório de preços")
+            data = builder.parse_txt(source)
+
+        data, config = fit_menu(job_id, data, config)
+        if serve_from_cache(job_id, data, config):
+            return
+
+        if config.renderer == "pdf":
+            render_job(job_id, data, config)
+        else:
+            logger.info(f"[{job_id}] Aguardando sessão CorelDRAW livre...")
+            with corel_pool.lease() as session:
+                logger.info(f"[{job_id}] Sessão CorelDRAW {session.index} alocada")
+                render_job(job_id, data, config, session)
+
+    except Exception as e:
+        logger.error(f"[{job_id}] Erro geral: {str(e)}", exc_info=True)
+        finish_job(job_id, config, "failed", f"Erro no processamento: {str(e)}")
+
+def process_batch(batch_id: str, items: list, config: CardapioConfig):
+    """
+    Renderiza um lote de cardápios em sequência, em UMA sessão CorelDRAW
+
+    Args:
+        items: Lista de (job_id, data) já parseados no endpoint /cardapio/lote
     """
-    import re
+    logger.info(f"[{batch_id}] 📚 Lote com {len(items)} cardápio(s)...")
+    t0 = time.perf_counter()
+
+    def run(session=None):
+        for job_id, data, item_config in items:
+            try:
+                job_store.update(job_id, status="processing", message="Em processamento (lote)")
+                render_job(job_id, data, item_config, session)
+            except Exception as e:
+                logger.error(f"[{job_id}] Erro no item do lote: {str(e)}", exc_info=True)
+                finish_job(job_id, config, "failed", f"Erro no processamento: {str(e)}")
 
+    # Cada item com seu modelo/tamanho; idênticos a cardápios já
+    # renderizados saem do cache, sem sessão
+    pending = []
+    for job_id, data in items:
+        try:
+            data, item_config = fit_menu(job_id, data, config)
+        except Exception as e:
+            logger.warning(f"[{job_id}] ⚠️ Falha no ajuste de tamanho: {e}")
+            item_config = config
+        try:
+            if serve_from_cache(job_id, data, item_config):
+                continue
+        except Exception as e:
+            logger.warning(f"[{job_id}] ⚠️ Falha ao consultar o cache: {e}")
+        pending.append((job_id, data, item_config))
+    items = pending
+
+    try:
+        if config.renderer == "pdf" or not items:
+            run()
+        else:
+            logger.info(f"[{batch_id}] Aguardando sessão CorelDRAW livre...")
+            with corel_pool.lease() as session:
+                logger.info(f"[{batch_id}] Sessão CorelDRAW {session.index} alocada para o lote")
+                run(session)
+    except Exception as e:
+        # Falha antes de começar (ex: sem sessão): todos os itens pendentes falham
+        logger.error(f"[{batch_id}] Erro no lote: {str(e)}", exc_info=True)
+        for job_id, _, _ in items:
+            job = job_store.get(job_id)
+            if job and job["status"] in ("pending", "processing"):
+                finish_job(job_id, config, "failed", f"Erro no lote: {str(e)}")
+
+    logger.info(f"[{batch_id}] ✅ Lote concluído em {time.perf_counter() - t0:.1f}s")
+
+def normalize_menu_text(text_content: str, job_id: str = "-") -> str:
+    """
+    Normaliza o texto recebido via API (quebras de linha, texto em linha única)
+    """
     # Normalizar quebras de linha (pode vir como \n literal ou real)
     # Substituir \n literal por quebra de linha real
     if '\\n' in text_content:
@@ -628,48 +1046,112 @@ def process_cardapio_from_text(job_id: str, text_content: str, config: CardapioC
     if lines_count <= 3 and len(text_content) > 100:
         logger.warning(f"[{job_id}] Texto veio em linha única! Tentando recuperar estrutura...")
 
-        # 1. Adicionar quebra após "RELATÓRIO DE PREÇOS Nome"
-        text_content = re.sub(r'(RELATÓRIO DE PREÇOS\s+[^\*]+?)(\s+\*)', r'\1\n\n\2', text_content)
+        # Tokenizador de uma passada (cabeçalho, *categorias* e itens até o
+        # preço), linear mesmo em entradas longas sem asteriscos
+        text_content = builder.recover_report_lines(text_content)
 
-        # 2. Adicionar quebra de linha ANTES de categorias (palavras entre asteriscos)
-        # Padrão: qualquer coisa + espaços + *categoria*
-        text_content = re.sub(r'([^\n])\s{2,}(\*[^*]+\*)', r'\1\n\n\2', text_content)
+        lines_count_after = len(text_content.splitlines())
+        logger.info(f"[{job_id}] Após recuperação: {lines_count_after} linhas")
+        logger.info(f"[{job_id}] Primeiras 500 chars após recuperação: {text_content[:500]}")
 
-        # 3. Adicionar quebra de linha DEPOIS de categorias
-        text_content = re.sub(r'(\*[^*]+\*)\s+', r'\1\n', text_content)
+    return text_content
 
-        # 4. Adicionar quebra de linha após cada item com preço
-        # Padrão: qualquer coisa + R$ + números + vírgula + números + espaços
-        text_content = re.sub(r'(R\$\s*\d+,\d{2})\s+', r'\1\n', text_content)
+def process_cardapio_from_text(job_id: str, text_content: str, config: CardapioConfig):
+    """
+    Processar cardápio a partir de texto direto (sem arquivo)
+    """
+    text_content = normalize_menu_text(text_content, job_id)
 
-        # 5. Limpar múltiplas quebras de linha consecutivas
-        text_content = re.sub(r'\n{3,}', '\n\n', text_content)
+    # Parse direto do texto em memória (mesma pipeline, sem arquivo temporário)
+    process_cardapio(job_id, text_content, config)
 
-        lines_count_after = len(text_content.splitlines())
-        logger.info(f"[{job_id}] Após recuperação: {lines_count_after} linhas")
-        logger.info(f"[{job_id}] Primeiras 500 chars após recuperação: {text_content[:500]}")
+def reserve_queue_slot(job_id: str, count: int = 1):
+    """
+    Reserva vaga na fila de renderização ANTES de gravar o job
 
-    # Salvar texto em arquivo temporário para usar a mesma pipeline
-    temp_input = TEMP_DIR / f"{job_id}_input.txt"
+    Fila cheia -> 429 com Retry-After sem ter tocado no banco nem nos
+    arquivos: um reenvio recusado de um id já concluído mantém o job anterior.
+    """
     try:
-        temp_input.write_text(text_content, encoding='utf-8')
-    except Exception as e:
-        logger.error(f"[{job_id}] Erro ao salvar texto temporário: {e}")
-        jobs_cache[job_id].update({
-            "status": "failed",
-            "message": f"Erro ao salvar texto: {str(e)}",
-            "completed_at": datetime.now().isoformat()
-        })
-        return
+        return render_queue.reserve(count)
+    except QueueFull as e:
+        logger.warning(f"[{job_id}] 🚦 Fila cheia, job recusado (Retry-After: {e.retry_after}s)")
+        raise HTTPException(
+            status_code=429,
+            detail="Fila de renderização cheia. Tente novamente mais tarde.",
+            headers={"Retry-After": str(e.retry_after)}
+        )
+
+def enqueue_job(slot, job_id: str, fn, *args):
+    """Coloca o job na fila de renderização, na vaga reservada por reserve_queue_slot"""
+    position = slot.submit(job_id, fn, job_id, *args)
+    logger.info(f"[{job_id}] 📥 Job na fila (posição {position})")
+    job_events.publish(job_id, "queued", f"Na fila (posição {position})", queue_position=position)
+    return position
+
+def requeue_unfinished_jobs():
+    """
+    Reenfileira jobs pendentes/em processamento cujo processo dono morreu
+
+    Só jobs de lease vencido, cada um assumido com um UPDATE atômico
+    (job_store.take): com vários workers do uvicorn, um job que outro
+    processo vivo está renderizando nunca é renderizado de novo. Roda no
+    startup e a cada batida do heartbeat. Usa o request salvo junto com o
+    job (texto ou arquivo de entrada + config).
+    """
+    for job in job_store.expired_leases():
+        job_id = job["job_id"]
+        try:
+            slot = render_queue.reserve()
+        except QueueFull:
+            # Sem vaga: o lease continua vencido e o job fica para a próxima batida
+            logger.info("🚦 Fila cheia, jobs órfãos ficam para o próximo heartbeat")
+            return
+
+        with slot:
+            if not job_store.take(job_id):
+                continue  # outro worker assumiu antes
+
+            request = job.get("request") or {}
+            config = CardapioConfig(**request.get("config", {}))
+            if request.get("kind") == "text":
+                fn, arg = process_cardapio_from_text, request["text"]
+            elif request.get("kind") == "parsed":
+                fn, arg = process_cardapio, request["data"]
+            elif request.get("kind") == "file" and Path(request["input_path"]).exists():
+                # Jobs gravados antes do parse em streaming (entrada em temp/)
+                fn, arg = process_cardapio, Path(request["input_path"])
+            else:
+                logger.warning(f"[{job_id}] ⚠️ Entrada perdida, job não pode ser reenfileirado")
+                finish_job(job_id, config, "failed", "Entrada do job perdida no reinício da API")
+                continue
+
+            slot.submit(job_id, fn, job_id, arg, config)
+        job_store.update(job_id, status="pending", message="Reenfileirado após reinício")
+        job_events.publish(job_id, "queued", "Reenfileirado após reinício")
+        logger.info(f"[{job_id}] 🔁 Job reenfileirado após reinício")
+
+lease_heartbeat = LeaseHeartbeat(job_store, on_beat=requeue_unfinished_jobs)
 
-    # Usar a função de processamento existente
-    process_cardapio(job_id, temp_input, config)
+def request_content_hash(text: str, config: CardapioConfig) -> str:
+    """
+    Hash do conteúdo de um envio (texto + config que muda o resultado)
+
+    O callback_url fica de fora: um retry não muda o cardápio gerado.
+    """
+    payload = {
+        "text": text,
+        "font": config.font,
+        "font_size": config.font_size,
+        "render_mode": config.render_mode,
+        "renderer": config.renderer,
+        "text_flow": config.text_flow,
+    }
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
 
 @app.post("/cardapio/formatar")
-async def formatar_cardapio(
-    background_tasks: BackgroundTasks,
-    request: FormatRequest
-):
+def formatar_cardapio(request: FormatRequest):
     """
     Formatar cardápio a partir de texto direto
 
@@ -693,50 +1175,389 @@ async def formatar_cardapio(
     if not request.text or not request.text.strip():
         raise HTTPException(status_code=400, detail="O campo 'text' não pode estar vazio")
 
+    if request.render_mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render_mode inválido. Use: {', '.join(RENDER_MODES)}")
+    if request.renderer not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"renderer inválido. Use: {', '.join(RENDERERS)}")
+    if request.text_flow not in TEXT_FLOWS:
+        raise HTTPException(status_code=400, detail=f"text_flow inválido. Use: {', '.join(TEXT_FLOWS)}")
+    validate_callback_url(request.callback_url)
+
     # Usar o ID fornecido pelo usuário
     job_id = request.id
 
-    # Verificar se já existe um job com este ID
-    if job_id in jobs_cache:
-        existing_job = jobs_cache[job_id]
-        if existing_job["status"] == "processing":
+    # Configuração
+    config = CardapioConfig(
+        font=request.font,
+        font_size=request.font_size,
+        render_mode=request.render_mode,
+        renderer=request.renderer,
+        text_flow=request.text_flow,
+        callback_url=request.callback_url
+    )
+
+    # Registrar job (com o request, para reenfileirar após reinício), a menos
+    # que o mesmo id ainda esteja na fila/em processamento
+    content_hash = request_content_hash(request.text, config)
+    with reserve_queue_slot(job_id) as slot:
+        job, created = job_store.claim(job_id, content_hash, request={
+            "kind": "text", "text": request.text, "config": config.model_dump()
+        })
+
+        if not created:
+            # Reenvio idêntico (ex: retry do n8n): acompanha o job em andamento
+            if job["request_hash"] == content_hash:
+                logger.info(f"[{job_id}] 🔗 Envio duplicado anexado ao job em andamento")
+                return {
+                    "job_id": job_id,
+                    "status": job["status"],
+                    "message": "Envio idêntico já em processamento. Use /cardapio/status/{job_id} para acompanhar.",
+                    "status_url": f"/cardapio/status/{job_id}",
+                    "queue_position": render_queue.position(job_id),
+                    "coalesced": True
+                }
             raise HTTPException(
                 status_code=409,
-                detail=f"Job com ID '{job_id}' já está em processamento"
+                detail=f"Job com ID '{job_id}' já está em processamento com outro conteúdo"
             )
-        # Se já foi processado, permitir reprocessar
-        logger.info(f"[{job_id}] Reprocessando job existente")
 
-    # Criar job no cache
-    jobs_cache[job_id] = {
+        # Enfileirar para os workers de renderização
+        position = enqueue_job(slot, job_id, process_cardapio_from_text, request.text, config)
+
+    return {
         "job_id": job_id,
         "status": "pending",
-        "message": "Processamento iniciado",
-        "files": None,
-        "supabase_url": None,
-        "created_at": datetime.now().isoformat(),
-        "completed_at": None
+        "message": "Processamento iniciado. Use /cardapio/status/{job_id} para acompanhar.",
+        "status_url": f"/cardapio/status/{job_id}",
+        "queue_position": position
     }
 
-    # Configuração
-    config = CardapioConfig(font=request.font, font_size=request.font_size)
+@app.post("/cardapio/preview")
+def preview_cardapio(request: PreviewRequest):
+    """
+    Pré-visualização síncrona do layout (sem job, sem fila, sem CorelDRAW)
+
+    Roda só as etapas em Python puro (parse, ajuste de modelo/tamanho,
+    divisão em colunas, composição do texto) e devolve o resultado em JSON + SVG, para validar o cardápio
+    antes de enviá-lo a /cardapio/formatar. Cardápio sem itens -> 422.
+    """
+    t0 = time.perf_counter()
+
+    if not request.text or not request.text.strip():
+        raise HTTPException(status_code=400, detail="O campo 'text' não pode estar vazio")
+
+    text_content = normalize_menu_text(request.text, "preview")
+    data = builder.parse_text(text_content)
+
+    if data["total_items"] == 0:
+        raise HTTPException(
+            status_code=422,
+            detail="Nenhum item com preço encontrado (formato: 'Nome - R$ 0,00')"
+        )
 
-    # Adicionar task em background
-    background_tasks.add_task(process_cardapio_from_text, job_id, request.text, config)
+    warnings = []
+    if not data["restaurant"]:
+        warnings.append("Nome do restaurante não encontrado ('RELATÓRIO DE PREÇOS <nome>')")
+    for cat in data["categories"]:
+        if not cat["items"]:
+            warnings.append(f"Categoria sem itens: {cat['category']}")
+
+    # Mesmo ajuste de modelo/tamanho dos jobs
+    layouts = builder.template_layouts(TEMPLATES_DIR / "tplA.cdr", TEMPLATES_DIR / "tplB.cdr")
+    model, font_size, pages, fits = builder.fit_layout(
+        data["categories"], layouts, request.font, request.font_size
+    )
+    data = dict(data, model=model)
+    if not fits:
+        warnings.append(f"Há linhas mais largas que a coluna nem com fonte {font_size}pt")
+
+    tpl = TEMPLATES_DIR / ("tplA.cdr" if data["model"] == "A" else "tplB.cdr")
+    metadata = builder.load_template_metadata(tpl)
+    layout, svg = svg_preview.render_menu_svg(
+        data, font_name=request.font, font_size_pt=font_size, metadata=metadata
+    )
+
+    columns = []
+    for col in layout["columns"]:
+        lines = col["text"].split("\r\n")
+        if len(lines) > 1 and not lines[-1]:
+            lines.pop()
+        columns.append({
+            "page": col["page"],
+            "frame": list(col["frame"]),
+            "width_pt": round(col["width_pt"], 2),
+            "entries": col["seq"],
+            "lines": lines,
+            "spans": col["spans"],
+        })
 
     return {
-        "job_id": job_id,
-        "status": "pending",
-        "message": "Processamento iniciado. Use /cardapio/status/{job_id} para acompanhar.",
-        "status_url": f"/cardapio/status/{job_id}"
+        "restaurant": data["restaurant"],
+        "model": data["model"],
+        "font_size": font_size,
+        "pages": pages,
+        "fits": fits,
+        "total_items": data["total_items"],
+        "parsed": data,
+        "columns": columns,
+        "template_metadata": metadata is not None,
+        "warnings": warnings,
+        "svg": svg if request.svg else None,
+        "elapsed_ms": round((time.perf_counter() - t0) * 1000, 2),
+    }
+
+BATCH_MAX_ITEMS = int(os.environ.get("CARDAPIO_BATCH_MAX", "100"))
+
+def batch_summary(batch_id: str, jobs: list) -> dict:
+    """Status agregado do lote + status de cada item"""
+    counts = {}
+    for job in jobs:
+        counts[job["status"]] = counts.get(job["status"], 0) + 1
+    finished = counts.get("completed", 0) + counts.get("failed", 0)
+    return {
+        "batch_id": batch_id,
+        "status": "completed" if finished == len(jobs) else "processing",
+        "total": len(jobs),
+        "counts": counts,
+        "items": [
+            {
+                "job_id": job["job_id"],
+                "status": job["status"],
+                "message": job["message"],
+                "files": job["files"],
+                "supabase_url": job["supabase_url"],
+                "status_url": f"/cardapio/status/{job['job_id']}",
+            }
+            for job in jobs
+        ],
+    }
+
+def create_batch(batch_id: str, menus, config: CardapioConfig) -> dict:
+    """
+    Registra os itens de um lote e põe os válidos na fila (um único item)
+
+    Args:
+        menus: Lista de (job_id, data) já parseados
+
+    Returns:
+        Resumo do lote (batch_summary)
+    """
+    # Vaga do lote reservada antes de gravar os itens: com a fila cheia o
+    # 429 sai sem substituir jobs anteriores de ids reenviados
+    slot = reserve_queue_slot(batch_id)
+    job_ids = []
+    to_render = []
+    try:
+        for job_id, data in menus:
+            job_ids.append(job_id)
+            if data["total_items"] == 0:
+                job_store.create(
+                    job_id, status="failed", batch_id=batch_id,
+                    message="Nenhum item com preço encontrado (formato: 'Nome - R$ 0,00')",
+                    completed_at=datetime.now().isoformat()
+                )
+                continue
+
+            # Cardápio parseado junto com o job: se a API reiniciar, o item é
+            # reenfileirado sozinho
+            job_store.create(job_id, batch_id=batch_id, request={
+                "kind": "parsed", "data": data, "config": config.model_dump()
+            })
+            to_render.append((job_id, data))
+    except Exception:
+        slot.release()
+        for job_id in job_ids:
+            job_store.delete(job_id)
+        raise
+
+    with slot:
+        if to_render:
+            slot.submit(batch_id, process_batch, batch_id, to_render, config)
+            for job_id, _ in to_render:
+                job_events.publish(job_id, "queued", "Na fila (lote)", batch_id=batch_id)
+
+    logger.info(f"[{batch_id}] 📥 Lote na fila: {len(to_render)} de {len(job_ids)} item(ns) válidos")
+    result = batch_summary(batch_id, job_store.batch(batch_id))
+    result["status_url"] = f"/cardapio/lote/{batch_id}"
+    return result
+
+# Quanto o upload de um relatório espera por vaga na fila antes de marcar
+# os restaurantes seguintes como recusados
+REPORT_QUEUE_WAIT = float(os.environ.get("CARDAPIO_REPORT_QUEUE_WAIT", "120"))
+
+def enqueue_report(batch_id: str, menus, config: CardapioConfig) -> dict:
+    """
+    Registra e enfileira cada restaurante de um relatório assim que é parseado
+
+    Sem limite de itens: com a fila cheia, a leitura do upload espera vaga
+    (até REPORT_QUEUE_WAIT s), então só o restaurante atual fica em memória.
+    Se a espera estoura, esse e os seguintes voltam como `failed` para
+    reenvio. A resposta traz só as contagens (o relatório pode ter milhares
+    de itens); os itens ficam em /cardapio/lote/{batch_id}.
+    """
+    counts = {}
+    total = 0
+    wait = REPORT_QUEUE_WAIT
+    error = None
+
+    def register_failed(job_id, message):
+        job_store.create(
+            job_id, status="failed", batch_id=batch_id, message=message,
+            completed_at=datetime.now().isoformat()
+        )
+        counts["failed"] = counts.get("failed", 0) + 1
+
+    try:
+        for job_id, data in menus:
+            total += 1
+            if data["total_items"] == 0:
+                register_failed(job_id, "Nenhum item com preço encontrado (formato: 'Nome - R$ 0,00')")
+                continue
+            try:
+                slot = render_queue.reserve(timeout=wait)
+            except QueueFull as e:
+                # Fila parada: não espera de novo a cada restaurante
+                wait = 0
+                logger.warning(f"[{job_id}] 🚦 Fila cheia, item do relatório recusado (Retry-After: {e.retry_after}s)")
+                register_failed(job_id, "Fila de renderização cheia. Envie este cardápio novamente.")
+                continue
+            wait = REPORT_QUEUE_WAIT
+            with slot:
+                job_store.create(job_id, batch_id=batch_id, request={
+                    "kind": "parsed", "data": data, "config": config.model_dump()
+                })
+                enqueue_job(slot, job_id, process_cardapio, data, config)
+            counts["pending"] = counts.get("pending", 0) + 1
+    except Exception as e:
+        if not total:
+            raise HTTPException(status_code=400, detail=f"Erro ao ler arquivo: {str(e)}")
+        # Os restaurantes anteriores já estão na fila e seguem normalmente
+        logger.error(f"[{batch_id}] Erro ao ler o relatório após {total} restaurante(s): {e}")
+        error = f"Erro ao ler arquivo após {total} restaurante(s): {str(e)}"
+
+    if not total:
+        raise HTTPException(status_code=400, detail="Nenhum restaurante encontrado no relatório")
+
+    logger.info(f"[{batch_id}] 📥 Relatório na fila: {counts.get('pending', 0)} de {total} restaurante(s)")
+    result = {
+        "batch_id": batch_id,
+        "status": "processing" if counts.get("pending") else "completed",
+        "total": total,
+        "counts": counts,
+        "status_url": f"/cardapio/lote/{batch_id}",
     }
+    if error:
+        result["error"] = error
+    return result
+
+@app.post("/cardapio/lote")
+def criar_lote(request: BatchRequest):
+    """
+    Gerar vários cardápios de uma vez
+
+    Todos os textos são validados e parseados aqui; os válidos são
+    renderizados em sequência em UMA sessão CorelDRAW (um único item na
+    fila). Itens inválidos já voltam como `failed`. Cada item é um job
+    normal (status, download, eventos); o lote é acompanhado em
+    /cardapio/lote/{batch_id}.
+    """
+    if not request.items:
+        raise HTTPException(status_code=400, detail="O lote não tem itens")
+    if len(request.items) > BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=400, detail=f"Máximo de {BATCH_MAX_ITEMS} itens por lote")
+    if request.render_mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render_mode inválido. Use: {', '.join(RENDER_MODES)}")
+    if request.renderer not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"renderer inválido. Use: {', '.join(RENDERERS)}")
+    if request.text_flow not in TEXT_FLOWS:
+        raise HTTPException(status_code=400, detail=f"text_flow inválido. Use: {', '.join(TEXT_FLOWS)}")
+    validate_callback_url(request.callback_url)
+
+    batch_id = str(uuid.uuid4())
+    job_ids = [item.id or f"{batch_id}-{n}" for n, item in enumerate(request.items, 1)]
+    if len(set(job_ids)) != len(job_ids):
+        raise HTTPException(status_code=400, detail="IDs repetidos no lote")
+    for job_id in job_ids:
+        existing_job = job_store.get(job_id)
+        if existing_job and existing_job["status"] in ("pending", "processing"):
+            raise HTTPException(status_code=409, detail=f"Job com ID '{job_id}' já está em processamento")
+
+    config = CardapioConfig(
+        font=request.font,
+        font_size=request.font_size,
+        render_mode=request.render_mode,
+        renderer=request.renderer,
+        text_flow=request.text_flow,
+        callback_url=request.callback_url
+    )
+
+    # Parse de todos os itens antes de gravar qualquer job: um erro de parse
+    # não deixa o lote pela metade nem substitui jobs anteriores dos ids
+    menus = [
+        (job_id, builder.parse_text(normalize_menu_text(item.text, job_id)))
+        for job_id, item in zip(job_ids, request.items)
+    ]
+    return create_batch(batch_id, menus, config)
+
+@app.post("/cardapio/relatorio")
+def gerar_relatorio(
+    file: UploadFile = File(...),
+    font: str = "Arial",
+    font_size: float = Query(10.0, gt=0, le=FONT_SIZE_MAX_PT),
+    render_mode: str = "com",
+    renderer: str = "corel",
+    text_flow: str = "columns",
+    callback_url: Optional[str] = None
+):
+    """
+    Gerar um cardápio por restaurante de um relatório com vários
+    "RELATÓRIO DE PREÇOS" concatenados
+
+    O upload é lido em streaming e cada restaurante vira um job do lote
+    ({batch_id}-{n}, na ordem do relatório) que entra na fila assim que é
+    parseado, sem limite de restaurantes; o lote é acompanhado em
+    /cardapio/lote/{batch_id}. Endpoint síncrono (roda no threadpool): o
+    parse e a espera por vaga na fila não travam o event loop.
+    """
+    if not file.filename.endswith('.txt'):
+        raise HTTPException(status_code=400, detail="Arquivo deve ser .txt")
+    if render_mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render_mode inválido. Use: {', '.join(RENDER_MODES)}")
+    if renderer not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"renderer inválido. Use: {', '.join(RENDERERS)}")
+    if text_flow not in TEXT_FLOWS:
+        raise HTTPException(status_code=400, detail=f"text_flow inválido. Use: {', '.join(TEXT_FLOWS)}")
+    validate_callback_url(callback_url)
+
+    config = CardapioConfig(
+        font=font, font_size=font_size, render_mode=render_mode,
+        renderer=renderer, text_flow=text_flow, callback_url=callback_url
+    )
+
+    batch_id = str(uuid.uuid4())
+    menus = (
+        (f"{batch_id}-{n}", data)
+        for n, data in enumerate(builder.iter_menus(file.file), 1)
+    )
+    return enqueue_report(batch_id, menus, config)
+
+@app.get("/cardapio/lote/{batch_id}")
+def status_lote(batch_id: str):
+    """Status do lote e de cada item"""
+    jobs = job_store.batch(batch_id)
+    if not jobs:
+        raise HTTPException(status_code=404, detail="Lote não encontrado")
+    return batch_summary(batch_id, jobs)
 
 @app.post("/cardapio/gerar")
-async def gerar_cardapio(
-    background_tasks: BackgroundTasks,
+def gerar_cardapio(
     file: UploadFile = File(...),
     font: str = "Arial",
-    font_size: float = 10.0
+    font_size: float = Query(10.0, gt=0, le=FONT_SIZE_MAX_PT),
+    render_mode: str = "com",
+    renderer: str = "corel",
+    text_flow: str = "columns",
+    callback_url: Optional[str] = None
 ):
     """
     Gerar cardápio com formatação correta
@@ -745,57 +1566,154 @@ async def gerar_cardapio(
     # Validar arquivo
     if not file.filename.endswith('.txt'):
         raise HTTPException(status_code=400, detail="Arquivo deve ser .txt")
+
+    if render_mode not in RENDER_MODES:
+        raise HTTPException(status_code=400, detail=f"render_mode inválido. Use: {', '.join(RENDER_MODES)}")
+    if renderer not in RENDERERS:
+        raise HTTPException(status_code=400, detail=f"renderer inválido. Use: {', '.join(RENDERERS)}")
+    if text_flow not in TEXT_FLOWS:
+        raise HTTPException(status_code=400, detail=f"text_flow inválido. Use: {', '.join(TEXT_FLOWS)}")
+    validate_callback_url(callback_url)
     
     # Gerar job_id único
     job_id = str(uuid.uuid4())
-    
-    # Salvar arquivo temporário
-    temp_input = TEMP_DIR / f"{job_id}_input.txt"
+
+    # Parse em streaming direto do upload (sem copiar para temp/)
     try:
-        with temp_input.open("wb") as f:
-            shutil.copyfileobj(file.file, f)
+        data = builder.parse_txt(file.file)
     except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Erro ao salvar arquivo: {str(e)}")
-    
-    # Criar job no cache
-    jobs_cache[job_id] = {
-        "job_id": job_id,
-        "status": "pending",
-        "message": "Processamento iniciado",
-        "files": None,
-        "supabase_url": None,
-        "created_at": datetime.now().isoformat(),
-        "completed_at": None
-    }
-    
+        raise HTTPException(status_code=400, detail=f"Erro ao ler arquivo: {str(e)}")
+
     # Configuração
-    config = CardapioConfig(font=font, font_size=font_size)
-    
-    # Adicionar task em background
-    background_tasks.add_task(process_cardapio, job_id, temp_input, config)
+    config = CardapioConfig(
+        font=font, font_size=font_size, render_mode=render_mode,
+        renderer=renderer, text_flow=text_flow, callback_url=callback_url
+    )
+
+    with reserve_queue_slot(job_id) as slot:
+        # Registrar job (com o cardápio parseado, para reenfileirar após reinício)
+        job_store.create(job_id, request={
+            "kind": "parsed", "data": data, "config": config.model_dump()
+        })
+
+        # Enfileirar para os workers de renderização
+        position = enqueue_job(slot, job_id, process_cardapio, data, config)
     
     return {
         "job_id": job_id,
         "status": "pending",
         "message": "Processamento iniciado. Use /cardapio/status/{job_id} para acompanhar.",
-        "status_url": f"/cardapio/status/{job_id}"
+        "status_url": f"/cardapio/status/{job_id}",
+        "queue_position": position
     }
 
 @app.get("/cardapio/status/{job_id}")
-async def get_status(job_id: str):
+def get_status(job_id: str):
     """Verificar status do processamento"""
-    if job_id not in jobs_cache:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job não encontrado")
-    
-    return jobs_cache[job_id]
+
+    if job["status"] == "pending":
+        # Itens de lote ocupam uma única entrada na fila (a do lote)
+        job["queue_position"] = render_queue.position(job["batch_id"] or job_id)
+        job["queue_depth"] = render_queue.depth()
+    job["stage"] = job_events.last_stage(job_id)
+    return job
+
+SSE_KEEPALIVE_SECONDS = 15
+SSE_POLL_SECONDS = float(os.environ.get("CARDAPIO_SSE_POLL_SECONDS", "1.0"))
+
+# Etapa SSE equivalente a cada status do banco (jobs de outro processo)
+STORE_STAGES = {"pending": "queued", "processing": "rendering", "completed": "done", "failed": "failed"}
+
+@app.get("/cardapio/eventos/{job_id}")
+async def job_event_stream(job_id: str):
+    """
+    Stream SSE com as etapas do job, em tempo real
+
+    Etapas: queued, parsing, rendering, exporting, uploading, done/failed.
+    O histórico já ocorrido é enviado primeiro; o stream termina em
+    done/failed. Substitui o polling em /cardapio/status/{job_id}.
+
+    Os eventos detalhados só existem no processo que enfileirou o job. Com
+    vários workers do uvicorn, um job de outro processo (sem histórico
+    aqui) é acompanhado pelo banco: a cada SSE_POLL_SECONDS, cada mudança
+    de status/mensagem vira um evento (pending -> queued, processing ->
+    rendering, completed -> done).
+    """
+    # SQLite fora do event loop (pode esperar o lock de escrita)
+    job = await run_in_threadpool(job_store.get, job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job não encontrado")
+
+    async def stream():
+        history, q = job_events.subscribe(job_id)
+        try:
+            for event in history:
+                yield format_sse(event)
+                if event["stage"] in TERMINAL_STAGES:
+                    return
+
+            # Sem histórico neste processo: seguir o status gravado no banco
+            current = None if history else job
+            last_state = None
+            seq = 0
+            idle = 0.0
+            while True:
+                if current is not None:
+                    state = (current["status"], current["message"])
+                    if state != last_state:
+                        last_state = state
+                        seq += 1
+                        idle = 0.0
+                        stage = STORE_STAGES.get(current["status"], current["status"])
+                        yield format_sse(dict(current, id=seq, stage=stage))
+                        if stage in TERMINAL_STAGES:
+                            return
+
+                try:
+                    event = await asyncio.wait_for(
+                        q.get(), timeout=SSE_POLL_SECONDS if last_state else SSE_KEEPALIVE_SECONDS
+                    )
+                except asyncio.TimeoutError:
+                    event = None
+
+                if event is not None:
+                    # O job (re)entrou na fila deste processo: eventos diretos
+                    last_state = current = None
+                    idle = 0.0
+                    yield format_sse(event)
+                    if event["stage"] in TERMINAL_STAGES:
+                        return
+                    continue
+
+                if last_state:
+                    current = await run_in_threadpool(job_store.get, job_id)
+                    if current is None:
+                        return  # job removido
+                    idle += SSE_POLL_SECONDS
+                else:
+                    idle = SSE_KEEPALIVE_SECONDS
+                if idle >= SSE_KEEPALIVE_SECONDS:
+                    idle = 0.0
+                    yield ": keepalive\n\n"
+        finally:
+            job_events.unsubscribe(job_id, q)
+
+    return StreamingResponse(
+        stream(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 @app.get("/cardapio/download/{job_id}/{file_type}")
-async def download_file(job_id: str, file_type: str):
+def download_file(job_id: str, file_type: str):
     """Baixar arquivo gerado"""
-    if job_id not in jobs_cache:
+    job = job_store.get(job_id)
+    if job is None:
         raise HTTPException(status_code=404, detail="Job não encontrado")
     
-    job = jobs_cache[job_id]
     if job["status"] != "completed":
         raise HTTPException(status_code=400, detail="Processamento ainda não concluído")
     
@@ -833,30 +1751,62 @@ async def download_file(job_id: str, file_type: str):
         )
 
 @app.delete("/cardapio/limpar/{job_id}")
-async def limpar_job(job_id: str):
+def limpar_job(job_id: str):
     """Remover arquivos de um job"""
-    if job_id not in jobs_cache:
+    if job_id not in job_store:
         raise HTTPException(status_code=404, detail="Job não encontrado")
     
-    job_output = OUTPUT_DIR / job_id
-    if job_output.exists():
-        shutil.rmtree(job_output)
-    
-    temp_input = TEMP_DIR / f"{job_id}_input.txt"
-    if temp_input.exists():
-        temp_input.unlink()
-    
-    del jobs_cache[job_id]
+    remove_job_files(job_id)
+    job_store.delete(job_id)
     
     return {"message": "Job removido com sucesso"}
 
+def _parse_iso(value: Optional[str], param: str) -> Optional[str]:
+    """Normaliza uma data ISO do query string (mesmo formato de created_at)"""
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value).isoformat()
+    except ValueError:
+        raise HTTPException(status_code=400, detail=f"{param} inválido (use ISO 8601, ex: 2025-10-30T10:00:00)")
+
 @app.get("/cardapio/listar")
-async def listar_jobs():
-    """Listar todos os jobs"""
-    return {
-        "total": len(jobs_cache),
-        "jobs": list(jobs_cache.values())
-    }
+def listar_jobs(
+    limit: int = Query(50, ge=1, le=500),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+    fields: Optional[str] = None,
+    include_total: bool = False
+):
+    """
+    Listar jobs, mais recentes primeiro, com paginação por cursor
+
+    - limit: jobs por página (1-500, padrão 50)
+    - cursor: `next_cursor` da página anterior
+    - status: filtra por status (vírgula para vários: `completed,failed`)
+    - created_from / created_to: intervalo de created_at (ISO 8601)
+    - fields: campos devolvidos (ex: `job_id,status`)
+    - include_total: inclui o total de jobs que batem com o filtro (mais lento)
+    """
+    statuses = [st.strip() for st in status.split(",") if st.strip()] if status else None
+    field_list = [f.strip() for f in fields.split(",") if f.strip()] if fields else None
+    date_from = _parse_iso(created_from, "created_from")
+    date_to = _parse_iso(created_to, "created_to")
+
+    try:
+        jobs, next_cursor = job_store.page(
+            limit=limit, cursor=cursor, statuses=statuses,
+            created_from=date_from, created_to=date_to, fields=field_list
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    result = {"count": len(jobs), "next_cursor": next_cursor, "jobs": jobs}
+    if include_total:
+        result["total"] = job_store.count(statuses, date_from, date_to)
+    return result
 
 if __name__ == "__main__":
     import uvicorn
@@ -0,0 +1,106 @@
+# benchmark_job_store.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark do JobStore (SQLite/WAL) com um histórico grande de jobs
+
+Popula um banco temporário com N jobs e mede a latência de:
+- get(job_id)          (status de um job)
+- update(job_id, ...)  (worker mudando o status)
+- page(...)            (/cardapio/listar: primeira página, página profunda
+                        via cursor e filtro por vários status)
+
+Exemplo:
+    python benchmark_job_store.py --jobs 1000000
+"""
+import argparse
+import json
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+from pathlib import Path
+
+from job_store import JobStore
+
+INSERT_SQL = (
+    "INSERT INTO jobs (job_id, status, message, files, supabase_url, created_at, "
+    "completed_at, request) VALUES (?, ?, ?, ?, ?, ?, ?, ?)"
+)
+
+def _percentiles(samples):
+    samples = sorted(samples)
+    pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+    return f"p50 {pick(0.50):.3f} ms | p99 {pick(0.99):.3f} ms | máx {samples[-1] * 1000:.3f} ms"
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--jobs", type=int, default=1_000_000, help="Jobs no histórico")
+    ap.add_argument("--lookups", type=int, default=20_000, help="Consultas medidas")
+    args = ap.parse_args()
+
+    print("=" * 60)
+    print("⏱️  BENCHMARK DO JOB STORE (SQLite WAL)")
+    print("=" * 60)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = JobStore(Path(tmp) / "jobs.db")
+        conn = store._conn()
+
+        t0 = time.perf_counter()
+        start = datetime.now() - timedelta(days=6)
+        files = json.dumps({"pdf": "cardapio.pdf"})
+        ids = []
+        batch = []
+        for i in range(args.jobs):
+            job_id = str(uuid.uuid4())
+            ids.append(job_id)
+            created = (start + timedelta(seconds=i * 0.5)).isoformat()
+            status = "failed" if i % 50 == 0 else "completed"
+            batch.append((job_id, status, "ok", files, None, created, created, None))
+            if len(batch) == 50_000:
+                with conn:
+                    conn.executemany(INSERT_SQL, batch)
+                batch = []
+        if batch:
+            with conn:
+                conn.executemany(INSERT_SQL, batch)
+        print(f"   📦 {args.jobs} jobs inseridos em {time.perf_counter() - t0:.1f}s")
+
+        sample = random.sample(ids, min(args.lookups, len(ids)))
+
+        durations = []
+        for job_id in sample:
+            t = time.perf_counter()
+            store.get(job_id)
+            durations.append(time.perf_counter() - t)
+        print(f"   🔎 get:    {_percentiles(durations)}")
+
+        durations = []
+        for job_id in sample[:2000]:
+            t = time.perf_counter()
+            store.update(job_id, status="processing")
+            durations.append(time.perf_counter() - t)
+        print(f"   ✏️  update: {_percentiles(durations)}")
+
+        _, deep_cursor = store.page(limit=args.jobs // 2, fields=["job_id"])
+        cases = [
+            ("página 1", {}),
+            ("profunda", {"cursor": deep_cursor}),
+            ("status", {"statuses": ["completed", "failed"], "cursor": deep_cursor}),
+        ]
+        for label, kwargs in cases:
+            durations = []
+            for _ in range(200):
+                t = time.perf_counter()
+                store.page(limit=50, **kwargs)
+                durations.append(time.perf_counter() - t)
+            print(f"   📋 page ({label}): {_percentiles(durations)}")
+
+        t = time.perf_counter()
+        expired = store.purge_expired(now=datetime.now() + timedelta(days=2))
+        print(f"   🧹 purge:  {len(expired)} jobs em {(time.perf_counter() - t) * 1000:.0f} ms")
+        store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,99 @@
+# benchmark_pipeline.py
+# -*- coding: utf-8 -*-
+"""
+Benchmark do pipeline de renderização com o CorelDRAW falso
+
+Roda o mesmo caminho da API (pool de sessões -> cache de template ->
+render_with_corel -> exportação) sobre fake_corel, sem Windows, e mostra:
+- chamadas COM por job (total e membros mais chamados)
+- tempo por job e throughput com a latência COM simulada
+
+Exemplo:
+    python benchmark_pipeline.py --jobs 50 --latency 0.001 --render-mode macro
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+os.environ.setdefault("CARDAPIO_COREL_BACKEND", "fake")
+
+import fake_corel
+from corel_pool import CorelPool
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--inputs", default="temp/*_input.txt", help="Glob dos TXT de entrada")
+    ap.add_argument("--jobs", type=int, default=20, help="Número de jobs")
+    ap.add_argument("--sessions", type=int, default=1, help="Sessões CorelDRAW no pool")
+    ap.add_argument("--latency", type=float, default=0.0, help="Latência por chamada COM (s)")
+    ap.add_argument("--startup", type=float, default=0.0, help="Custo de iniciar o CorelDRAW (s)")
+    ap.add_argument("--render-mode", default="com", choices=["com", "macro"])
+    ap.add_argument("--top", type=int, default=15, help="Quantos membros COM listar")
+    args = ap.parse_args()
+
+    import api_cardapio as api
+    import build_cardapio_dinamico as builder
+
+    base = Path(__file__).parent
+    inputs = sorted(base.glob(args.inputs))
+    if not inputs:
+        print(f"❌ Nenhuma entrada encontrada em {args.inputs}")
+        sys.exit(1)
+    menus = [builder.parse_txt(p) for p in inputs]
+
+    stats = fake_corel.FakeStats(latency=args.latency, startup_latency=args.startup)
+    pool = CorelPool(size=args.sessions, app_factory=lambda: fake_corel.create_app(stats=stats))
+
+    print("=" * 60)
+    print("⏱️  BENCHMARK DO PIPELINE (CorelDRAW fake)")
+    print("=" * 60)
+    print(f"   Entradas: {len(inputs)} | Jobs: {args.jobs} | Sessões: {args.sessions}")
+    print(f"   Latência COM: {args.latency * 1000:.2f} ms | Modo: {args.render_mode}")
+
+    t0 = time.perf_counter()
+    pool.start()
+    warm = time.perf_counter() - t0
+    stats.reset()
+
+    config = api.CardapioConfig(render_mode=args.render_mode)
+    tpl_a = str(api.TEMPLATES_DIR / "tplA.cdr")
+    tpl_b = str(api.TEMPLATES_DIR / "tplB.cdr")
+
+    durations = []
+    with tempfile.TemporaryDirectory() as tmp:
+        t0 = time.perf_counter()
+        for i in range(args.jobs):
+            data = menus[i % len(menus)]
+            tpl = tpl_a if data["model"] == "A" else tpl_b
+            job_output = Path(tmp) / f"job{i}"
+            job_output.mkdir()
+            t_job = time.perf_counter()
+            with pool.lease() as session:
+                _, _, out_cdr_temp = session.call(
+                    api.render_with_corel, f"bench-{i}", data, config, tpl, job_output
+                )
+            durations.append(time.perf_counter() - t_job)
+            if out_cdr_temp.exists():
+                out_cdr_temp.unlink()
+        total = time.perf_counter() - t0
+
+    pool.shutdown()
+
+    durations.sort()
+    print()
+    print(f"   🔥 Aquecimento do pool: {warm * 1000:.1f} ms")
+    print(f"   📊 Chamadas COM: {stats.total_calls} ({stats.total_calls / args.jobs:.1f} por job)")
+    print(f"   ⏱️  Job: média {sum(durations) / len(durations) * 1000:.2f} ms | "
+          f"p50 {durations[len(durations) // 2] * 1000:.2f} ms | "
+          f"máx {durations[-1] * 1000:.2f} ms")
+    print(f"   🚀 Throughput: {args.jobs / total:.1f} jobs/s")
+    print()
+    print(f"   Membros COM mais chamados (top {args.top}):")
+    for member, count in stats.report(args.top):
+        print(f"   {count:>8}  {member}")
+
+if __name__ == "__main__":
+    main()
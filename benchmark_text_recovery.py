@@ -0,0 +1,146 @@
+# benchmark_text_recovery.py
+# -*- coding: utf-8 -*-
+"""
+Fuzz + benchmark da recuperação de relatórios em linha única
+
+- fuzz: gera cardápios aleatórios, achata em uma linha (como chegam do
+  n8n) e confere que builder.recover_report_lines devolve o mesmo cardápio
+  parseado que o texto original (e que as antigas 5 passadas de re.sub,
+  onde elas funcionavam)
+- adversarial: entradas que fazem as regex antigas voltar atrás (espaço
+  longo, cabeçalhos repetidos sem asteriscos) e outras patológicas ("R$"
+  sem centavos, muitos '*'), com tamanho crescente; o tempo do tokenizador
+  por caractere deve ficar constante (sai com erro se crescer mais que
+  LINEAR_SLACK vezes do menor para o maior tamanho)
+
+Exemplo:
+    python benchmark_text_recovery.py --cases 5000 --sizes 2000 8000 32000
+"""
+import argparse
+import random
+import re
+import sys
+import time
+
+import build_cardapio_dinamico as builder
+
+# Folga para ruído de medição no teste de linearidade (ns/char)
+LINEAR_SLACK = 4.0
+
+def legacy_recover(text):
+    """As 5 passadas de re.sub usadas antes em normalize_menu_text"""
+    text = re.sub(r'(RELATÓRIO DE PREÇOS\s+[^\*]+?)(\s+\*)', r'\1\n\n\2', text)
+    text = re.sub(r'([^\n])\s{2,}(\*[^*]+\*)', r'\1\n\n\2', text)
+    text = re.sub(r'(\*[^*]+\*)\s+', r'\1\n', text)
+    text = re.sub(r'(R\$\s*\d+,\d{2})\s+', r'\1\n', text)
+    return re.sub(r'\n{3,}', '\n\n', text)
+
+WORDS = ["Brahma", "Chopp", "Corona", "Heineken", "Batata", "Frita", "Calabresa",
+         "Porção", "Caipirinha", "Limão", "Suco", "Água", "Gás", "Dose", "Pastel",
+         "Queijo", "Carne", "Frango", "Isca", "Tilápia", "Original", "Coca-Cola"]
+EXTRAS = ["(600ml)", "(350ml)", "Lata", "1,5kg", "c/ Bacon", "Long Neck", "2L", "P", "G"]
+
+def random_menu(rng, big_prices=False):
+    """Relatório multi-linha aleatório (formato do n8n)"""
+    name = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+    lines = [f"RELATÓRIO DE PREÇOS {name}", ""]
+    for _ in range(rng.randint(1, 6)):
+        cat = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 2)))
+        if rng.random() < 0.3:
+            cat += " " + rng.choice(["600ml", "Long Neck", "Quentes"])
+        lines.append(f"*{cat}*")
+        for _ in range(rng.randint(1, 12)):
+            item = " ".join(rng.choice(WORDS) for _ in range(rng.randint(1, 3)))
+            if rng.random() < 0.4:
+                item += " " + rng.choice(EXTRAS)
+            reais = rng.randint(1, 99999 if big_prices else 999)
+            reais_txt = f"{reais:,}".replace(",", ".")
+            lines.append(f"{item} - R$ {reais_txt},{rng.randint(0, 99):02d}")
+        lines.append("")
+    return "\n".join(lines)
+
+def flatten(text, rng):
+    """Texto em uma linha: quebras viram espaços (linha em branco = 2+)"""
+    out = text.replace("\n", " ")
+    if rng.random() < 0.3:
+        out = out.replace("  ", " " * rng.randint(2, 4))
+    return out
+
+def fuzz(cases, seed):
+    rng = random.Random(seed)
+    mismatches = legacy_diffs = 0
+    for n in range(cases):
+        big = n % 4 == 0
+        text = random_menu(rng, big_prices=big)
+        flat = flatten(text, rng)
+        expected = builder.parse_text(text)
+        got = builder.parse_text(builder.recover_report_lines(flat))
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 3:
+                print(f"   ❌ divergência (caso {n}):\n{flat[:300]}")
+        # As regex antigas não entendem milhar ("R$ 1.234,56"): só comparar sem eles
+        if not big and builder.parse_text(legacy_recover(flat)) != got:
+            legacy_diffs += 1
+    print(f"   🎲 fuzz: {cases} casos, {mismatches} divergência(s) com o original, "
+          f"{legacy_diffs} com as regex antigas")
+    return mismatches == 0
+
+def adversarial_inputs(size):
+    return {
+        # \s{2,} volta atrás em cada posição de um espaço longo sem '*' depois
+        "espaço longo": "RELATÓRIO DE PREÇOS X  *A* Item" + " " * size + "fim",
+        # [^\*]+? vai até o fim do texto a partir de cada cabeçalho
+        "cabeçalhos sem *": "RELATÓRIO DE PREÇOS Bar " * (size // 24),
+        "R$ sem centavos": "RELATÓRIO DE PREÇOS X  *A* " + "R$ 1 " * (size // 5),
+        "muitos *": "RELATÓRIO DE PREÇOS X " + "* " * (size // 2),
+    }
+
+def timed(fn, text, budget):
+    """Melhor tempo de fn(text); None se uma execução passar do orçamento"""
+    best = None
+    for _ in range(3):
+        t = time.perf_counter()
+        fn(text)
+        elapsed = time.perf_counter() - t
+        best = elapsed if best is None else min(best, elapsed)
+        if elapsed > budget:
+            return None
+    return best
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--cases", type=int, default=2000, help="Casos de fuzz")
+    ap.add_argument("--seed", type=int, default=1234)
+    ap.add_argument("--sizes", type=int, nargs="+", default=[1000, 4000, 16000, 64000],
+                    help="Tamanhos (caracteres) das entradas adversárias")
+    ap.add_argument("--legacy-budget", type=float, default=5.0,
+                    help="Desiste das regex antigas acima deste tempo (s)")
+    args = ap.parse_args()
+
+    print("=" * 60)
+    print("⏱️  RECUPERAÇÃO DE TEXTO EM LINHA ÚNICA")
+    print("=" * 60)
+
+    ok = fuzz(args.cases, args.seed)
+
+    for label in adversarial_inputs(10):
+        print(f"   🔥 {label}")
+        per_char = []
+        for size in sorted(args.sizes):
+            text = adversarial_inputs(size)[label]
+            new = timed(builder.recover_report_lines, text, float("inf"))
+            old = timed(legacy_recover, text, args.legacy_budget)
+            old_txt = f"{old * 1000:9.1f} ms" if old is not None else f"> {args.legacy_budget:.0f} s    "
+            per_char.append(new / len(text))
+            print(f"      {len(text):>7} chars | novo {new * 1000:7.2f} ms "
+                  f"({per_char[-1] * 1e9:6.0f} ns/char) | regex antigas {old_txt}")
+        if per_char[-1] > per_char[0] * LINEAR_SLACK:
+            print(f"      ❌ Não linear: {per_char[0] * 1e9:.0f} -> {per_char[-1] * 1e9:.0f} ns/char")
+            ok = False
+
+    if not ok:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
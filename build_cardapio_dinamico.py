@@ -1,21 +1,31 @@
 # build_cardapio_dinamico.py
 # -*- coding: utf-8 -*-
 import argparse
+import bisect
+import codecs
 import csv
+import itertools
 import json
+import os
 import re
 import sys
+import tempfile
 from pathlib import Path
 
+import font_metrics
+
 try:
     import win32com.client as win32
     import pythoncom  # ADICIONADO: necessário para CoInitialize
 except ImportError:
-    print("pywin32 não encontrado. Instale com: pip install pywin32")
-    sys.exit(1)
+    # Sem pywin32 (Linux/CI): só o backend "fake" fica disponível
+    win32 = None
+    pythoncom = None
 
-def get_corel_app(visible=True):
+def _get_com_corel_app(visible=True):
     """Inicializa CorelDRAW COM com suporte a multi-threading"""
+    if win32 is None:
+        raise RuntimeError("pywin32 não encontrado. Instale com: pip install pywin32")
     
     # CRÍTICO: Inicializar COM na thread atual
     try:
@@ -56,32 +66,123 @@ def get_corel_app(visible=True):
     
     raise RuntimeError("CorelDRAW COM indisponível. Verifique se o CorelDRAW está instalado.")
 
-PRICE_RE = re.compile(r"\s-\s*R\$\s*([\d\.,]+)\s*$", flags=re.IGNORECASE)
+def _get_fake_corel_app(visible=True):
+    """CorelDRAW falso em processo (ver fake_corel.py)"""
+    import fake_corel
+    return fake_corel.create_app(visible=visible)
 
-def parse_txt(txt_path: Path):
-    """Parse do arquivo TXT"""
-    text = txt_path.read_text(encoding="utf-8", errors="ignore")
-    lines = [ln.strip() for ln in text.splitlines()]
+# Backends disponíveis para get_corel_app (nome -> fábrica(visible=...))
+COREL_BACKENDS = {
+    "com": _get_com_corel_app,
+    "fake": _get_fake_corel_app,
+}
 
-    # Nome do restaurante após "RELATÓRIO DE PREÇOS"
-    restaurant = ""
-    for i, ln in enumerate(lines):
-        if "RELATÓRIO DE PREÇOS" in ln.upper():
-            parts = ln.split("RELATÓRIO DE PREÇOS", 1)
-            if len(parts) > 1:
-                candidate = parts[1].strip()
-                if candidate and not (candidate.startswith("*") and candidate.endswith("*")):
-                    restaurant = candidate
-                    break
-            
-            if not restaurant:
-                for j in range(i + 1, len(lines)):
-                    candidate = lines[j].strip()
-                    if candidate and not (candidate.startswith("*") and candidate.endswith("*")):
-                        restaurant = candidate
-                        break
+def register_corel_backend(name, factory):
+    """Registra um backend alternativo (fábrica recebe visible=...)"""
+    COREL_BACKENDS[name] = factory
+
+def current_backend():
+    """Backend configurado em CARDAPIO_COREL_BACKEND (padrão: com)"""
+    return os.environ.get("CARDAPIO_COREL_BACKEND", "com")
+
+def get_corel_app(visible=True, backend=None):
+    """
+    Inicializa o CorelDRAW pelo backend escolhido
+
+    backend: "com" (padrão, CorelDRAW real) ou "fake"; se None, usa a
+    variável de ambiente CARDAPIO_COREL_BACKEND
+    """
+    name = backend or current_backend()
+    factory = COREL_BACKENDS.get(name)
+    if factory is None:
+        raise RuntimeError(f"Backend CorelDRAW desconhecido: {name}")
+    return factory(visible=visible)
+
+REPORT_HEADER = "RELATÓRIO DE PREÇOS"
+
+PRICE_RE = re.compile(r"\s-\s*R\$\s*([\d\.,]+)\s*$", flags=re.IGNORECASE)
+
+READ_CHUNK = 64 * 1024
+
+def _read_chunks(source):
+    """Pedaços de um Path ou arquivo aberto (texto ou binário)"""
+    if isinstance(source, os.PathLike):
+        with open(source, "rb") as f:
+            yield from iter(lambda: f.read(READ_CHUNK), b"")
+        return
+    while True:
+        chunk = source.read(READ_CHUNK)
+        if not chunk:
             break
+        yield chunk
+
+def _chunk_lines(chunks):
+    """Linhas de um fluxo de pedaços (str ou bytes UTF-8) cortados em qualquer ponto"""
+    decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+    pending = ""
+    for chunk in chunks:
+        if not isinstance(chunk, str):
+            chunk = decoder.decode(bytes(chunk))
+        if not chunk:
+            continue
+        # Com o fim de linha (tirado no strip de iter_report_lines)
+        pieces = (pending + chunk).splitlines(keepends=True)
+        # Última linha incompleta (ou terminada em "\r", que pode ser metade
+        # de um "\r\n") espera o próximo pedaço
+        last = pieces[-1]
+        pending = pieces.pop() if last.endswith("\r") or last.splitlines()[0] == last else ""
+        yield from pieces
+    pending += decoder.decode(b"", final=True)
+    yield from pending.splitlines()
+
+def iter_report_lines(source):
+    """
+    Linhas (sem espaços nas pontas) de um relatório, sem carregar tudo
+
+    Aceita:
+    - texto (str) ou bytes
+    - Path ou arquivo aberto (texto ou binário), lido em pedaços
+    - iterável de linhas (str) ou de pedaços de bytes cortados em qualquer
+      ponto (ex: corpo de requisição em streaming)
+
+    Bytes são lidos como UTF-8, ignorando bytes inválidos.
+    """
+    if isinstance(source, str):
+        lines = source.splitlines()
+    elif isinstance(source, (bytes, bytearray, memoryview)):
+        lines = _chunk_lines([source])
+    elif isinstance(source, os.PathLike) or hasattr(source, "read"):
+        lines = _chunk_lines(_read_chunks(source))
+    else:
+        items = iter(source)
+        first = next(items, None)
+        if first is None:
+            return
+        items = itertools.chain([first], items)
+        if isinstance(first, str):
+            lines = (ln for item in items for ln in item.splitlines())
+        else:
+            lines = _chunk_lines(items)
+    for ln in lines:
+        yield ln.strip()
+
+def _menu(restaurant, categories, total_items):
+    return {
+        "restaurant": restaurant,
+        "model": "A" if total_items <= 30 else "B",
+        "total_items": total_items,
+        "categories": categories,
+    }
 
+def _parse_menus(lines, split):
+    """
+    Parse linha a linha; com split=True, cada "RELATÓRIO DE PREÇOS" depois
+    do primeiro fecha o cardápio atual e abre outro
+    """
+    restaurant = ""
+    # 0 = procurando o cabeçalho; 1 = cabeçalho sem nome, o nome é a próxima
+    # linha que não é categoria; 2 = resolvido
+    restaurant_state = 0
     categories = []
     current = None
     total_items = 0
@@ -89,7 +190,28 @@ def parse_txt(txt_path: Path):
     for ln in lines:
         if not ln:
             continue
-        if ln.startswith("*") and ln.endswith("*") and len(ln) >= 2:
+        is_category = ln.startswith("*") and ln.endswith("*") and len(ln) >= 2
+        is_header = REPORT_HEADER in ln.upper()
+
+        if split and is_header and restaurant_state != 0:
+            yield _menu(restaurant, categories, total_items)
+            restaurant, restaurant_state = "", 0
+            categories, current, total_items = [], None, 0
+
+        # Nome do restaurante após "RELATÓRIO DE PREÇOS" (mesma linha ou a seguinte)
+        if restaurant_state == 0 and is_header:
+            restaurant_state = 1
+            parts = ln.split(REPORT_HEADER, 1)
+            if len(parts) > 1:
+                candidate = parts[1].strip()
+                if candidate and not (candidate.startswith("*") and candidate.endswith("*")):
+                    restaurant = candidate
+                    restaurant_state = 2
+        elif restaurant_state == 1 and not is_category:
+            restaurant = ln
+            restaurant_state = 2
+
+        if is_category:
             cat_name = ln.strip("*").strip()
             current = {"category": cat_name, "items": []}
             categories.append(current)
@@ -104,13 +226,161 @@ def parse_txt(txt_path: Path):
                     current["items"].append({"name": name, "price": price})
                     total_items += 1
 
-    model = "A" if total_items <= 30 else "B"
-    return {
-        "restaurant": restaurant,
-        "model": model,
-        "total_items": total_items,
-        "categories": categories,
-    }
+    if not split or restaurant_state != 0 or categories:
+        yield _menu(restaurant, categories, total_items)
+
+def parse_txt(source):
+    """
+    Parse do relatório de preços em uma passada, linha a linha
+
+    Relatórios com vários restaurantes viram UM cardápio (nome do primeiro);
+    para separá-los, use iter_menus.
+
+    Args:
+        source: Path do TXT, texto, bytes, arquivo aberto ou iterável de
+            linhas/pedaços (ver iter_report_lines)
+    """
+    return next(_parse_menus(iter_report_lines(source), split=False))
+
+def iter_menus(source):
+    """
+    Um cardápio por restaurante de um relatório com vários cabeçalhos
+    "RELATÓRIO DE PREÇOS" concatenados
+
+    Gerador: cada cardápio sai assim que o próximo cabeçalho aparece, sem
+    ler o relatório inteiro. Linhas antes do primeiro cabeçalho ficam no
+    primeiro cardápio. Mesmas entradas que parse_txt.
+    """
+    return _parse_menus(iter_report_lines(source), split=True)
+
+def parse_text(text: str):
+    """Parse do conteúdo do relatório já em memória"""
+    return parse_txt(text)
+
+_DIGITS = "0123456789"
+# Próximo caractere que pode começar um token (espaço, *categoria*, R$, cabeçalho)
+_TOKEN_START_RE = re.compile(r"[\s*R]")
+
+def recover_report_lines(text: str) -> str:
+    """
+    Recupera as quebras de linha de um relatório que chegou em linha única
+
+    Tokenizador de uma passada só, linear no tamanho do texto (sem
+    backtracking, mesmo em entrada adversária), que reconhece:
+    - o cabeçalho "RELATÓRIO DE PREÇOS Nome" (linha própria)
+    - marcadores *categoria* (linha própria, com linha em branco antes
+      quando vinham separados por 2+ espaços, ou logo após o cabeçalho)
+    - preços "R$ 1.234,56": o item termina no preço
+
+    Returns:
+        Texto com uma linha por cabeçalho/categoria/item
+    """
+    n = len(text)
+    lines = []
+    cur = []
+    header_line = False  # ainda na linha do cabeçalho (antes da 1ª categoria)
+    star_cache = {}      # posição de '*' -> fim da categoria (ou -1)
+
+    def end_line(blank=False):
+        line = "".join(cur)
+        cur.clear()
+        # Nunca duas linhas em branco seguidas
+        if line or not lines or lines[-1]:
+            lines.append(line)
+        if blank and lines[-1]:
+            lines.append("")
+
+    def category_end(j):
+        # '*' seguido de 1+ caracteres que não são '*' e outro '*'
+        if j not in star_cache:
+            k = text.find("*", j + 1)
+            star_cache[j] = k if k > j + 1 else -1
+        return star_cache[j]
+
+    def category_at(j):
+        return j < n and text[j] == "*" and category_end(j) != -1
+
+    def skip_space(j):
+        while j < n and text[j].isspace():
+            j += 1
+        return j
+
+    def price_end(j):
+        # R$ <espaços> dígitos[.dígitos...] , dd  -> fim do preço ou -1
+        j = skip_space(j + 2)
+        if j >= n or text[j] not in _DIGITS:
+            return -1
+        while j < n and (text[j] in _DIGITS or text[j] == "."):
+            j += 1
+        if j + 3 <= n and text[j] == "," and text[j + 1] in _DIGITS and text[j + 2] in _DIGITS:
+            return j + 3
+        return -1
+
+    i = 0
+    while i < n:
+        m = _TOKEN_START_RE.search(text, i)
+        if m is None:
+            cur.append(text[i:])
+            break
+        j = m.start()
+        if j > i:
+            cur.append(text[i:j])
+            i = j
+        c = text[i]
+
+        if c.isspace():
+            j = skip_space(i)
+            newlines = text.count("\n", i, j)
+            if category_at(j) and (j - i >= 2 or header_line or newlines):
+                end_line(blank=True)
+                header_line = False
+            elif newlines:
+                end_line(blank=newlines >= 2)
+            else:
+                cur.append(text[i:j])
+            i = j
+
+        elif c == "*":
+            k = category_end(i)
+            if k == -1:
+                cur.append(c)
+                i += 1
+                continue
+            cur.append(text[i:k + 1])
+            i = k + 1
+            j = skip_space(i)
+            if j > i:
+                end_line(blank=j - i >= 2 and category_at(j))
+                header_line = False
+                i = j
+
+        elif text.startswith("R$", i):
+            k = price_end(i)
+            if k == -1:
+                cur.append("R$")
+                i += 2
+                continue
+            cur.append(text[i:k])
+            i = k
+            j = skip_space(i)
+            if j > i:
+                # Linha em branco antes da próxima *categoria* (2+ espaços)
+                # ou onde o texto já tinha uma
+                end_line(blank=text.count("\n", i, j) >= 2 or (j - i >= 2 and category_at(j)))
+                i = j
+
+        elif text.startswith(REPORT_HEADER, i):
+            cur.append(REPORT_HEADER)
+            header_line = True
+            i += len(REPORT_HEADER)
+
+        else:  # 'R' comum
+            cur.append(c)
+            i += 1
+
+    if cur:
+        end_line()
+    return "\n".join(lines)
 
 def flatten_with_headers(categories):
     """Achata categorias em lista sequencial"""
@@ -121,122 +391,408 @@ def flatten_with_headers(categories):
             flat.append({"type": "item", "name": it["name"], "price": it["price"]})
     return flat
 
-def split_two_columns_preserving_order(categories):
-    """Divide em 2 colunas preservando ordem"""
-    flat = flatten_with_headers(categories)
+# Entrelinha (múltiplo do tamanho da fonte), a mesma do pdf_renderer
+LINE_SPACING = 1.2
+
+def entry_heights(flat, font_size_pt):
+    """
+    Altura estimada (pt) de cada entrada, como compose_text_block monta o
+    texto: categoria em tamanho +1 com uma linha em branco antes, item em
+    uma linha. A linha em branco some quando a categoria abre a coluna.
+    """
+    item_h = font_size_pt * LINE_SPACING
+    cat_h = (font_size_pt + 1.0) * LINE_SPACING + item_h
+    return [cat_h if e["type"] == "cat" else item_h for e in flat]
+
+def _break_points(flat):
+    """
+    Onde uma coluna pode terminar: logo depois de um item ou no fim do
+    cardápio. Cabeçalhos seguidos (categorias vazias) e o primeiro item da
+    categoria seguinte formam um bloco só, que nunca é partido.
+    """
     n = len(flat)
-    mid = n // 2
-    if mid < n and flat[mid]["type"] == "item":
-        k = mid
-        while k > 0 and flat[k]["type"] != "cat":
-            k -= 1
-        if k > 0:
-            mid = k
-    col1 = flat[:mid]
-    col2 = flat[mid:]
-    if not col1:
-        col1, col2 = col2, col1
-    return col1, col2
-
-def calculate_char_width_for_frame(frame_width_units, font_size_pt, use_monospace=False):
-    """
-    Calcula quantos caracteres (aproximadamente) cabem na largura do frame
+    return [i for i in range(1, n) if flat[i - 1]["type"] != "cat"] + [n]
 
-    Args:
-        frame_width_units: Largura do frame em unidades do CorelDRAW (polegadas)
-        font_size_pt: Tamanho da fonte em pontos
-        use_monospace: Se True, usa cálculo para fonte monoespaçada
+def _column_end(flat, prefix, breaks, start, limit, blank):
+    """
+    Fim (exclusivo) da coluna que começa em `start`: o ponto de quebra
+    mais longe com altura <= limit (se nem o primeiro bloco cabe, a coluna
+    leva o bloco inteiro mesmo assim)
+    """
+    opening = blank if flat[start]["type"] == "cat" else 0.0
+    end = bisect.bisect_right(prefix, prefix[start] + opening + limit, lo=start) - 1
+    k = bisect.bisect_right(breaks, end) - 1
+    if k >= 0 and breaks[k] > start:
+        return breaks[k]
+    return breaks[bisect.bisect_right(breaks, start)]
+
+def _column_fits(flat, prefix, start, end, limit, blank):
+    """
+    Coluna start..end cabe em limit? Mesma conta de _column_end (nas somas
+    prefixadas), para o arredondamento não dar respostas diferentes
+    """
+    opening = blank if flat[start]["type"] == "cat" else 0.0
+    return prefix[end] <= prefix[start] + opening + limit
+
+def split_flat(flat, n_columns, font_size_pt=10.0):
+    """
+    Divide uma sequência achatada em N colunas, na ordem, equilibrando a altura
+
+    Minimiza a altura da coluna mais alta: busca binária sobre essa altura,
+    e cada teste acha os cortes por busca binária nas somas prefixadas das
+    alturas (O(colunas · log n)); o total fica linear no tamanho do
+    cardápio. Uma categoria pode continuar na coluna seguinte, mas o
+    cabeçalho nunca fica no fim de uma coluna separado do primeiro item
+    (nem de cabeçalhos seguidos, ver _break_points).
 
     Returns:
-        Número aproximado de caracteres que cabem na linha
+        Lista com N sequências (as últimas podem ficar vazias)
     """
-    # Conversões:
-    # 1 polegada = 72 pontos
+    n = len(flat)
+    if n_columns <= 1 or n == 0:
+        return [flat] + [[] for _ in range(max(n_columns, 1) - 1)]
+
+    heights = entry_heights(flat, font_size_pt)
+    prefix = list(itertools.accumulate(heights, initial=0.0))
+    breaks = _break_points(flat)
+    blank = font_size_pt * LINE_SPACING
+
+    def cuts_within(limit):
+        """Inícios das colunas 2..N com todas as colunas <= limit, ou None"""
+        cuts = []
+        start = 0
+        while True:
+            end = _column_end(flat, prefix, breaks, start, limit, blank)
+            if not _column_fits(flat, prefix, start, end, limit, blank):
+                return None
+            if end >= n:
+                return cuts
+            if len(cuts) == n_columns - 1:
+                return None
+            cuts.append(end)
+            start = end
+
+    lo = max(heights) - blank
+    hi = prefix[-1]
+    while hi - lo > 0.01:
+        mid = (lo + hi) / 2
+        if cuts_within(mid) is None:
+            lo = mid
+        else:
+            hi = mid
+    # hi = altura total sempre cabe (tudo na primeira coluna)
+    cuts = cuts_within(hi) or []
 
-    frame_width_points = frame_width_units * 72  # Converter para pontos
+    bounds = [0] + cuts + [n]
+    columns = [flat[a:b] for a, b in zip(bounds, bounds[1:])]
+    return columns + [[] for _ in range(n_columns - len(columns))]
 
-    if use_monospace:
-        # Courier New: largura ≈ 0.6 * font_size
-        avg_char_width_points = font_size_pt * 0.6
-    else:
-        # Arial (proporcional): largura média ≈ 0.5 * font_size
-        # Mas vamos usar 0.55 para ser mais conservador e evitar overflow
-        avg_char_width_points = font_size_pt * 0.55
+def split_columns(categories, n_columns, font_size_pt=10.0):
+    """Divide o cardápio em N colunas equilibradas (ver split_flat)"""
+    return split_flat(flatten_with_headers(categories), n_columns, font_size_pt)
 
-    chars_per_line = int(frame_width_points / avg_char_width_points)
+def frame_height_pt(frame, units_per_mm=1 / 25.4):
+    """Altura de um frame (left, bottom, right, top) em pontos"""
+    left, bottom, right, top = frame
+    return abs(top - bottom) / units_per_mm * 72.0 / 25.4
 
-    # Reduzir em 10% para margem de segurança
-    chars_per_line = int(chars_per_line * 0.9)
+def _flow_columns(flat, limits, font_size_pt):
+    """
+    Enche as colunas em sequência (limits = altura de cada frame da página,
+    repetida a cada página): uma busca binária nas somas prefixadas por
+    coluna, O(n + colunas · log n)
 
-    return chars_per_line
+    Returns:
+        Lista de (início, fim) de cada coluna usada
+    """
+    heights = entry_heights(flat, font_size_pt)
+    prefix = list(itertools.accumulate(heights, initial=0.0))
+    breaks = _break_points(flat)
+    blank = font_size_pt * LINE_SPACING
+    bounds = []
+    start = 0
+    while start < len(flat):
+        end = _column_end(flat, prefix, breaks, start, limits[len(bounds) % len(limits)], blank)
+        bounds.append((start, end))
+        start = end
+    return bounds
+
+def count_pages(categories, frames, font_size_pt, units_per_mm=1 / 25.4):
+    """Quantas páginas (cópias do template) o cardápio ocupa neste tamanho"""
+    flat = flatten_with_headers(categories)
+    limits = [frame_height_pt(f, units_per_mm) for f in frames]
+    return max(1, -(-len(_flow_columns(flat, limits, font_size_pt)) // len(frames)))
 
-def compose_text_block(seq, use_dots=True, target_width=50, debug=False):
+def paginate(categories, frames, font_size_pt, units_per_mm=1 / 25.4):
+    """
+    Distribui o cardápio pelas colunas de quantas páginas forem precisas
+
+    As páginas cheias são preenchidas em sequência, coluna a coluna, até a
+    altura do frame; a última página (ou a única) é equilibrada entre as
+    colunas com split_flat. Linear no tamanho do cardápio.
+
+    Returns:
+        Lista de páginas, cada uma com uma sequência por frame
+    """
+    flat = flatten_with_headers(categories)
+    n_columns = len(frames)
+    limits = [frame_height_pt(f, units_per_mm) for f in frames]
+    bounds = _flow_columns(flat, limits, font_size_pt)
+
+    n_pages = max(1, -(-len(bounds) // n_columns))
+    pages = [
+        [flat[a:b] for a, b in bounds[p * n_columns:(p + 1) * n_columns]]
+        for p in range(n_pages - 1)
+    ]
+    last_start = bounds[(n_pages - 1) * n_columns][0] if bounds else 0
+    pages.append(split_flat(flat[last_start:], n_columns, font_size_pt))
+    return pages
+
+# Folga (pt) entre o fim do preço e a borda do frame, contra arredondamentos
+# do CorelDRAW (kerning, hinting) que quebrariam a linha
+LINE_SLACK_PT = 1.0
+
+def frame_width_pt(frame, units_per_mm=1 / 25.4):
+    """Largura útil de um frame (left, bottom, right, top) em pontos"""
+    left, bottom, right, top = frame
+    return abs(right - left) / units_per_mm * 72.0 / 25.4 - LINE_SLACK_PT
+
+def compose_text_block(seq, width_pt, measure, use_dots=True, debug=False):
     """
     Compõe bloco de texto com categorias e itens
 
     Args:
         seq: Sequência de items e categorias
+        width_pt: Largura da linha em pontos (onde os preços terminam)
+        measure: Função texto -> largura em pontos na fonte/tamanho do
+            conteúdo (ex: font_metrics.get_metrics(...).width)
         use_dots: Se True, usa pontos para preencher espaço entre nome e preço
-        target_width: Largura alvo em caracteres para alinhar preços
         debug: Se True, imprime debug info
+
+    Returns:
+        dict com:
+        - text: bloco pronto para Story.Text (linhas separadas por \\r\\n)
+        - spans: trechos de categoria já com posição de caractere (1-based,
+          fim inclusivo) para negrito/tamanho, para que a formatação não
+          precise ler o texto de volta via COM
     """
     out = []
+    spans = []
 
-    # Encontrar o maior nome e maior preço para calcular espaçamento
     if use_dots:
-        max_name_length = 0
-        max_price_length = 0
-        item_count = 0
-        for e in seq:
-            if e["type"] == "item":
-                max_name_length = max(max_name_length, len(e['name']))
-                max_price_length = max(max_price_length, len(e['price']))
-                item_count += 1
-
+        dot_w = measure(".")
+        space_w = measure(" ")
         if debug:
-            print(f"    📊 DEBUG: target_width={target_width}, items={item_count}")
-            print(f"    📊 DEBUG: max_name_length={max_name_length}, max_price_length={max_price_length}")
+            items = sum(1 for e in seq if e["type"] == "item")
+            print(f"    📊 DEBUG: largura={width_pt:.1f}pt, items={items}, ponto={dot_w:.2f}pt")
 
+    char_pos = 0
     for e in seq:
         if e["type"] == "cat":
             if out and out[-1] != "":
                 out.append("")
-            out.append(e["text"].upper())
+                char_pos += 2
+            line = e["text"].upper()
+            if line:
+                spans.append({
+                    "start": char_pos + 1,
+                    "end": char_pos + len(line),
+                    "bold": True,
+                    "size_delta": 1.0,
+                })
+            out.append(line)
+            char_pos += len(line) + 2
         else:
             if use_dots:
-                # Calcular quantos pontos colocar entre nome e preço
                 name = e['name']
                 price = e['price']
 
-                # CRÍTICO: Todos os preços devem terminar na mesma posição
-                # Posição final = target_width
-                # Preço começa em: target_width - max_price_length
-                # Nome termina em: (preço começa) - (espaço) - (pontos mínimos)
-
-                # Espaço total disponível para nome + pontos (reservar espaço para o maior preço)
-                available_for_name_and_dots = target_width - max_price_length - 1  # -1 para espaço antes do preço
-
-                # Espaço usado pelo nome
-                name_length = len(name)
-
-                # Pontos necessários (mínimo 3)
-                dots_count = max(3, available_for_name_and_dots - name_length - 1)  # -1 para espaço depois do nome
-                dots = "." * dots_count
-
-                # Preencher o preço à direita para que todos tenham o mesmo comprimento
-                price_padded = price.rjust(max_price_length)
-
-                line = f"{name} {dots} {price_padded}"
+                # Pontos que cabem entre "nome " e " preço" para o preço
+                # terminar na borda da linha (sobra < largura de um ponto)
+                free = width_pt - measure(name) - measure(price) - 2 * space_w
+                dots_count = max(3, int(free // dot_w))
+                line = f"{name} {'.' * dots_count} {price}"
                 out.append(line)
+                char_pos += len(line) + 2
 
                 # Debug: mostrar primeira linha
                 if debug and len(out) <= 3:
-                    print(f"    📝 DEBUG linha {len(out)}: [{line}] (len={len(line)})")
+                    print(f"    📝 DEBUG linha {len(out)}: [{line}] ({measure(line):.1f}pt)")
             else:
                 # Fallback: usar tab (mas não funcionará sem TabStops)
-                out.append(f"{e['name']}\t{e['price']}")
+                line = f"{e['name']}\t{e['price']}"
+                out.append(line)
+                char_pos += len(line) + 2
+
+    return {"text": "\r\n".join(out), "spans": spans}
 
-    return "\r\n".join(out)
+def spans_from_text(text):
+    """
+    Recupera spans de categoria a partir de um texto já composto
+
+    Heurística antiga (linhas em MAIÚSCULO sem R$), só para textos que não
+    vieram de compose_text_block.
+    """
+    spans = []
+    char_pos = 0
+    for line in text.split("\r\n"):
+        if line and line.isupper() and "R$" not in line:
+            spans.append({
+                "start": char_pos + 1,
+                "end": char_pos + len(line),
+                "bold": True,
+                "size_delta": 1.0,
+            })
+        char_pos += len(line) + 2
+    return spans
+
+def apply_spans(text_range, spans, font_size_pt):
+    """Aplica negrito/tamanho nos spans (uma chamada Characters.Range por span)"""
+    for span in spans:
+        try:
+            rng = text_range.Characters.Range(span["start"], span["end"])
+            if span.get("bold"):
+                rng.Bold = True
+            if span.get("size_delta"):
+                rng.Size = float(font_size_pt + span["size_delta"])
+        except Exception:
+            pass
+
+def compose_columns(categories, frames, font_size_pt, debug=False, font_name="Arial",
+                    units_per_mm=1 / 25.4, linked=False):
+    """
+    Compõe o texto de cada frame (1 coluna no modelo A, 2 no modelo B), em
+    quantas páginas o cardápio precisar
+
+    Puro Python: devolve tudo o que os renderizadores precisam, sem COM.
+    Larguras medidas com as métricas da fonte instalada (font_metrics).
+
+    Args:
+        units_per_mm: Unidades do documento por mm (frames em polegadas
+            por padrão)
+        linked: Caixas vinculadas (ver link_text_frame): o texto inteiro vai
+            no primeiro frame, na largura do mais estreito, e o CorelDRAW o
+            distribui pelos demais; sem divisão em colunas no Python
+
+    Returns:
+        Lista de dicts {"page", "frame", "width_pt", "seq", "text", "spans",
+        "linked"}, um por frame de cada página (paginate); page começa em 1.
+        linked=True: frame que continua o texto do anterior (seq, text e
+        spans vazios)
+    """
+    metrics = font_metrics.get_metrics(font_name)
+
+    def measure(text):
+        return metrics.width(text, font_size_pt)
+
+    if linked:
+        return _compose_linked(categories, frames, font_size_pt, measure, debug, units_per_mm)
+
+    pages = paginate(categories, frames, font_size_pt, units_per_mm)
+
+    columns = []
+    for page_index, seqs in enumerate(pages, 1):
+        for frame, seq in zip(frames, seqs):
+            width_pt = frame_width_pt(frame, units_per_mm)
+            block = compose_text_block(seq, width_pt, measure, use_dots=True, debug=debug and page_index == 1)
+            columns.append({
+                "page": page_index,
+                "frame": tuple(frame),
+                "width_pt": width_pt,
+                "seq": seq,
+                "text": block["text"],
+                "spans": block["spans"],
+                "linked": False,
+            })
+    return columns
+
+def linked_flow_frames(frames, font_size_pt, units_per_mm=1 / 25.4):
+    """
+    Frames para contar as páginas de caixas vinculadas: uma linha mais baixos
+
+    O fluxo do CorelDRAW não pula a linha em branco no topo da coluna nem
+    segura o cabeçalho com o item; com a linha de folga o texto não
+    transborda do último frame.
+    """
+    leading = font_size_pt * LINE_SPACING / 72.0 * 25.4 * units_per_mm
+    return [(left, bottom, right, top - leading) for left, bottom, right, top in frames]
+
+def _compose_linked(categories, frames, font_size_pt, measure, debug, units_per_mm):
+    """Colunas de compose_columns(linked=True)"""
+    seq = flatten_with_headers(categories)
+    width_pt = min(frame_width_pt(f, units_per_mm) for f in frames)
+    block = compose_text_block(seq, width_pt, measure, use_dots=True, debug=debug)
+
+    n_pages = count_pages(categories, linked_flow_frames(frames, font_size_pt, units_per_mm),
+                          font_size_pt, units_per_mm)
+
+    columns = [
+        {
+            "page": page_index,
+            "frame": tuple(frame),
+            "width_pt": width_pt,
+            "seq": [],
+            "text": "",
+            "spans": [],
+            "linked": True,
+        }
+        for page_index in range(1, n_pages + 1)
+        for frame in frames
+    ]
+    columns[0].update(seq=seq, text=block["text"], spans=block["spans"], linked=False)
+    return columns
+
+def menu_structure(data):
+    """Tudo do cardápio menos os preços (título, modelo, categorias e nomes)"""
+    return (
+        data["restaurant"],
+        data["model"],
+        [(c["category"], [it["name"] for it in c["items"]]) for c in data["categories"]],
+    )
+
+def price_patches(old_columns, new_columns):
+    """
+    Trechos de texto que levam as colunas antigas às novas
+
+    Só vale quando as linhas mudam no lugar (mesmas colunas, linhas e
+    categorias, e cada linha alterada com o mesmo comprimento): assim as
+    posições de todo o resto da story continuam as mesmas. Linhas alteradas
+    vizinhas viram um único trecho.
+
+    Returns:
+        Uma lista por coluna de (início, fim, texto novo), posições 1-based
+        com fim inclusivo (como os spans); None se for preciso refazer tudo
+    """
+    if len(old_columns) != len(new_columns):
+        return None
+
+    patches = []
+    for old_col, new_col in zip(old_columns, new_columns):
+        if old_col["spans"] != new_col["spans"]:
+            return None
+        old_lines = old_col["text"].split("\r\n")
+        new_lines = new_col["text"].split("\r\n")
+        if len(old_lines) != len(new_lines):
+            return None
+
+        ranges = []
+        run = None  # [início, fim, linhas novas] do bloco alterado atual
+        char_pos = 0
+        for old_line, new_line in zip(old_lines, new_lines):
+            if old_line != new_line:
+                if len(old_line) != len(new_line):
+                    return None
+                if run is None:
+                    run = [char_pos + 1, char_pos + len(old_line), [new_line]]
+                    ranges.append(run)
+                else:
+                    run[1] = char_pos + len(old_line)
+                    run[2].append(new_line)
+            else:
+                run = None
+            char_pos += len(old_line) + 2
+        patches.append([(start, end, "\r\n".join(lines)) for start, end, lines in ranges])
+    return patches
 
 def to_units(doc, value_mm):
     """Converte mm para unidades do documento"""
@@ -246,26 +802,22 @@ def to_units(doc, value_mm):
     except Exception:
         return float(value_mm * 0.0393701)
 
-def ensure_area_frames(page, doc, model):
-    """Calcula áreas para caixas de texto"""
-    try:
-        pw = float(page.SizeWidth)
-        ph = float(page.SizeHeight)
-    except Exception:
-        pw, ph = 8.27, 11.69
+def compute_area_frames(pw, ph, units_per_mm, model):
+    """
+    Calcula áreas para caixas de texto (puro Python, sem COM)
 
+    Args:
+        pw, ph: Largura/altura da página em unidades do documento
+        units_per_mm: Quantas unidades do documento valem 1 mm
+        model: "A" (1 coluna) ou "B" (2 colunas)
+    """
     margin_mm = 12.0
     header_mm = 40.0
     gutter_mm = 8.0
 
-    if pw < 20:
-        margin = margin_mm / 25.4
-        header = header_mm / 25.4
-        gutter = gutter_mm / 25.4
-    else:
-        margin = to_units(doc, margin_mm)
-        header = to_units(doc, header_mm)
-        gutter = to_units(doc, gutter_mm)
+    margin = margin_mm * units_per_mm
+    header = header_mm * units_per_mm
+    gutter = gutter_mm * units_per_mm
 
     left = margin
     right = pw - margin
@@ -282,10 +834,293 @@ def ensure_area_frames(page, doc, model):
         col_w = (right - left - gutter) / 2.0
         frames.append((left, bottom, left + col_w, top))
         frames.append((left + col_w + gutter, bottom, right, top))
-    
+
     return frames
 
-def create_paragraph_text(layer, x1, y1, x2, y2):
+def ensure_area_frames(page, doc, model, metadata=None):
+    """Calcula áreas para caixas de texto (sem COM quando há metadata do template)"""
+    if metadata is not None:
+        return [tuple(f) for f in metadata["frames"][model]]
+
+    try:
+        pw = float(page.SizeWidth)
+        ph = float(page.SizeHeight)
+    except Exception:
+        pw, ph = 8.27, 11.69
+
+    if pw < 20:
+        units_per_mm = 1 / 25.4
+    else:
+        units_per_mm = to_units(doc, 1.0)
+
+    return compute_area_frames(pw, ph, units_per_mm, model)
+
+TEMPLATE_META_VERSION = 1
+
+# Sidecars ficam fora do repositório (templates/ é versionado), um por
+# template + backend + hash: fake e com não sobrescrevem um ao outro
+TEMPLATE_META_DIR = Path(os.environ.get(
+    "CARDAPIO_TEMPLATE_META_DIR", str(Path(tempfile.gettempdir()) / "cardapio_template_meta")
+))
+
+def template_metadata_path(tpl_path, backend=None):
+    """Sidecar JSON do template (tplA.cdr -> <TEMPLATE_META_DIR>/tplA.<backend>.<sha>.json)"""
+    from template_cache import template_hash
+
+    tpl_path = Path(tpl_path)
+    backend = backend or current_backend()
+    return TEMPLATE_META_DIR / f"{tpl_path.stem}.{backend}.{template_hash(tpl_path)[:16]}.json"
+
+def compile_template_metadata(doc, tpl_path):
+    """
+    Extrai a geometria constante do template e grava o sidecar JSON
+
+    Faz as consultas COM (tamanho da página, fator de unidade) uma única vez;
+    depois disso frames e posição do título são calculados em Python puro.
+    """
+    from template_cache import template_hash
+
+    page = doc.ActivePage
+    try:
+        pw = float(page.SizeWidth)
+        ph = float(page.SizeHeight)
+    except Exception:
+        pw, ph = 8.27, 11.69
+
+    if pw < 20:
+        units_per_mm = 1 / 25.4
+    else:
+        units_per_mm = to_units(doc, 1.0)
+
+    meta = {
+        "version": TEMPLATE_META_VERSION,
+        "template": Path(tpl_path).name,
+        "sha256": template_hash(tpl_path),
+        "backend": current_backend(),
+        "page_width": pw,
+        "page_height": ph,
+        "units_per_mm": units_per_mm,
+        "frames": {
+            model: [list(f) for f in compute_area_frames(pw, ph, units_per_mm, model)]
+            for model in ("A", "B")
+        },
+        "title": {"x": pw / 2.0, "y": ph - 1.0},
+    }
+    meta_path = template_metadata_path(tpl_path)
+    meta_path.parent.mkdir(parents=True, exist_ok=True)
+    meta_path.write_text(json.dumps(meta, ensure_ascii=False, indent=2), encoding="utf-8")
+    return meta
+
+def load_template_metadata(tpl_path):
+    """
+    Lê o sidecar JSON do template
+
+    Returns:
+        dict com a metadata, ou None se não existir ou estiver desatualizado
+        (hash do .cdr diferente do registrado)
+    """
+    from template_cache import template_hash
+
+    try:
+        meta_path = template_metadata_path(tpl_path)
+    except OSError:  # template ausente
+        return None
+    if not meta_path.exists():
+        return None
+    try:
+        meta = json.loads(meta_path.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return None
+    if meta.get("version") != TEMPLATE_META_VERSION:
+        return None
+    # Geometria extraída pelo backend fake não vale para o CorelDRAW real
+    if meta.get("backend", "com") != current_backend():
+        return None
+    try:
+        if meta.get("sha256") != template_hash(tpl_path):
+            return None
+    except OSError:
+        return None
+    return meta
+
+# ==================== AJUSTE DE TAMANHO ====================
+
+FIT_MIN_SIZE_PT = 6.0
+FIT_STEP_PT = 0.5
+
+def lines_fit_width(categories, frames, font_size_pt, font_name="Arial", units_per_mm=1 / 25.4):
+    """
+    Se toda linha cabe na largura do frame mais estreito neste tamanho
+    (nome + 3 pontos + preço; categoria em negrito)
+    """
+    regular = font_metrics.get_metrics(font_name)
+    bold = font_metrics.get_metrics(font_name, bold=True)
+    width_pt = min(frame_width_pt(f, units_per_mm) for f in frames)
+    for c in categories:
+        if bold.width(c["category"].upper(), font_size_pt + 1.0) > width_pt:
+            return False
+        for it in c["items"]:
+            if regular.width(f"{it['name']} ... {it['price']}", font_size_pt) > width_pt:
+                return False
+    return True
+
+def template_layouts(tplA, tplB):
+    """
+    Frames de cada modelo para o ajuste, sem COM
+
+    Returns:
+        dict modelo -> (frames, unidades por mm), do sidecar do template ou,
+        sem ele, de uma página A4 em polegadas
+    """
+    layouts = {}
+    for model, tpl in (("A", tplA), ("B", tplB)):
+        meta = load_template_metadata(tpl)
+        if meta is not None:
+            layouts[model] = ([tuple(f) for f in meta["frames"][model]], meta["units_per_mm"])
+        else:
+            layouts[model] = (compute_area_frames(8.27, 11.69, 1 / 25.4, model), 1 / 25.4)
+    return layouts
+
+def fit_layout(categories, layouts, font_name="Arial", max_size_pt=10.0,
+               min_size_pt=FIT_MIN_SIZE_PT, linked=False):
+    """
+    Modelo, tamanho de fonte (até max_size_pt) e número de páginas
+
+    Primeiro o menor número de páginas possível (no tamanho mínimo), depois
+    o maior tamanho que mantém esse número: busca binária nos tamanhos de
+    min a max (passos de FIT_STEP_PT) para cada modelo, com métricas
+    offline. Empate fica com menos colunas.
+
+    Args:
+        layouts: dict modelo -> (frames, unidades por mm) (template_layouts)
+        linked: Páginas contadas como em compose_columns(linked=True)
+
+    Returns:
+        (modelo, tamanho, páginas, cabe): tamanho sempre entre min e max;
+        cabe=False se alguma linha não cabe na largura nem no tamanho mínimo
+        (então o modelo com menos páginas, no tamanho mínimo)
+    """
+    # Teto abaixo do mínimo: o tamanho pedido prevalece
+    min_size_pt = min(min_size_pt, max_size_pt)
+    steps = int((max_size_pt - min_size_pt) / FIT_STEP_PT) + 1
+    sizes = [s for s in (min_size_pt + k * FIT_STEP_PT for k in range(steps)) if s <= max_size_pt]
+    if sizes[-1] < max_size_pt:
+        sizes.append(max_size_pt)
+    models = sorted(layouts, key=lambda m: len(layouts[m][0]))
+
+    def count_at(model, size):
+        frames, units_per_mm = layouts[model]
+        if linked:
+            frames = linked_flow_frames(frames, size, units_per_mm)
+        return count_pages(categories, frames, size, units_per_mm)
+
+    def pages_at(model, size):
+        frames, units_per_mm = layouts[model]
+        if not lines_fit_width(categories, frames, size, font_name, units_per_mm):
+            return None
+        return count_at(model, size)
+
+    at_min = {m: pages_at(m, sizes[0]) for m in models}
+    candidates = [m for m in models if at_min[m] is not None]
+    if not candidates:
+        pages = {m: count_at(m, sizes[0]) for m in models}
+        model = min(models, key=pages.get)
+        return model, sizes[0], pages[model], False
+
+    n_pages = min(at_min[m] for m in candidates)
+    best = None
+    for model in candidates:
+        if at_min[model] != n_pages:
+            continue
+
+        def fits(size):
+            pages = pages_at(model, size)
+            return pages is not None and pages <= n_pages
+
+        lo, hi = 0, len(sizes) - 1
+        if best is not None:
+            # Só interessa se ficar maior que o melhor até aqui
+            lo = sizes.index(best[1]) + 1
+            if lo > hi or not fits(sizes[lo]):
+                continue
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if fits(sizes[mid]):
+                lo = mid
+            else:
+                hi = mid - 1
+        best = (model, sizes[lo])
+        if lo == len(sizes) - 1:
+            break
+
+    return best[0], best[1], n_pages, True
+
+def title_position(page, metadata=None):
+    """Centro horizontal e linha de base do título (sem COM quando há metadata)"""
+    if metadata is not None:
+        return metadata["title"]["x"], metadata["title"]["y"]
+    return float(page.SizeWidth) / 2.0, float(page.SizeHeight) - 1.0
+
+def create_title(layer, text, title_x, title_y, font_name="Arial", font_size_pt=24.0):
+    """Cria o título (texto artístico em negrito) centralizado em title_x"""
+    title_shape = layer.CreateArtisticText(0.0, float(title_y), str(text))
+    title_shape.Text.Story.Font = str(font_name)
+    title_shape.Text.Story.Size = float(font_size_pt)
+    title_shape.Text.Story.Bold = True
+
+    try:
+        title_shape.Text.Story.Fill.UniformColor.CMYKAssign(0, 0, 0, 100)
+    except Exception:
+        pass
+
+    try:
+        text_width = float(title_shape.SizeWidth)
+        title_shape.LeftX = title_x - (text_width / 2.0)
+    except Exception:
+        pass
+
+    return title_shape
+
+def add_pages(doc, count):
+    """
+    Deixa o documento com `count` páginas, as novas cópias da primeira
+    (mesmo tamanho e shapes do template); chamar antes de criar os textos
+
+    As páginas entram de uma vez (um AddPages); depois, uma cópia das
+    shapes do template por página nova.
+
+    Returns:
+        Lista das páginas, da 1 a count
+    """
+    first = doc.Pages.Item(1)
+    if count > 1:
+        width, height = float(first.SizeWidth), float(first.SizeHeight)
+        template_shapes = first.Shapes.All()
+        doc.AddPages(count - 1)
+        for index in range(2, count + 1):
+            page = doc.Pages.Item(index)
+            page.SetSize(width, height)
+            if template_shapes.Count:
+                template_shapes.CopyToLayer(page.ActiveLayer)
+    return [first] + [doc.Pages.Item(i) for i in range(2, count + 1)]
+
+def link_text_frame(shape, next_shape):
+    """
+    Vincula next_shape à caixa de parágrafo shape: o texto que não cabe em
+    shape continua em next_shape (mesma story, fluxo feito pelo CorelDRAW)
+    """
+    shape.Text.Frame.LinkTo(next_shape)
+
+def column_shape_name(index):
+    """
+    Nome da caixa de texto da coluna `index` (1-based) no CDR gerado
+
+    Permite reencontrar a caixa (Shapes.FindShape) para atualizar só os
+    preços em um reprocessamento, sem refazer o documento.
+    """
+    return f"CardapioCol{index}"
+
+def create_paragraph_text(layer, x1, y1, x2, y2, name=None):
     """Cria caixa de texto de parágrafo com configuração inicial"""
     try:
         left = min(float(x1), float(x2))
@@ -295,6 +1130,12 @@ def create_paragraph_text(layer, x1, y1, x2, y2):
 
         shape = layer.CreateParagraphText(left, bottom, right, top, "")
 
+        if name:
+            try:
+                shape.Name = name
+            except Exception:
+                pass
+
         # CRÍTICO: Desabilitar FitToFrame IMEDIATAMENTE após criação
         # Isso evita que o CorelDRAW ajuste automaticamente o texto
         try:
@@ -313,8 +1154,13 @@ def create_paragraph_text(layer, x1, y1, x2, y2):
         print(f"    ❌ ERRO ao criar caixa: {e}")
         raise
 
-def apply_text_style_and_tabs(doc, shape, font_name="Arial", font_size_pt=10.0, right_tab_margin_mm=3.0):
-    """Aplica estilo simplificado usando apenas propriedades que funcionam"""
+def apply_text_style_and_tabs(doc, shape, font_name="Arial", font_size_pt=10.0, right_tab_margin_mm=3.0, spans=None):
+    """
+    Aplica estilo simplificado usando apenas propriedades que funcionam
+
+    spans: saída de compose_text_block; se None, o texto é lido de volta
+    via COM para adivinhar as categorias (modo antigo)
+    """
     try:
         tr = shape.Text.Story
 
@@ -345,19 +1191,9 @@ def apply_text_style_and_tabs(doc, shape, font_name="Arial", font_size_pt=10.0,
 
         # Negrito para categorias
         try:
-            text = tr.Text
-            lines = text.split('\r\n')
-            char_pos = 0
-            for line in lines:
-                if line and line.isupper() and 'R$' not in line:
-                    start = char_pos + 1
-                    end = start + len(line) - 1
-                    try:
-                        tr.Characters.Range(start, end).Bold = True
-                        tr.Characters.Range(start, end).Size = float(font_size_pt + 1)
-                    except Exception:
-                        pass
-                char_pos += len(line) + 2
+            if spans is None:
+                spans = spans_from_text(tr.Text)
+            apply_spans(tr, spans, font_size_pt)
         except Exception as e:
             print(f"    ⚠ Negrito falhou: {e}")
 
@@ -396,52 +1232,341 @@ def write_auditoria(outdir: Path, data):
 
 def cleanup_com():
     """Finaliza COM na thread atual"""
+    if pythoncom is None:
+        return
     try:
         pythoncom.CoUninitialize()
     except Exception:
         pass
 
+def render_document(doc, data, meta, font_name="Arial", font_size_pt=10.0, debug=True, linked=False):
+    """
+    Desenha título e colunas do cardápio em um documento já limpo
+
+    linked: caixas vinculadas, com o texto distribuído pelo CorelDRAW (ver
+    compose_columns)
+
+    Returns:
+        Número de shapes criadas
+    """
+    page = doc.ActivePage
+
+    # Criar conteúdo
+    print("   📝 Criando conteúdo do cardápio...")
+    frames = ensure_area_frames(page, doc, data["model"], metadata=meta)
+
+    print(f"   📄 Modelo {data['model']}: {len(frames)} coluna(s)")
+    print("   📝 Gerando texto (com debug)...")
+    columns = compose_columns(data["categories"], frames, font_size_pt, debug=debug, font_name=font_name,
+                              linked=linked)
+
+    # Páginas extras antes de qualquer texto: são cópias do template
+    n_pages = max(col["page"] for col in columns)
+    pages = add_pages(doc, n_pages)
+    if n_pages > 1:
+        print(f"   📑 {n_pages} páginas")
+
+    shapes_before = sum(p.Shapes.Count for p in pages)
+    print(f"   📊 Shapes antes: {shapes_before}")
+
+    # Criar título (em todas as páginas)
+    try:
+        title_x, title_y = title_position(page, meta)
+        for p in pages:
+            create_title(p.ActiveLayer, data["restaurant"], title_x, title_y, font_name="Arial")
+    except Exception as e:
+        print(f"   ❌ Erro ao criar título: {e}")
+
+    for i, col in enumerate(columns, 1):
+        left, bottom, right, top = col["frame"]
+        print(f"   📏 Coluna {i} (página {col['page']}): {abs(right - left):.2f} unidades = {col['width_pt']:.1f}pt")
+        layer = pages[col["page"] - 1].ActiveLayer
+        shp = create_paragraph_text(layer, left, bottom, right, top, name=column_shape_name(i))
+        if col["linked"]:
+            # Continuação da caixa anterior: texto e estilo já vêm da story
+            link_text_frame(prev, shp)
+        else:
+            fill_paragraph(shp, col["text"])
+            apply_text_style_and_tabs(doc, shp, font_name=font_name, font_size_pt=font_size_pt, spans=col["spans"])
+        prev = shp
+
+    shapes_after = sum(p.Shapes.Count for p in pages)
+    shapes_created = shapes_after - shapes_before
+    print(f"   📊 Shapes depois: {shapes_after}")
+    print(f"   ✅ {shapes_created} shapes criadas")
+    return shapes_created
+
+def export_document(doc, outdir: Path):
+    """
+    Exporta CDR, PDF e PNG do documento para outdir
+
+    Returns:
+        dict tipo -> nome do arquivo, só com os formatos salvos
+    """
+    out_cdr = outdir / "cardapio_output.cdr"
+    out_pdf = outdir / "cardapio_output.pdf"
+    out_png = outdir / "cardapio_output.png"
+    saved = {}
+
+    print("\n   💾 Salvando arquivos...")
+
+    try:
+        cdr_path = os.path.abspath(str(out_cdr))
+        print(f"   🔍 Exportando CDR para: {cdr_path}")
+
+        # Tentar exportar como CDR (mais confiável)
+        try:
+            doc.Export(cdr_path, 48, 0)  # 48 = cdrCDR
+            print(f"   ✅ CDR: {out_cdr.name}")
+        except Exception as e1:
+            print(f"   ⚠ Export falhou: {e1}")
+            # Fallback: tentar SaveAs
+            doc.SaveAs(cdr_path)
+            print(f"   ✅ CDR: {out_cdr.name} (via SaveAs)")
+        saved["cdr"] = out_cdr.name
+    except Exception as e:
+        print(f"   ⚠ CDR: {e}")
+
+    try:
+        pdf_path = os.path.abspath(str(out_pdf))
+        print(f"   🔍 Gerando PDF em: {pdf_path}")
+        doc.PublishToPDF(pdf_path)
+        print(f"   ✅ PDF: {out_pdf.name}")
+        saved["pdf"] = out_pdf.name
+    except Exception as e:
+        print(f"   ⚠ PDF: {e}")
+
+    try:
+        png_path = os.path.abspath(str(out_png))
+        print(f"   🔍 Exportando PNG em: {png_path}")
+        doc.Export(png_path, 13, 1)
+        print(f"   ✅ PNG: {out_png.name}")
+        saved["png"] = out_png.name
+    except Exception as e:
+        print(f"   ⚠ PNG: {e}")
+
+    return saved
+
+def _parse_input(path_str):
+    """Parse de um arquivo para o pool de processos (modo --input-dir)"""
+    try:
+        return path_str, parse_txt(Path(path_str)), None
+    except Exception as e:
+        return path_str, None, f"{type(e).__name__}: {e}"
+
+def load_manifest(manifest_path: Path):
+    """
+    Lê o manifesto JSONL de um processamento em lote
+
+    Returns:
+        dict input -> último registro daquele input
+    """
+    entries = {}
+    if not manifest_path.exists():
+        return entries
+    with manifest_path.open("r", encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # linha truncada por interrupção
+            entries[rec["input"]] = rec
+    return entries
+
+def append_manifest(manifest_path: Path, record):
+    """Acrescenta um registro ao manifesto e força a gravação em disco"""
+    with manifest_path.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(record, ensure_ascii=False) + "\n")
+        f.flush()
+        os.fsync(f.fileno())
+
+def _input_signature(path: Path):
+    st = path.stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+def run_directory(args, tplA: Path, tplB: Path, outdir: Path):
+    """
+    Modo --input-dir: parse em paralelo (processos) e renderização de todos
+    os cardápios em UMA instância CorelDRAW
+
+    O progresso vai para um manifesto JSONL; rodar de novo pula os arquivos
+    já concluídos (mesmo tamanho/mtime) e tenta de novo os que falharam.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+    from datetime import datetime
+
+    from template_cache import TemplateCache
+
+    in_dir = Path(args.input_dir).resolve()
+    if not in_dir.is_dir():
+        print(f"❌ Pasta de entrada não encontrada: {in_dir}")
+        sys.exit(2)
+
+    manifest_path = Path(args.manifest).resolve() if args.manifest else outdir / "manifest.jsonl"
+    done = load_manifest(manifest_path)
+    # Última linha truncada por uma interrupção: fechá-la antes de acrescentar
+    if manifest_path.exists() and manifest_path.stat().st_size:
+        with manifest_path.open("rb+") as f:
+            f.seek(-1, os.SEEK_END)
+            if f.read(1) != b"\n":
+                f.write(b"\n")
+
+    inputs = sorted(p for p in in_dir.glob(args.pattern) if p.is_file())
+    pending = []
+    for path in inputs:
+        key = path.relative_to(in_dir).as_posix()
+        rec = done.get(key)
+        if rec and rec.get("status") == "done" and {
+            "size": rec.get("size"), "mtime_ns": rec.get("mtime_ns")
+        } == _input_signature(path):
+            continue
+        pending.append(path)
+
+    print("=" * 60)
+    print("🚀 GERAÇÃO EM LOTE")
+    print("=" * 60)
+    print(f"   📂 Entradas: {len(inputs)} | já concluídas: {len(inputs) - len(pending)} | a fazer: {len(pending)}")
+    print(f"   🧾 Manifesto: {manifest_path}")
+    if not pending:
+        print("\n✅ Nada a fazer")
+        return
+
+    corel = get_corel_app(visible=False, backend=args.backend)
+    print("   ✅ CorelDRAW inicializado")
+    templates = TemplateCache()
+    layouts = template_layouts(tplA, tplB)
+
+    ok = failed = 0
+    executor = ProcessPoolExecutor(max_workers=args.workers) if args.workers > 1 else None
+    try:
+        results = (executor.map(_parse_input, [str(p) for p in pending], chunksize=8)
+                   if executor else map(_parse_input, [str(p) for p in pending]))
+
+        for n, (path_str, data, error) in enumerate(results, 1):
+            path = Path(path_str)
+            key = path.relative_to(in_dir).as_posix()
+            menu_out = outdir / path.relative_to(in_dir).with_suffix("")
+            record = {"input": key, **_input_signature(path), "outdir": str(menu_out)}
+            print(f"\n[{n}/{len(pending)}] {key}")
+
+            doc = None
+            try:
+                if error:
+                    raise RuntimeError(f"Parse falhou: {error}")
+                if data["total_items"] == 0:
+                    raise RuntimeError("Nenhum item com preço encontrado")
+                model, size, n_pages, fits = fit_layout(data["categories"], layouts, args.font, args.size,
+                                                        linked=args.linked)
+                data = dict(data, model=model)
+                if not fits:
+                    print(f"   ⚠ Linhas mais largas que a coluna nem com fonte {size}pt")
+                menu_out.mkdir(parents=True, exist_ok=True)
+                write_auditoria(menu_out, data)
+
+                tpl = str(tplA if data["model"] == "A" else tplB)
+                doc = templates.checkout(corel, tpl)
+                meta = templates.metadata(tpl)
+                render_document(doc, data, meta, args.font, size, debug=False, linked=args.linked)
+                files = export_document(doc, menu_out)
+                if "pdf" not in files and "cdr" not in files:
+                    raise RuntimeError("Nenhum arquivo exportado")
+                record.update(status="done", files=files, restaurant=data["restaurant"])
+                ok += 1
+            except Exception as e:
+                print(f"   ❌ {e}")
+                record.update(status="failed", error=str(e))
+                failed += 1
+            finally:
+                if doc is not None:
+                    try:
+                        doc.Close()
+                    except Exception:
+                        pass
+
+            record["at"] = datetime.now().isoformat()
+            append_manifest(manifest_path, record)
+    except KeyboardInterrupt:
+        print("\n⏸️  Interrompido: rode o mesmo comando para continuar de onde parou")
+    finally:
+        if executor:
+            executor.shutdown(cancel_futures=True)
+        templates.invalidate()
+        try:
+            corel.Quit()
+            print("   ✅ CorelDRAW fechado")
+        except Exception:
+            pass
+        cleanup_com()
+
+    print(f"\n✅ CONCLUÍDO: {ok} ok, {failed} com falha")
+
 def main():
     ap = argparse.ArgumentParser()
-    ap.add_argument("--input", required=True, help="Caminho do teste_input.txt")
+    src = ap.add_mutually_exclusive_group(required=True)
+    src.add_argument("--input", help="Caminho do teste_input.txt")
+    src.add_argument("--input-dir", help="Pasta com vários TXT (modo lote)")
     ap.add_argument("--tplA", required=True, help="Modelo A (CDR, 1 coluna)")
     ap.add_argument("--tplB", required=True, help="Modelo B (CDR, 2 colunas)")
     ap.add_argument("--outdir", required=True, help="Pasta de saída")
     ap.add_argument("--font", default="Arial", help="Fonte para o conteúdo")
-    ap.add_argument("--size", type=float, default=10.0, help="Tamanho da fonte (pt)")
+    ap.add_argument("--size", type=float, default=10.0,
+                    help="Tamanho máximo da fonte (pt); diminui até o cardápio caber")
+    ap.add_argument("--linked", action="store_true",
+                    help="Caixas de texto vinculadas: o CorelDRAW distribui o texto entre as colunas")
+    ap.add_argument("--backend", default=None, choices=sorted(COREL_BACKENDS),
+                    help="Backend CorelDRAW (padrão: $CARDAPIO_COREL_BACKEND ou com)")
+    ap.add_argument("--pattern", default="*.txt", help="Glob dos arquivos em --input-dir")
+    ap.add_argument("--workers", type=int, default=os.cpu_count() or 1,
+                    help="Processos para o parse em --input-dir")
+    ap.add_argument("--manifest", default=None,
+                    help="Manifesto de progresso (padrão: <outdir>/manifest.jsonl)")
     args = ap.parse_args()
 
-    in_path = Path(args.input).resolve()
     tplA = Path(args.tplA).resolve()
     tplB = Path(args.tplB).resolve()
     outdir = Path(args.outdir).resolve()
     outdir.mkdir(parents=True, exist_ok=True)
 
-    if not in_path.exists():
-        print(f"❌ Input não encontrado: {in_path}")
-        sys.exit(2)
     if not tplA.exists() or not tplB.exists():
         print("❌ Modelos CDR não encontrados (tplA/tplB).")
         sys.exit(3)
 
+    if args.input_dir:
+        run_directory(args, tplA, tplB, outdir)
+        return
+
+    in_path = Path(args.input).resolve()
+    if not in_path.exists():
+        print(f"❌ Input não encontrado: {in_path}")
+        sys.exit(2)
+
     print("=" * 60)
     print("🚀 INICIANDO GERAÇÃO DE CARDÁPIO")
     print("=" * 60)
 
     data = parse_txt(in_path)
+    # Maior fonte (até --size) e modelo em que o cardápio cabe
+    model, size, n_pages, fits = fit_layout(data["categories"], template_layouts(tplA, tplB), args.font, args.size,
+                                            linked=args.linked)
+    data = dict(data, model=model)
     write_auditoria(outdir, data)
     
     print(f"   ✅ Restaurante: {data['restaurant']}")
     print(f"   ✅ Total de itens: {data['total_items']}")
     print(f"   ✅ Modelo: {data['model']}")
+    print(f"   ✅ Fonte: {size}pt" + ("" if fits else " (⚠ linhas mais largas que a coluna)"))
+    print(f"   ✅ Páginas: {n_pages}")
 
-    corel = get_corel_app(visible=False)
+    corel = get_corel_app(visible=False, backend=args.backend)
     print("   ✅ CorelDRAW inicializado")
 
     tpl = str(tplA if data["model"] == "A" else tplB)
+    meta = load_template_metadata(tpl)
     doc = corel.OpenDocument(tpl)
     page = doc.ActivePage
-    layer = page.ActiveLayer
 
     # Limpar textos existentes do template
     print("   🔍 Limpando textos do template...")
@@ -465,132 +1590,17 @@ def main():
     except Exception as e:
         print(f"   ⚠ Erro ao limpar template: {e}")
     
-    # Criar título
-    try:
-        pw = float(page.SizeWidth)
-        ph = float(page.SizeHeight)
-        
-        title_x = pw / 2.0
-        title_y = ph - 1.0
-        
-        title_shape = layer.CreateArtisticText(0.0, float(title_y), str(data["restaurant"]))
-        title_shape.Text.Story.Font = "Arial"
-        title_shape.Text.Story.Size = float(24)
-        title_shape.Text.Story.Bold = True
-        
-        try:
-            title_shape.Text.Story.Fill.UniformColor.CMYKAssign(0, 0, 0, 100)
-        except Exception:
-            pass
-        
-        try:
-            text_width = float(title_shape.SizeWidth)
-            title_shape.LeftX = title_x - (text_width / 2.0)
-        except Exception:
-            pass
-        
-    except Exception as e:
-        print(f"   ❌ Erro ao criar título: {e}")
-
-    # Criar conteúdo
-    print("   📝 Criando conteúdo do cardápio...")
-    frames = ensure_area_frames(page, doc, data["model"])
-
-    shapes_before = page.Shapes.Count
-    print(f"   📊 Shapes antes: {shapes_before}")
-
-    if data["model"] == "A":
-        print("   📄 Modelo A: 1 coluna")
-        left, bottom, right, top = frames[0]
-        frame_width = abs(right - left)
-
-        # Calcular largura em caracteres
-        target_width = calculate_char_width_for_frame(frame_width, args.size)
-        print(f"   📏 Largura da caixa: {frame_width:.2f} unidades = ~{target_width} caracteres")
-
-        seq = flatten_with_headers(data["categories"])
-        print("   📝 Gerando texto (com debug)...")
-        text_block = compose_text_block(seq, use_dots=True, target_width=target_width, debug=True)
-
-        shp = create_paragraph_text(layer, left, bottom, right, top)
-        fill_paragraph(shp, text_block)
-        apply_text_style_and_tabs(doc, shp, font_name=args.font, font_size_pt=args.size)
-    else:
-        print("   📄 Modelo B: 2 colunas")
-        col1, col2 = split_two_columns_preserving_order(data["categories"])
-
-        frame1, frame2 = frames
-        left1, bottom1, right1, top1 = frame1
-        left2, bottom2, right2, top2 = frame2
-
-        # Calcular largura para cada coluna
-        frame_width1 = abs(right1 - left1)
-        frame_width2 = abs(right2 - left2)
-        target_width1 = calculate_char_width_for_frame(frame_width1, args.size)
-        target_width2 = calculate_char_width_for_frame(frame_width2, args.size)
-
-        print(f"   📏 Coluna 1: {frame_width1:.2f} unidades = ~{target_width1} caracteres")
-        print(f"   📏 Coluna 2: {frame_width2:.2f} unidades = ~{target_width2} caracteres")
-
-        print("   📝 Gerando texto coluna 1 (com debug)...")
-        tb1 = compose_text_block(col1, use_dots=True, target_width=target_width1, debug=True)
-        print("   📝 Gerando texto coluna 2 (com debug)...")
-        tb2 = compose_text_block(col2, use_dots=True, target_width=target_width2, debug=True)
-
-        print("   📝 Coluna 1...")
-        shp1 = create_paragraph_text(layer, left1, bottom1, right1, top1)
-        fill_paragraph(shp1, tb1)
-        apply_text_style_and_tabs(doc, shp1, font_name=args.font, font_size_pt=args.size)
-
-        print("   📝 Coluna 2...")
-        shp2 = create_paragraph_text(layer, left2, bottom2, right2, top2)
-        fill_paragraph(shp2, tb2)
-        apply_text_style_and_tabs(doc, shp2, font_name=args.font, font_size_pt=args.size)
-
-    shapes_after = page.Shapes.Count
-    shapes_created = shapes_after - shapes_before
-    print(f"   📊 Shapes depois: {shapes_after}")
-    print(f"   ✅ {shapes_created} shapes criadas")
+    render_document(doc, data, meta, args.font, size, linked=args.linked)
 
     # Salvar e exportar
-    out_cdr = outdir / "cardapio_output.cdr"
-    out_pdf = outdir / "cardapio_output.pdf"
-    out_png = outdir / "cardapio_output.png"
-
-    print("\n   💾 Salvando arquivos...")
+    export_document(doc, outdir)
 
-    try:
-        import os
-        cdr_path = os.path.abspath(str(out_cdr))
-        print(f"   🔍 Exportando CDR para: {cdr_path}")
-
-        # Tentar exportar como CDR (mais confiável)
+    if meta is None:
         try:
-            doc.Export(cdr_path, 48, 0)  # 48 = cdrCDR
-            print(f"   ✅ CDR: {out_cdr.name}")
-        except Exception as e1:
-            print(f"   ⚠ Export falhou: {e1}")
-            # Fallback: tentar SaveAs
-            doc.SaveAs(cdr_path)
-            print(f"   ✅ CDR: {out_cdr.name} (via SaveAs)")
-    except Exception as e:
-        print(f"   ⚠ CDR: {e}")
-
-    try:
-        pdf_path = os.path.abspath(str(out_pdf))
-        print(f"   🔍 Gerando PDF em: {pdf_path}")
-        doc.PublishToPDF(pdf_path)
-        print(f"   ✅ PDF: {out_pdf.name}")
-    except Exception as e:
-        print(f"   ⚠ PDF: {e}")
-
-    try:
-        png_path = os.path.abspath(str(out_png))
-        print(f"   🔍 Exportando PNG em: {png_path}")
-        doc.Export(png_path, 13, 1)
-        print(f"   ✅ PNG: {out_png.name}")
-    except Exception as e:
-        print(f"   ⚠ PNG: {e}")
+            compile_template_metadata(doc, tpl)
+            print("   ✅ Metadata do template gerada")
+        except Exception as e:
+            print(f"   ⚠ Metadata do template: {e}")
 
     try:
         doc.Close(False)
@@ -605,4 +1615,4 @@ def main():
     print("\n✅ CONCLUÍDO!")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
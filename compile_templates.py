@@ -0,0 +1,56 @@
+# compile_templates.py
+# -*- coding: utf-8 -*-
+"""
+Compila a metadata dos templates CDR
+
+Abre cada templates/*.cdr uma única vez e grava um sidecar JSON com tamanho
+da página, fator de unidade, frames de texto e posição do título. Com o
+sidecar, o builder calcula toda a geometria em Python puro, sem consultas
+COM por job. Os sidecars ficam em CARDAPIO_TEMPLATE_META_DIR (padrão: pasta
+temporária do sistema), um por template + backend + hash, fora de templates/.
+
+Rodar sempre que um template for alterado (a API também recompila sozinha
+quando detecta que o hash do .cdr mudou).
+"""
+import sys
+from pathlib import Path
+
+import build_cardapio_dinamico as builder
+
+def main():
+    templates_dir = Path(__file__).parent / "templates"
+    templates = sorted(templates_dir.glob("*.cdr"))
+    if len(sys.argv) > 1:
+        templates = [Path(p).resolve() for p in sys.argv[1:]]
+
+    if not templates:
+        print(f"❌ Nenhum template .cdr encontrado em {templates_dir}")
+        sys.exit(1)
+
+    print("=== Compilando metadata dos templates ===\n")
+    corel = builder.get_corel_app(visible=False)
+
+    ok = True
+    for tpl in templates:
+        print(f"📄 {tpl.name}...")
+        doc = None
+        try:
+            doc = corel.OpenDocument(str(tpl))
+            meta = builder.compile_template_metadata(doc, tpl)
+            print(f"   ✅ {builder.template_metadata_path(tpl)}: "
+                  f"página {meta['page_width']:.2f} x {meta['page_height']:.2f}")
+        except Exception as e:
+            print(f"   ❌ Erro: {e}")
+            ok = False
+        finally:
+            if doc is not None:
+                try:
+                    doc.Close(False)
+                except Exception:
+                    pass
+
+    builder.cleanup_com()
+    sys.exit(0 if ok else 1)
+
+if __name__ == "__main__":
+    main()
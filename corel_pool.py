@@ -0,0 +1,228 @@
+# corel_pool.py
+# -*- coding: utf-8 -*-
+"""
+Pool de sessões CorelDRAW persistentes
+
+Cada sessão vive em uma thread STA dedicada: o CorelDRAW é iniciado uma única
+vez (aquecimento no startup da API) e todas as chamadas COM daquela instância
+são executadas nessa mesma thread. Os jobs pegam uma sessão emprestada
+(lease), executam a renderização e devolvem a sessão ao pool, sem pagar o
+custo de inicialização do CorelDRAW a cada cardápio.
+
+A instância é reciclada (Quit + nova instância na mesma thread) quando para
+de responder ao COM ou, com `max_jobs`, depois de N jobs, para limitar o
+acúmulo de memória de um CorelDRAW aberto por dias.
+"""
+
+import logging
+import queue
+import threading
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+from template_cache import TemplateCache
+
+try:
+    import pythoncom
+except ImportError:  # Linux / CI: sem COM, usar fábrica fake
+    pythoncom = None
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+def _default_app_factory():
+    """Fábrica padrão: CorelDRAW real via COM"""
+    import build_cardapio_dinamico as builder
+    return builder.get_corel_app(visible=False)
+
+class CorelSession:
+    """
+    Sessão CorelDRAW presa a uma thread STA
+
+    Objetos COM não podem atravessar threads, então tudo que usa `self.app`
+    deve rodar via `call()`, que despacha a função para a thread da sessão.
+    """
+
+    def __init__(self, index, app_factory=None, max_jobs=None):
+        self.index = index
+        self.app_factory = app_factory or _default_app_factory
+        self.max_jobs = max_jobs
+        self.app = None
+        self.templates = TemplateCache()
+        self.jobs_done = 0
+        self.app_jobs = 0  # jobs na instância atual do CorelDRAW
+        self.restarts = 0
+        self._tasks = queue.Queue()
+        self._ready = threading.Event()
+        self._thread = threading.Thread(
+            target=self._run, name=f"corel-sta-{index}", daemon=True
+        )
+
+    @property
+    def alive(self):
+        return self._thread.is_alive()
+
+    def start(self, timeout=None):
+        """Inicia a thread STA e aguarda o aquecimento do CorelDRAW"""
+        self._thread.start()
+        self._ready.wait(timeout)
+        return self.app is not None
+
+    def call(self, fn, *args, **kwargs):
+        """Executa fn(session, *args, **kwargs) na thread STA e devolve o resultado"""
+        if not self.alive:
+            raise RuntimeError(f"Sessão CorelDRAW {self.index} não está ativa")
+        future = Future()
+        self._tasks.put((fn, args, kwargs, future))
+        return future.result()
+
+    def stop(self, timeout=None):
+        """Encerra a thread STA (fecha o CorelDRAW)"""
+        if self.alive:
+            self._tasks.put(_STOP)
+            self._thread.join(timeout)
+
+    def _ensure_app(self):
+        """Garante uma instância do CorelDRAW viva nesta thread"""
+        if self.app is not None and self.max_jobs and self.app_jobs >= self.max_jobs:
+            logger.info(f"[corel-{self.index}] ♻️ {self.app_jobs} jobs nesta instância, reciclando...")
+            self._close_app()
+            self.restarts += 1
+        if self.app is not None:
+            try:
+                _ = self.app.Version
+                return self.app
+            except Exception as e:
+                logger.warning(f"[corel-{self.index}] Instância perdida ({e}), reiniciando...")
+                self.app = None
+                self.templates.clear()
+                self.restarts += 1
+        self.app = self.app_factory()
+        self.app_jobs = 0
+        return self.app
+
+    def _close_app(self):
+        """Fecha a instância atual (documentos em cache + CorelDRAW.Quit)"""
+        self.templates.invalidate()
+        try:
+            self.app.Quit()
+        except Exception:
+            pass
+        self.app = None
+
+    def _run(self):
+        if pythoncom is not None:
+            try:
+                pythoncom.CoInitialize()
+            except Exception as e:
+                logger.warning(f"[corel-{self.index}] Aviso ao inicializar COM: {e}")
+
+        try:
+            self._ensure_app()
+            logger.info(f"[corel-{self.index}] ✅ CorelDRAW aquecido")
+        except Exception as e:
+            logger.warning(f"[corel-{self.index}] ⚠️ CorelDRAW indisponível no aquecimento: {e}")
+        finally:
+            self._ready.set()
+
+        try:
+            while True:
+                task = self._tasks.get()
+                if task is _STOP:
+                    break
+
+                fn, args, kwargs, future = task
+                if not future.set_running_or_notify_cancel():
+                    continue
+                try:
+                    self._ensure_app()
+                    result = fn(self, *args, **kwargs)
+                except BaseException as e:
+                    future.set_exception(e)
+                else:
+                    future.set_result(result)
+                finally:
+                    self.jobs_done += 1
+                    self.app_jobs += 1
+        finally:
+            if self.app is not None:
+                self._close_app()
+            if pythoncom is not None:
+                try:
+                    pythoncom.CoUninitialize()
+                except Exception:
+                    pass
+
+class CorelPool:
+    """
+    Pool fixo de sessões CorelDRAW
+
+    Uso:
+        pool = CorelPool(size=1)
+        pool.start()
+        with pool.lease() as session:
+            session.call(render_fn, ...)
+    """
+
+    def __init__(self, size=1, app_factory=None, max_jobs=None):
+        self.size = max(1, int(size))
+        self.app_factory = app_factory
+        self.max_jobs = max_jobs
+        self.sessions = []
+        self._idle = queue.Queue()
+        self._lock = threading.Lock()
+        self._started = False
+
+    def start(self, warm_timeout=None):
+        """Cria e aquece todas as sessões"""
+        with self._lock:
+            if self._started:
+                return
+            for i in range(self.size):
+                session = CorelSession(i, self.app_factory, self.max_jobs)
+                session.start(warm_timeout)
+                self.sessions.append(session)
+                self._idle.put(session)
+            self._started = True
+
+    @contextmanager
+    def lease(self, timeout=None):
+        """Empresta uma sessão ociosa pelo tempo do bloco `with`"""
+        if not self._started:
+            self.start()
+        try:
+            session = self._idle.get(timeout=timeout)
+        except queue.Empty:
+            raise TimeoutError("Nenhuma sessão CorelDRAW livre no pool")
+        try:
+            yield session
+        finally:
+            self._idle.put(session)
+
+    def shutdown(self, timeout=None):
+        """Fecha todas as sessões (CorelDRAW.Quit)"""
+        with self._lock:
+            for session in self.sessions:
+                session.stop(timeout)
+            self.sessions = []
+            self._idle = queue.Queue()
+            self._started = False
+
+    def status(self):
+        """Resumo do pool para /health"""
+        return {
+            "size": self.size,
+            "idle": self._idle.qsize(),
+            "sessions": [
+                {
+                    "index": s.index,
+                    "alive": s.alive,
+                    "corel_ready": s.app is not None,
+                    "jobs_done": s.jobs_done,
+                    "templates_cached": len(s.templates),
+                    "restarts": s.restarts,
+                }
+                for s in self.sessions
+            ],
+        }
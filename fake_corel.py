@@ -0,0 +1,690 @@
+# fake_corel.py
+# -*- coding: utf-8 -*-
+"""
+Backend CorelDRAW falso (em processo) para Linux, CI e benchmarks
+
+Implementa o subconjunto do modelo de objetos usado pelo projeto:
+Application, Document (com MasterPage), Page, Layers/Layer, Shapes/ShapeRange,
+Shape, Text.Story, Characters.Range, Export, SaveAs e PublishToPDF.
+
+Cada acesso a um membro "COM" (nome começando com maiúscula: leitura de
+propriedade, atribuição ou chamada de método) conta como uma ida e volta
+COM: é registrado em FakeStats e pode ter latência configurável, para
+medir quantas chamadas COM o pipeline faz e qual o throughput esperado.
+
+Ativar na API/CLI:
+    CARDAPIO_COREL_BACKEND=fake
+    CARDAPIO_FAKE_LATENCY=0.002      # segundos por chamada COM (padrão: 0)
+    CARDAPIO_FAKE_STARTUP=3.0        # custo de "abrir o CorelDRAW" (padrão: 0)
+
+Documentos exportados como CDR são gravados em JSON, então um .cdr gerado
+pelo fake pode ser reaberto pelo próprio fake com todas as shapes.
+"""
+
+import json
+import os
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from pathlib import Path
+
+CDR_TEXT_SHAPE = 6
+CDR_INCH = 1
+FAKE_FORMAT = "fake-corel/1"
+
+class FakeStats:
+    """Contador de chamadas COM simuladas (thread-safe)"""
+
+    def __init__(self, latency=0.0, latencies=None, startup_latency=0.0):
+        self.latency = float(latency)
+        self.latencies = dict(latencies or {})
+        self.startup_latency = float(startup_latency)
+        self.counts = Counter()
+        self.simulated_seconds = 0.0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            latency=float(os.environ.get("CARDAPIO_FAKE_LATENCY", "0") or 0),
+            startup_latency=float(os.environ.get("CARDAPIO_FAKE_STARTUP", "0") or 0),
+        )
+
+    def touch(self, member):
+        if getattr(self._local, "suspended", 0):
+            return
+        delay = self.latencies.get(member, self.latency)
+        with self._lock:
+            self.counts[member] += 1
+            self.simulated_seconds += delay
+        if delay:
+            time.sleep(delay)
+
+    @contextmanager
+    def suspended(self):
+        """Não contar chamadas feitas dentro do CorelDRAW (ex.: por um macro)"""
+        self._local.suspended = getattr(self._local, "suspended", 0) + 1
+        try:
+            yield
+        finally:
+            self._local.suspended -= 1
+
+    @property
+    def total_calls(self):
+        return sum(self.counts.values())
+
+    def reset(self):
+        with self._lock:
+            self.counts.clear()
+            self.simulated_seconds = 0.0
+
+    def report(self, top=None):
+        """Lista (membro, chamadas) ordenada da mais chamada para a menos"""
+        return self.counts.most_common(top)
+
+DEFAULT_STATS = FakeStats.from_env()
+
+class FakeCOMObject:
+    """Base: conta cada acesso a membros em MaiúsculaInicial como chamada COM"""
+
+    def __init__(self, stats):
+        object.__setattr__(self, "_stats", stats)
+
+    def __getattribute__(self, name):
+        if name[:1].isupper():
+            object.__getattribute__(self, "_stats").touch(f"{type(self).__name__[4:]}.{name}")
+        return object.__getattribute__(self, name)
+
+    def __setattr__(self, name, value):
+        if name[:1].isupper():
+            object.__getattribute__(self, "_stats").touch(f"{type(self).__name__[4:]}.{name}=")
+        object.__setattr__(self, name, value)
+
+# ---------------------------------------------------------------------------
+# Texto
+
+class FakeUniformColor(FakeCOMObject):
+    def __init__(self, stats):
+        super().__init__(stats)
+        self._cmyk = None
+
+    def CMYKAssign(self, c, m, y, k):
+        self._cmyk = (c, m, y, k)
+
+class FakeFill(FakeCOMObject):
+    def __init__(self, stats):
+        super().__init__(stats)
+        self._color = FakeUniformColor(stats)
+
+    @property
+    def UniformColor(self):
+        return self._color
+
+class FakeCharacters(FakeCOMObject):
+    def __init__(self, stats, story):
+        super().__init__(stats)
+        self._story = story
+
+    def Range(self, start, end):
+        return FakeTextRange(self._stats, self._story, int(start), int(end))
+
+class FakeTextRange(FakeCOMObject):
+    """
+    Story inteira (start=None) ou trecho dela
+
+    Atributos de trechos ficam em story._runs como (start, end, atributo, valor).
+    """
+
+    def __init__(self, stats, story=None, start=None, end=None):
+        super().__init__(stats)
+        self._story = story if story is not None else self
+        self._start = start
+        self._end = end
+        if story is None:
+            self._text = ""
+            self._runs = []
+            self._attrs = {"Font": "Arial", "Size": 10.0, "Bold": False,
+                           "Alignment": 0, "LineSpacing": 100.0}
+            self._fill = FakeFill(stats)
+
+    def _is_story(self):
+        return self._start is None
+
+    def _get(self, attr):
+        story = self._story
+        if not self._is_story():
+            for start, end, name, value in reversed(story._runs):
+                if name == attr and start <= self._start and self._end <= end:
+                    return value
+        return story._attrs[attr]
+
+    def _set(self, attr, value):
+        story = self._story
+        if self._is_story():
+            story._attrs[attr] = value
+            story._runs = [r for r in story._runs if r[2] != attr]
+        else:
+            story._runs.append((self._start, self._end, attr, value))
+
+    @property
+    def Text(self):
+        text = self._story._text
+        if self._is_story():
+            return text
+        return text[self._start - 1:self._end]
+
+    @Text.setter
+    def Text(self, value):
+        story = self._story
+        if self._is_story():
+            story._text = str(value)
+            story._runs = []
+        else:
+            text = story._text
+            story._text = text[:self._start - 1] + str(value) + text[self._end:]
+
+    @property
+    def Characters(self):
+        return FakeCharacters(self._stats, self._story)
+
+    def Range(self, start, end):
+        return FakeTextRange(self._stats, self._story, int(start), int(end))
+
+    def Replace(self, old, new, case_sensitive=False, whole_word=False):
+        self._story._text = self._story._text.replace(str(old), str(new))
+
+    @property
+    def Fill(self):
+        return self._story._fill
+
+    # Propriedades de estilo (mesma mecânica para todas)
+    Font = property(lambda self: self._get("Font"), lambda self, v: self._set("Font", str(v)))
+    Size = property(lambda self: self._get("Size"), lambda self, v: self._set("Size", float(v)))
+    Bold = property(lambda self: self._get("Bold"), lambda self, v: self._set("Bold", bool(v)))
+    Alignment = property(lambda self: self._get("Alignment"), lambda self, v: self._set("Alignment", int(v)))
+    LineSpacing = property(lambda self: self._get("LineSpacing"), lambda self, v: self._set("LineSpacing", float(v)))
+
+class FakeTextFrame(FakeCOMObject):
+    def __init__(self, stats, shape):
+        super().__init__(stats)
+        self._shape = shape
+        self._next = None
+
+    def LinkTo(self, other):
+        # Como no CorelDRAW: as caixas vinculadas passam a ter a mesma story
+        self._next = other
+        other._text._story = self._shape._text._story
+        other._text._linked = True
+
+class FakeText(FakeCOMObject):
+    def __init__(self, stats, shape):
+        super().__init__(stats)
+        self._story = FakeTextRange(stats)
+        self._frame = FakeTextFrame(stats, shape)
+        self._fit = True
+        self._alignment = 0
+        self._linked = False  # continuação de outra caixa (story dela)
+
+    @property
+    def Story(self):
+        return self._story
+
+    @property
+    def Frame(self):
+        return self._frame
+
+    FitToFrame = property(lambda self: self._fit, lambda self, v: object.__setattr__(self, "_fit", bool(v)))
+    Alignment = property(lambda self: self._alignment, lambda self, v: object.__setattr__(self, "_alignment", int(v)))
+
+# ---------------------------------------------------------------------------
+# Shapes
+
+class FakeShape(FakeCOMObject):
+    def __init__(self, stats, layer, kind, rect, text=""):
+        super().__init__(stats)
+        self._layer = layer
+        self._kind = kind          # "artistic" | "paragraph" | "other"
+        self._rect = list(rect)    # left, bottom, right, top
+        self._text = FakeText(stats, self) if kind != "other" else None
+        if self._text is not None:
+            self._text._story._text = str(text)
+        self._name = ""
+
+    @property
+    def Type(self):
+        return CDR_TEXT_SHAPE if self._text is not None else 0
+
+    @property
+    def Text(self):
+        return self._text
+
+    @property
+    def Name(self):
+        return self._name
+
+    @Name.setter
+    def Name(self, value):
+        self._name = str(value)
+
+    @property
+    def SizeWidth(self):
+        if self._kind == "artistic":
+            story = self._text._story
+            return len(story._text) * story._attrs["Size"] * 0.5 / 72.0
+        return self._rect[2] - self._rect[0]
+
+    @property
+    def SizeHeight(self):
+        if self._kind == "artistic":
+            return self._text._story._attrs["Size"] / 72.0
+        return self._rect[3] - self._rect[1]
+
+    @property
+    def LeftX(self):
+        return self._rect[0]
+
+    @LeftX.setter
+    def LeftX(self, value):
+        width = self._rect[2] - self._rect[0]
+        self._rect[0] = float(value)
+        self._rect[2] = float(value) + width
+
+    def Delete(self):
+        self._layer._page._shapes_list.remove(self)
+
+    def CopyToLayer(self, layer):
+        return layer._adopt(self._to_dict())
+
+    def _to_dict(self):
+        data = {"kind": self._kind, "rect": list(self._rect), "name": self._name}
+        # Caixa vinculada: o texto é gravado só na primeira da cadeia
+        if self._text is not None and not self._text._linked:
+            story = self._text._story
+            data["text"] = story._text
+            data["attrs"] = dict(story._attrs)
+            data["runs"] = [list(r) for r in story._runs]
+        if self._text is not None and self._text._frame._next is not None:
+            data["link_to"] = self._text._frame._next._name
+        return data
+
+class FakeShapeRange(FakeCOMObject):
+    def __init__(self, stats, shapes):
+        super().__init__(stats)
+        self._items = list(shapes)
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def Item(self, index):
+        return self._items[index - 1]
+
+    def CopyToLayer(self, layer):
+        return FakeShapeRange(self._stats, [layer._adopt(s._to_dict()) for s in self._items])
+
+class FakeShapes(FakeCOMObject):
+    def __init__(self, stats, page, layer=None):
+        super().__init__(stats)
+        self._page = page
+        self._layer = layer
+
+    @property
+    def _items(self):
+        if self._layer is None:
+            return self._page._shapes_list
+        return [s for s in self._page._shapes_list if s._layer is self._layer]
+
+    @property
+    def Count(self):
+        return len(self._items)
+
+    def Item(self, index):
+        return self._items[index - 1]
+
+    def All(self):
+        return FakeShapeRange(self._stats, self._items)
+
+    def FindShape(self, name):
+        for shape in self._items:
+            if shape._name == name:
+                return shape
+        return None
+
+class FakeLayer(FakeCOMObject):
+    def __init__(self, stats, page, name="Camada 1"):
+        super().__init__(stats)
+        self._page = page
+        self._name = name
+        self._visible = True
+        self._printable = True
+        self._editable = True
+
+    Name = property(lambda self: self._name, lambda self, v: object.__setattr__(self, "_name", str(v)))
+    Visible = property(lambda self: self._visible, lambda self, v: object.__setattr__(self, "_visible", bool(v)))
+    Printable = property(lambda self: self._printable, lambda self, v: object.__setattr__(self, "_printable", bool(v)))
+    Editable = property(lambda self: self._editable, lambda self, v: object.__setattr__(self, "_editable", bool(v)))
+
+    @property
+    def IsSpecialLayer(self):
+        return False
+
+    def Activate(self):
+        self._page._layer = self
+
+    def Delete(self):
+        page = self._page
+        page._shapes_list = [s for s in page._shapes_list if s._layer is not self]
+        page._layers_list.remove(self)
+        if page._layer is self:
+            page._layer = page._layers_list[0] if page._layers_list else None
+
+    def _settings(self):
+        return {"name": self._name, "visible": self._visible,
+                "printable": self._printable, "editable": self._editable}
+
+    def _adopt(self, data):
+        shape = FakeShape(self._stats, self, data["kind"], data["rect"], data.get("text", ""))
+        shape._name = data.get("name", "")
+        if shape._text is not None:
+            story = shape._text._story
+            story._attrs.update(data.get("attrs", {}))
+            story._runs = [tuple(r) for r in data.get("runs", [])]
+        self._page._shapes_list.append(shape)
+        return shape
+
+    def CreateParagraphText(self, left, bottom, right, top, text=""):
+        shape = FakeShape(self._stats, self, "paragraph", (left, bottom, right, top), text)
+        self._page._shapes_list.append(shape)
+        return shape
+
+    def CreateArtisticText(self, left, bottom, text=""):
+        shape = FakeShape(self._stats, self, "artistic", (left, bottom, left, bottom), text)
+        self._page._shapes_list.append(shape)
+        return shape
+
+    def CreateRectangle(self, left, top, right, bottom):
+        shape = FakeShape(self._stats, self, "other", (left, bottom, right, top))
+        self._page._shapes_list.append(shape)
+        return shape
+
+    @property
+    def Shapes(self):
+        return FakeShapes(self._stats, self._page, self)
+
+class FakeLayers(FakeCOMObject):
+    def __init__(self, stats, page):
+        super().__init__(stats)
+        self._page = page
+
+    @property
+    def Count(self):
+        return len(self._page._layers_list)
+
+    def Item(self, index):
+        return self._page._layers_list[index - 1]
+
+    def Find(self, name):
+        for layer in self._page._layers_list:
+            if layer._name == name:
+                return layer
+        return None
+
+class FakePage(FakeCOMObject):
+    def __init__(self, stats, doc, width=8.27, height=11.69, layers=("Camada 1",)):
+        super().__init__(stats)
+        self._doc = doc
+        self._width = float(width)
+        self._height = float(height)
+        self._shapes_list = []
+        self._layers_list = [FakeLayer(stats, self, name) for name in layers]
+        self._layer = self._layers_list[0] if self._layers_list else None
+
+    @property
+    def SizeWidth(self):
+        return self._width
+
+    @property
+    def SizeHeight(self):
+        return self._height
+
+    def SetSize(self, width, height):
+        self._width = float(width)
+        self._height = float(height)
+
+    @property
+    def ActiveLayer(self):
+        return self._layer
+
+    @property
+    def Shapes(self):
+        return FakeShapes(self._stats, self)
+
+    @property
+    def Layers(self):
+        return FakeLayers(self._stats, self)
+
+    def CreateLayer(self, name):
+        layer = FakeLayer(self._stats, self, name)
+        self._layers_list.append(layer)
+        return layer
+
+    def _to_dict(self):
+        return {
+            "width": self._width,
+            "height": self._height,
+            "layers": [layer._settings() for layer in self._layers_list],
+            "shapes": [dict(s._to_dict(), layer=s._layer._name) for s in self._shapes_list],
+        }
+
+    def _load_dict(self, data, links):
+        layers = data.get("layers") or [{"name": "Camada 1"}]
+        self._width = float(data["width"])
+        self._height = float(data["height"])
+        self._shapes_list = []
+        self._layers_list = []
+        for ldata in layers:
+            layer = self.CreateLayer(ldata["name"])
+            layer._visible = ldata.get("visible", True)
+            layer._printable = ldata.get("printable", True)
+            layer._editable = ldata.get("editable", True)
+        self._layer = self._layers_list[0]
+        for sdata in data["shapes"]:
+            layer = self.Layers.Find(sdata.get("layer", layers[0]["name"]))
+            shape = layer._adopt(sdata)
+            if sdata.get("link_to"):
+                links.append((shape, sdata["link_to"]))
+
+    @property
+    def Index(self):
+        return self._doc._pages_list.index(self) + 1
+
+    def Activate(self):
+        self._doc._active = self
+
+class FakePages(FakeCOMObject):
+    def __init__(self, stats, doc):
+        super().__init__(stats)
+        self._doc = doc
+
+    @property
+    def Count(self):
+        return len(self._doc._pages_list)
+
+    def Item(self, index):
+        return self._doc._pages_list[index - 1]
+
+# ---------------------------------------------------------------------------
+# Documento / aplicação
+
+class FakeDocument(FakeCOMObject):
+    def __init__(self, stats, app, file_name=""):
+        super().__init__(stats)
+        self._app = app
+        self._file_name = file_name
+        self._unit = CDR_INCH
+        self._pages_list = [FakePage(stats, self)]
+        self._master = FakePage(stats, self, layers=())
+        self._active = self._pages_list[0]
+        self._closed = False
+
+    @property
+    def ActivePage(self):
+        return self._active
+
+    @property
+    def Pages(self):
+        return FakePages(self._stats, self)
+
+    @property
+    def MasterPage(self):
+        return self._master
+
+    @property
+    def FileName(self):
+        return self._file_name
+
+    Unit = property(lambda self: self._unit, lambda self, v: object.__setattr__(self, "_unit", v))
+
+    def ToUnits(self, value, unit):
+        # Unidade do projeto: mm -> polegadas (documentos do fake são em polegadas)
+        return float(value) / 25.4
+
+    def AddPages(self, count):
+        first = self._pages_list[0]
+        for _ in range(int(count)):
+            self._pages_list.append(FakePage(self._stats, self, first._width, first._height))
+        return self._pages_list[-1]
+
+    def _to_dict(self):
+        data = {
+            "format": FAKE_FORMAT,
+            "unit": self._unit,
+            "pages": [p._to_dict() for p in self._pages_list],
+        }
+        if self._master._layers_list:
+            data["master"] = self._master._to_dict()
+        return data
+
+    def _load_dict(self, data):
+        self._unit = data.get("unit", CDR_INCH)
+        self._pages_list = []
+        links = []
+        with self._stats.suspended():
+            for pdata in data["pages"]:
+                page = FakePage(self._stats, self)
+                page._load_dict(pdata, links)
+                self._pages_list.append(page)
+            if data.get("master"):
+                self._master._load_dict(data["master"], links)
+        self._active = self._pages_list[0]
+
+        # Refaz as caixas vinculadas (pelo nome da próxima da cadeia)
+        by_name = {s._name: s for p in self._pages_list for s in p._shapes_list}
+        with self._stats.suspended():
+            for shape, name in links:
+                shape._text._frame.LinkTo(by_name[name])
+
+    def Export(self, path, filter_id, range_id=0):
+        if int(filter_id) == 48:  # cdrCDR
+            self._write_cdr(path)
+        else:
+            Path(path).write_bytes(b"FAKE-EXPORT " + str(filter_id).encode() + b"\n")
+
+    def SaveAs(self, path, *args):
+        self._write_cdr(path)
+        self._file_name = str(path)
+
+    def Save(self):
+        if not self._file_name:
+            raise RuntimeError("Documento sem nome")
+        self._write_cdr(self._file_name)
+
+    def PublishToPDF(self, path):
+        path = str(path).replace("\\", os.sep)
+        pages = len(self._pages_list)
+        shapes = sum(len(p._shapes_list) for p in self._pages_list)
+        Path(path).write_bytes(
+            b"%PDF-1.4\n% fake-corel: " + f"{pages} paginas, {shapes} shapes".encode() + b"\n%%EOF\n"
+        )
+
+    def Close(self, *args):
+        self._closed = True
+        if self in self._app._documents:
+            self._app._documents.remove(self)
+
+    def _write_cdr(self, path):
+        Path(path).write_text(json.dumps(self._to_dict(), ensure_ascii=False), encoding="utf-8")
+
+class FakeGMSManager(FakeCOMObject):
+    """
+    GMSManager: o "macro" roda dentro do CorelDRAW, então só a chamada
+    RunMacro em si conta como ida e volta COM
+    """
+
+    def __init__(self, stats, app):
+        super().__init__(stats)
+        from macro_render import LocalMacroHost
+        self._host = LocalMacroHost(app)
+
+    def RunMacro(self, project, macro, *params):
+        with self._stats.suspended():
+            return self._host.RunMacro(project, macro, *params)
+
+class FakeApplication(FakeCOMObject):
+    def __init__(self, stats=None, visible=False):
+        stats = stats or DEFAULT_STATS
+        super().__init__(stats)
+        if stats.startup_latency:
+            time.sleep(stats.startup_latency)
+        self._visible = visible
+        self._documents = []
+        self._quit = False
+        self._gms = FakeGMSManager(stats, self)
+
+    Visible = property(lambda self: self._visible, lambda self, v: object.__setattr__(self, "_visible", bool(v)))
+
+    @property
+    def Version(self):
+        if self._quit:
+            raise RuntimeError("CorelDRAW (fake) encerrado")
+        return "25.0 (fake)"
+
+    @property
+    def ActiveDocument(self):
+        return self._documents[-1] if self._documents else None
+
+    @property
+    def GMSManager(self):
+        return self._gms
+
+    def CreateDocument(self):
+        doc = FakeDocument(self._stats, self)
+        self._documents.append(doc)
+        return doc
+
+    def OpenDocument(self, path):
+        path = str(path)
+        if not os.path.exists(path):
+            raise FileNotFoundError(path)
+        doc = FakeDocument(self._stats, self, path)
+        try:
+            data = json.loads(Path(path).read_text(encoding="utf-8"))
+            if data.get("format") != FAKE_FORMAT:
+                raise ValueError
+            doc._load_dict(data)
+        except (ValueError, UnicodeDecodeError):
+            # .cdr real (binário): simular o template padrão (título de exemplo)
+            title = doc._active._layer.CreateArtisticText(4.13, 10.69, "NOME DO RESTAURANTE")
+            title._text._story._attrs.update({"Size": 24.0, "Bold": True})
+        self._documents.append(doc)
+        return doc
+
+    def Quit(self):
+        self._quit = True
+        self._documents = []
+
+def create_app(visible=False, stats=None):
+    """Fábrica do backend "fake" (ver builder.get_corel_app)"""
+    return FakeApplication(stats=stats, visible=visible)
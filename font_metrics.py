@@ -0,0 +1,340 @@
+# font_metrics.py
+# -*- coding: utf-8 -*-
+"""
+Largura de texto a partir das métricas das fontes TrueType instaladas
+
+Lê direto do .ttf/.ttc (tabelas cmap, hmtx, head, hhea e name, sem
+dependências) o avanço de cada glifo. Assim o pontilhado entre nome e
+preço é calculado em pontos, offline, sem medir texto via COM.
+
+As pastas de fontes do sistema são varridas uma vez, no startup da API
+(build_index): de cada arquivo só o diretório de tabelas e a tabela name
+são lidos (seek/read, sem carregar a fonte inteira). As métricas de cada
+fonte usada ficam em memória. Fonte não encontrada -> métricas Helvetica
+(compatíveis com Arial).
+
+Pastas extras: CARDAPIO_FONT_DIRS (separadas por os.pathsep).
+"""
+
+import logging
+import os
+import struct
+import threading
+import unicodedata
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+FONT_EXTENSIONS = (".ttf", ".ttc", ".otf")
+
+# Larguras Helvetica (1/1000 em) dos caracteres ASCII 32..126
+_HELVETICA = [
+    278, 278, 355, 556, 556, 889, 667, 191, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 278, 278, 584, 584, 584, 556,
+    1015, 667, 667, 722, 722, 667, 611, 778, 722, 278, 500, 667, 556, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 278, 278, 278, 469, 556,
+    333, 556, 556, 500, 556, 556, 278, 556, 556, 222, 222, 500, 222, 833, 556, 556,
+    556, 556, 333, 500, 278, 556, 500, 722, 500, 500, 500, 334, 260, 334, 584,
+]
+_HELVETICA_BOLD = [
+    278, 333, 474, 556, 556, 889, 722, 238, 333, 333, 389, 584, 278, 333, 278, 278,
+    556, 556, 556, 556, 556, 556, 556, 556, 556, 556, 333, 333, 584, 584, 584, 611,
+    975, 722, 722, 722, 722, 667, 611, 778, 722, 278, 556, 722, 611, 833, 722, 778,
+    667, 778, 722, 667, 611, 722, 667, 944, 667, 667, 611, 333, 278, 333, 584, 556,
+    333, 556, 611, 556, 611, 556, 333, 611, 611, 278, 278, 556, 278, 889, 611, 611,
+    611, 611, 389, 556, 333, 611, 556, 778, 556, 556, 500, 389, 280, 389, 584,
+]
+
+class GlyphMetrics:
+    """Avanço horizontal por caractere de uma fonte (em unidades do em)"""
+
+    def __init__(self, advances, units_per_em, default_advance, name=""):
+        self.advances = advances  # codepoint -> avanço
+        self.units_per_em = units_per_em
+        self.default_advance = default_advance
+        self.name = name
+        self._cache = {}
+
+    def advance(self, ch):
+        width = self._cache.get(ch)
+        if width is None:
+            width = self.advances.get(ord(ch))
+            if width is None:
+                # Sem glifo próprio: largura da letra base (á -> a, Ç -> C)
+                base = unicodedata.normalize("NFD", ch)[:1]
+                width = self.advances.get(ord(base), self.default_advance) if base else self.default_advance
+            self._cache[ch] = width
+        return width
+
+    def width(self, text, size_pt):
+        """Largura do texto em pontos"""
+        return sum(self.advance(ch) for ch in text) * size_pt / self.units_per_em
+
+HELVETICA = GlyphMetrics(
+    {32 + i: w for i, w in enumerate(_HELVETICA)}, 1000, 556, "Helvetica"
+)
+HELVETICA_BOLD = GlyphMetrics(
+    {32 + i: w for i, w in enumerate(_HELVETICA_BOLD)}, 1000, 556, "Helvetica-Bold"
+)
+
+# ==================== LEITURA DO TRUETYPE ====================
+
+def _table_directory(buf, font_index=0):
+    """Offsets das tabelas (tag -> (offset, tamanho)) de uma fonte do arquivo"""
+    offset = 0
+    if buf[:4] == b"ttcf":
+        num_fonts = struct.unpack_from(">I", buf, 8)[0]
+        if font_index >= num_fonts:
+            raise ValueError(f"Coleção tem {num_fonts} fonte(s)")
+        offset = struct.unpack_from(">I", buf, 12 + 4 * font_index)[0]
+    num_tables = struct.unpack_from(">H", buf, offset + 4)[0]
+    tables = {}
+    for i in range(num_tables):
+        tag, _, table_off, length = struct.unpack_from(">4sIII", buf, offset + 12 + 16 * i)
+        tables[tag.decode("latin-1")] = (table_off, length)
+    return tables
+
+def _names(buf, tables):
+    """(família, estilo) da tabela name (IDs 1 e 2)"""
+    off, _ = tables["name"]
+    _, count, string_off = struct.unpack_from(">HHH", buf, off)
+    found = {}
+    for i in range(count):
+        platform, encoding, lang, name_id, length, str_off = struct.unpack_from(
+            ">HHHHHH", buf, off + 6 + 12 * i
+        )
+        if name_id not in (1, 2):
+            continue
+        raw = buf[off + string_off + str_off:off + string_off + str_off + length]
+        if platform == 3 or platform == 0:
+            text = raw.decode("utf-16-be", errors="ignore")
+            # Windows/inglês primeiro, depois qualquer outro
+            rank = 0 if (platform == 3 and lang == 0x409) else 1
+        elif platform == 1 and encoding == 0:
+            text, rank = raw.decode("mac_roman", errors="ignore"), 2
+        else:
+            continue
+        if name_id not in found or rank < found[name_id][0]:
+            found[name_id] = (rank, text)
+    family = found.get(1, (0, ""))[1]
+    style = found.get(2, (0, "Regular"))[1]
+    return family, style
+
+def read_font_names(path):
+    """
+    (índice na coleção, família, estilo) de cada fonte do arquivo
+
+    Lê só o cabeçalho, o diretório de tabelas e a tabela name de cada
+    fonte, sem carregar o arquivo inteiro.
+    """
+    names = []
+    with open(path, "rb") as f:
+        def read(offset, size):
+            f.seek(offset)
+            data = f.read(size)
+            if len(data) < size:
+                raise ValueError("Arquivo de fonte truncado")
+            return data
+
+        header = read(0, 12)
+        if header[:4] == b"ttcf":
+            num_fonts = struct.unpack_from(">I", header, 8)[0]
+            offsets = struct.unpack(f">{num_fonts}I", read(12, 4 * num_fonts))
+        else:
+            offsets = (0,)
+        for font_index, offset in enumerate(offsets):
+            num_tables = struct.unpack(">H", read(offset + 4, 2))[0]
+            directory = read(offset + 12, 16 * num_tables)
+            for i in range(num_tables):
+                tag, _, table_off, length = struct.unpack_from(">4sIII", directory, 16 * i)
+                if tag == b"name":
+                    # Tabela lida sozinha: offsets relativos ao início dela
+                    family, style = _names(read(table_off, length), {"name": (0, length)})
+                    names.append((font_index, family, style))
+                    break
+    return names
+
+def _cmap(buf, tables):
+    """codepoint -> glifo (subtabelas Unicode formato 4 ou 12)"""
+    off, _ = tables["cmap"]
+    num = struct.unpack_from(">H", buf, off + 2)[0]
+    subtables = {}
+    for i in range(num):
+        platform, encoding, sub_off = struct.unpack_from(">HHI", buf, off + 4 + 8 * i)
+        fmt = struct.unpack_from(">H", buf, off + sub_off)[0]
+        subtables[(platform, encoding, fmt)] = off + sub_off
+
+    for key in ((3, 10, 12), (0, 4, 12), (0, 6, 12)):
+        if key in subtables:
+            return _cmap_format12(buf, subtables[key])
+    for key in ((3, 1, 4), (0, 3, 4), (0, 1, 4), (0, 0, 4), (3, 0, 4)):
+        if key in subtables:
+            return _cmap_format4(buf, subtables[key])
+    raise ValueError("Fonte sem cmap Unicode")
+
+def _cmap_format4(buf, off):
+    seg_count = struct.unpack_from(">H", buf, off + 6)[0] // 2
+    ends = struct.unpack_from(f">{seg_count}H", buf, off + 14)
+    starts_off = off + 16 + 2 * seg_count
+    starts = struct.unpack_from(f">{seg_count}H", buf, starts_off)
+    deltas = struct.unpack_from(f">{seg_count}h", buf, starts_off + 2 * seg_count)
+    range_off_pos = starts_off + 4 * seg_count
+    range_offs = struct.unpack_from(f">{seg_count}H", buf, range_off_pos)
+
+    mapping = {}
+    for seg in range(seg_count):
+        start, end, delta, range_off = starts[seg], ends[seg], deltas[seg], range_offs[seg]
+        if start == 0xFFFF:
+            continue
+        for code in range(start, end + 1):
+            if range_off == 0:
+                glyph = (code + delta) & 0xFFFF
+            else:
+                pos = range_off_pos + 2 * seg + range_off + 2 * (code - start)
+                glyph = struct.unpack_from(">H", buf, pos)[0]
+                if glyph:
+                    glyph = (glyph + delta) & 0xFFFF
+            if glyph:
+                mapping[code] = glyph
+    return mapping
+
+def _cmap_format12(buf, off):
+    groups = struct.unpack_from(">I", buf, off + 12)[0]
+    mapping = {}
+    for i in range(groups):
+        start, end, glyph = struct.unpack_from(">III", buf, off + 16 + 12 * i)
+        # Planos além do BMP não aparecem em cardápios: não vale a memória
+        end = min(end, 0xFFFF)
+        for code in range(start, end + 1):
+            mapping[code] = glyph + code - start
+    return mapping
+
+def read_font_metrics(path, font_index=0):
+    """GlyphMetrics de um arquivo .ttf/.otf (ou de uma fonte de um .ttc)"""
+    buf = Path(path).read_bytes()
+    tables = _table_directory(buf, font_index)
+    units_per_em = struct.unpack_from(">H", buf, tables["head"][0] + 18)[0]
+    num_hmetrics = struct.unpack_from(">H", buf, tables["hhea"][0] + 34)[0]
+    hmtx = struct.unpack_from(f">{2 * num_hmetrics}H", buf, tables["hmtx"][0])
+    glyph_advances = hmtx[0::2]
+
+    advances = {}
+    for code, glyph in _cmap(buf, tables).items():
+        # Glifos depois do último hMetric repetem o último avanço
+        advances[code] = glyph_advances[min(glyph, num_hmetrics - 1)]
+    family, style = _names(buf, tables)
+    return GlyphMetrics(advances, units_per_em, glyph_advances[0], f"{family} {style}".strip())
+
+# ==================== FONTES INSTALADAS ====================
+
+def font_dirs():
+    """Pastas de fontes a varrer (extras do ambiente primeiro)"""
+    dirs = [Path(p) for p in os.environ.get("CARDAPIO_FONT_DIRS", "").split(os.pathsep) if p]
+    windir = os.environ.get("WINDIR") or os.environ.get("SystemRoot")
+    if windir:
+        dirs.append(Path(windir) / "Fonts")
+    local = os.environ.get("LOCALAPPDATA")
+    if local:
+        dirs.append(Path(local) / "Microsoft" / "Windows" / "Fonts")
+    home = Path.home()
+    dirs += [
+        Path("/usr/share/fonts"), Path("/usr/local/share/fonts"),
+        home / ".fonts", home / ".local" / "share" / "fonts",
+        Path("/Library/Fonts"), Path("/System/Library/Fonts"), home / "Library" / "Fonts",
+    ]
+    return dirs
+
+def _is_bold(style):
+    style = style.lower()
+    return "bold" in style or "negrito" in style
+
+def _is_italic(style):
+    style = style.lower()
+    return "italic" in style or "oblique" in style or "itálico" in style
+
+def scan_fonts(dirs=None):
+    """
+    Índice das fontes instaladas
+
+    Returns:
+        dict (família em minúsculas, negrito) -> (caminho, índice na coleção)
+    """
+    index = {}
+    for root in dirs if dirs is not None else font_dirs():
+        if not root.is_dir():
+            continue
+        for path in sorted(root.rglob("*")):
+            if path.suffix.lower() not in FONT_EXTENSIONS or not path.is_file():
+                continue
+            try:
+                names = read_font_names(path)
+            except Exception:
+                continue
+            for font_index, family, style in names:
+                if not family or _is_italic(style):
+                    continue
+                # Primeira ocorrência ganha (pastas extras têm prioridade)
+                index.setdefault((family.lower(), _is_bold(style)), (path, font_index))
+    return index
+
+_lock = threading.Lock()        # métricas em cache
+_index_lock = threading.Lock()  # varredura das pastas de fontes
+_index = None
+_metrics = {}
+
+def build_index(force=False):
+    """
+    Varre as fontes instaladas (uma vez; force=True refaz)
+
+    A API chama no startup, para o primeiro render/preview não esperar a
+    varredura; o CLI cai aqui na primeira consulta.
+    """
+    global _index
+    with _index_lock:
+        if _index is None or force:
+            _index = scan_fonts()
+            logger.info(f"🔤 {len(_index)} fonte(s) instalada(s) indexada(s)")
+        return _index
+
+def find_font(font_name, bold=False):
+    """(caminho, índice) da fonte instalada ou None"""
+    index = _index if _index is not None else build_index()
+    return index.get((font_name.lower(), bold))
+
+def get_metrics(font_name, bold=False):
+    """
+    Métricas da fonte (em cache); negrito ausente usa o regular, fonte
+    ausente usa Helvetica
+    """
+    key = (font_name.lower(), bold)
+    with _lock:
+        metrics = _metrics.get(key)
+    if metrics is not None:
+        return metrics
+
+    found = find_font(font_name, bold) or (find_font(font_name, False) if bold else None)
+    metrics = None
+    if found:
+        try:
+            metrics = read_font_metrics(*found)
+        except Exception as e:
+            logger.warning(f"⚠️ Falha ao ler {found[0]}: {e}")
+    if metrics is None:
+        logger.warning(f"⚠️ Fonte '{font_name}' não encontrada, usando métricas Helvetica")
+        metrics = HELVETICA_BOLD if bold else HELVETICA
+
+    with _lock:
+        _metrics[key] = metrics
+    return metrics
+
+def text_width_pt(text, font_name, size_pt, bold=False):
+    """Largura do texto em pontos na fonte instalada"""
+    return get_metrics(font_name, bold).width(text, size_pt)
+
+def reset_cache():
+    """Esquece o índice e as métricas (ex: fontes instaladas com a API no ar)"""
+    global _index
+    with _index_lock:
+        _index = None
+    with _lock:
+        _metrics.clear()
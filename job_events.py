@@ -0,0 +1,232 @@
+# job_events.py
+# -*- coding: utf-8 -*-
+"""
+Eventos de progresso dos jobs (push em vez de polling)
+
+Os workers publicam as etapas de cada job (fila, parse, renderização,
+exportação, upload, fim) e os assinantes recebem em tempo real:
+- `JobEvents`: pub/sub em memória, usado pelo stream SSE da API
+- `WebhookDispatcher`: envia a conclusão/falha para o callback_url do job,
+  agrupando eventos por URL e repetindo com backoff em caso de erro
+"""
+
+import asyncio
+import json
+import logging
+import threading
+import time
+import urllib.request
+from collections import OrderedDict
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+STAGES = ("queued", "parsing", "rendering", "exporting", "uploading", "done", "failed")
+TERMINAL_STAGES = ("done", "failed")
+
+class JobEvents:
+    """
+    Histórico + assinantes das etapas de cada job
+
+    `publish()` roda nas threads dos workers; os assinantes são filas asyncio
+    do stream SSE, alimentadas com call_soon_threadsafe.
+    """
+
+    def __init__(self, max_jobs=1000):
+        self.max_jobs = max_jobs
+        self._history = OrderedDict()  # job_id -> [evento, ...]
+        self._subscribers = {}         # job_id -> [(loop, asyncio.Queue), ...]
+        self._lock = threading.Lock()
+
+    def publish(self, job_id, stage, message=None, **data):
+        """Registra a etapa do job e avisa os assinantes"""
+        with self._lock:
+            history = self._history.pop(job_id, [])
+            # Reprocessamento do mesmo id: recomeça o histórico
+            if stage == "queued" and history and history[-1]["stage"] in TERMINAL_STAGES:
+                history = []
+            event = {
+                "id": len(history) + 1,
+                "job_id": job_id,
+                "stage": stage,
+                "message": message,
+                "at": datetime.now().isoformat(),
+            }
+            event.update(data)
+            history.append(event)
+            self._history[job_id] = history
+            while len(self._history) > self.max_jobs:
+                self._history.popitem(last=False)
+            subscribers = list(self._subscribers.get(job_id, ()))
+
+        for loop, q in subscribers:
+            try:
+                loop.call_soon_threadsafe(q.put_nowait, event)
+            except RuntimeError:  # loop já fechado
+                pass
+        return event
+
+    def history(self, job_id):
+        with self._lock:
+            return list(self._history.get(job_id, ()))
+
+    def last_stage(self, job_id):
+        with self._lock:
+            history = self._history.get(job_id)
+            return history[-1]["stage"] if history else None
+
+    def subscribe(self, job_id):
+        """
+        Assina os eventos do job (chamar dentro do event loop)
+
+        Returns:
+            (histórico até agora, asyncio.Queue com os próximos eventos)
+        """
+        q = asyncio.Queue()
+        entry = (asyncio.get_running_loop(), q)
+        with self._lock:
+            self._subscribers.setdefault(job_id, []).append(entry)
+            history = list(self._history.get(job_id, ()))
+        return history, q
+
+    def unsubscribe(self, job_id, q):
+        with self._lock:
+            subs = [s for s in self._subscribers.get(job_id, ()) if s[1] is not q]
+            if subs:
+                self._subscribers[job_id] = subs
+            else:
+                self._subscribers.pop(job_id, None)
+
+def format_sse(event, name=None):
+    """Serializa um evento no formato text/event-stream"""
+    lines = []
+    if "id" in event:
+        lines.append(f"id: {event['id']}")
+    lines.append(f"event: {name or event.get('stage', 'message')}")
+    lines.append("data: " + json.dumps(event, ensure_ascii=False))
+    return "\n".join(lines) + "\n\n"
+
+class WebhookDispatcher:
+    """
+    Entrega de webhooks em lote, com retry
+
+    Eventos para a mesma URL que chegam dentro de `batch_window` segundos
+    vão em um único POST `{"events": [...]}`. Falhas (erro de rede ou
+    status fora de 2xx) são repetidas com backoff exponencial até
+    `max_attempts`; depois disso o lote é descartado (com log).
+    """
+
+    def __init__(self, batch_window=1.0, max_batch=50, max_attempts=5,
+                 backoff=2.0, timeout=10.0, sender=None):
+        self.batch_window = batch_window
+        self.max_batch = max_batch
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.timeout = timeout
+        self.sender = sender or self._post
+        self._pending = OrderedDict()  # url -> {"events", "attempts", "due"}
+        self._cond = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        self.delivered = 0
+        self.dropped = 0
+
+    def start(self):
+        with self._cond:
+            if self._thread:
+                return
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name="webhooks", daemon=True)
+            self._thread.start()
+
+    def enqueue(self, url, event):
+        """Agenda o evento para a URL (entregue em até batch_window segundos)"""
+        with self._cond:
+            batch = self._pending.get(url)
+            if batch is None:
+                batch = {"events": [], "attempts": 0, "due": time.monotonic() + self.batch_window}
+                self._pending[url] = batch
+            batch["events"].append(event)
+            if len(batch["events"]) >= self.max_batch and batch["attempts"] == 0:
+                batch["due"] = time.monotonic()
+            self._cond.notify()
+
+    def shutdown(self, timeout=None):
+        """Tenta entregar o que falta (uma vez) e para a thread"""
+        with self._cond:
+            self._stopping = True
+            for batch in self._pending.values():
+                batch["due"] = 0
+            self._cond.notify()
+            thread, self._thread = self._thread, None
+        if thread:
+            thread.join(timeout)
+
+    def status(self):
+        with self._cond:
+            return {
+                "pending_urls": len(self._pending),
+                "pending_events": sum(len(b["events"]) for b in self._pending.values()),
+                "delivered": self.delivered,
+                "dropped": self.dropped,
+            }
+
+    def _post(self, url, body):
+        req = urllib.request.Request(
+            url, data=body, method="POST",
+            headers={"Content-Type": "application/json", "User-Agent": "cardapio-api-webhook"},
+        )
+        with urllib.request.urlopen(req, timeout=self.timeout) as resp:
+            if not 200 <= resp.status < 300:
+                raise RuntimeError(f"HTTP {resp.status}")
+
+    def _next_due(self):
+        now = time.monotonic()
+        for url, batch in self._pending.items():
+            if batch["due"] <= now:
+                return url, batch
+        return None, None
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while True:
+                    url, batch = self._next_due()
+                    if url is not None:
+                        del self._pending[url]
+                        break
+                    if self._stopping:
+                        return
+                    wait = min((b["due"] for b in self._pending.values()), default=None)
+                    self._cond.wait(None if wait is None else max(0.0, wait - time.monotonic()))
+
+            events = batch["events"][:self.max_batch]
+            rest = batch["events"][self.max_batch:]
+            body = json.dumps({"events": events}, ensure_ascii=False).encode("utf-8")
+            try:
+                self.sender(url, body)
+                with self._cond:
+                    self.delivered += len(events)
+                logger.info(f"🔔 Webhook entregue: {url} ({len(events)} evento(s))")
+                failed = None
+            except Exception as e:
+                failed = e
+
+            with self._cond:
+                if failed is not None:
+                    attempts = batch["attempts"] + 1
+                    if attempts >= self.max_attempts or self._stopping:
+                        self.dropped += len(events)
+                        logger.error(f"❌ Webhook descartado após {attempts} tentativa(s): {url} ({failed})")
+                    else:
+                        delay = self.backoff ** attempts
+                        logger.warning(f"⚠️ Webhook falhou ({failed}); nova tentativa em {delay:.0f}s: {url}")
+                        self._requeue(url, events, attempts, time.monotonic() + delay)
+                if rest:
+                    self._requeue(url, rest, 0, time.monotonic())
+
+    def _requeue(self, url, events, attempts, due):
+        # Eventos novos que chegaram para a URL durante o envio vão junto
+        current = self._pending.pop(url, None)
+        merged = events + (current["events"] if current else [])
+        self._pending[url] = {"events": merged, "attempts": attempts, "due": due}
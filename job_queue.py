@@ -0,0 +1,223 @@
+# job_queue.py
+# -*- coding: utf-8 -*-
+"""
+Fila limitada de jobs de renderização
+
+Substitui os BackgroundTasks do FastAPI (threadpool sem limite e sem ordem)
+por uma fila FIFO com capacidade fixa, consumida por um número fixo de
+workers. Quando a fila enche, `submit()` recusa o job (a API responde 429
+com Retry-After) em vez de empilhar trabalho em cima do CorelDRAW.
+
+`reserve()` garante a vaga antes de o job ser gravado no banco: a API só
+substitui o registro de um id reenviado depois de saber que o job entra na
+fila, então um 429 nunca apaga o job anterior.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+class QueueFull(Exception):
+    """Fila cheia: o chamador deve tentar de novo depois de `retry_after` s"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Fila de renderização cheia (tente em {retry_after}s)")
+        self.retry_after = retry_after
+
+class Reservation:
+    """
+    Vagas reservadas na fila (ver JobQueue.reserve)
+
+    `submit()` consome uma vaga; `release()` (ou o fim do bloco `with`)
+    devolve as que não foram usadas.
+    """
+
+    def __init__(self, queue, count):
+        self._queue = queue
+        self.remaining = count
+
+    def submit(self, job_id, fn, *args, **kwargs):
+        """Enfileira o job numa vaga reservada; devolve a posição na fila"""
+        if self.remaining <= 0:
+            raise RuntimeError("Reserva da fila sem vagas restantes")
+        self.remaining -= 1
+        return self._queue._put_reserved(job_id, fn, args, kwargs)
+
+    def release(self):
+        """Devolve as vagas não usadas"""
+        if self.remaining:
+            self._queue._release(self.remaining)
+            self.remaining = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
+
+class JobQueue:
+    """
+    Fila FIFO limitada + workers dedicados
+
+    Cada item é (job_id, fn, args, kwargs); o worker chama fn(*args, **kwargs)
+    e registra a duração para estimar o tempo de espera da fila.
+    """
+
+    def __init__(self, maxsize=20, workers=1, name="render"):
+        self.maxsize = maxsize
+        self.workers = max(1, workers)
+        self.name = name
+        self._pending = deque()
+        self._reserved = 0  # vagas reservadas ainda não ocupadas
+        self._running = set()
+        self._cond = threading.Condition()
+        self._threads = []
+        self._stopping = False
+        self._avg_duration = None  # média móvel (s) da duração dos jobs
+        self.completed = 0
+        self.rejected = 0
+
+    def start(self):
+        """Inicia os workers (idempotente)"""
+        with self._cond:
+            if self._threads:
+                return
+            self._stopping = False
+            for i in range(self.workers):
+                t = threading.Thread(
+                    target=self._worker, name=f"{self.name}-worker-{i}", daemon=True
+                )
+                t.start()
+                self._threads.append(t)
+        logger.info(f"🧵 Fila '{self.name}': {self.workers} worker(s), capacidade {self.maxsize}")
+
+    def submit(self, job_id, fn, *args, **kwargs):
+        """
+        Enfileira um job
+
+        Returns:
+            Posição do job na fila (1 = próximo a rodar)
+
+        Raises:
+            QueueFull: fila na capacidade máxima
+        """
+        with self.reserve() as slot:
+            return slot.submit(job_id, fn, *args, **kwargs)
+
+    def reserve(self, count=1, timeout=0):
+        """
+        Reserva vagas na fila sem enfileirar nada ainda
+
+        Args:
+            timeout: Segundos para esperar vaga (0 = recusa na hora)
+
+        Returns:
+            Reservation (usar com `with`: vagas não usadas voltam no fim)
+
+        Raises:
+            QueueFull: não há `count` vagas livres (dentro do timeout)
+        """
+        deadline = time.monotonic() + timeout
+        with self._cond:
+            while len(self._pending) + self._reserved + count > self.maxsize:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or self._stopping:
+                    self.rejected += 1
+                    raise QueueFull(self._retry_after_locked())
+                self._cond.wait(remaining)
+            self._reserved += count
+        return Reservation(self, count)
+
+    def _put_reserved(self, job_id, fn, args, kwargs):
+        with self._cond:
+            self._reserved -= 1
+            self._pending.append((job_id, fn, args, kwargs))
+            # Workers e reserve() esperam na mesma condição: acorda todos
+            self._cond.notify_all()
+            return len(self._pending)
+
+    def _release(self, count):
+        with self._cond:
+            self._reserved -= count
+            self._cond.notify_all()
+
+    def position(self, job_id):
+        """Posição do job na fila (1 = próximo), 0 se rodando, None se ausente"""
+        with self._cond:
+            if job_id in self._running:
+                return 0
+            for i, item in enumerate(self._pending, 1):
+                if item[0] == job_id:
+                    return i
+            return None
+
+    def depth(self):
+        """Número de jobs aguardando (sem contar os em execução)"""
+        with self._cond:
+            return len(self._pending)
+
+    def retry_after(self):
+        """Estimativa (s) de quando haverá vaga na fila"""
+        with self._cond:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self):
+        # Uma vaga abre quando algum worker termina: ~duração média / workers
+        avg = self._avg_duration if self._avg_duration is not None else 5.0
+        return max(1, int(round(avg / self.workers)))
+
+    def status(self):
+        """Resumo da fila para /health"""
+        with self._cond:
+            return {
+                "workers": self.workers,
+                "capacity": self.maxsize,
+                "depth": len(self._pending),
+                "reserved": self._reserved,
+                "running": len(self._running),
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "avg_job_seconds": round(self._avg_duration, 3) if self._avg_duration is not None else None,
+            }
+
+    def shutdown(self, timeout=None):
+        """Para os workers depois dos jobs em execução (os pendentes são descartados)"""
+        with self._cond:
+            self._stopping = True
+            dropped = len(self._pending)
+            self._pending.clear()
+            self._cond.notify_all()
+            threads, self._threads = self._threads, []
+        for t in threads:
+            t.join(timeout)
+        if dropped:
+            logger.warning(f"⚠️ Fila '{self.name}': {dropped} job(s) pendente(s) descartado(s)")
+
+    def _worker(self):
+        while True:
+            with self._cond:
+                while not self._pending and not self._stopping:
+                    self._cond.wait()
+                if self._stopping:
+                    return
+                job_id, fn, args, kwargs = self._pending.popleft()
+                self._running.add(job_id)
+                self._cond.notify_all()  # vaga livre para quem espera em reserve()
+
+            t0 = time.perf_counter()
+            try:
+                fn(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"[{job_id}] Erro não tratado no worker: {e}", exc_info=True)
+            finally:
+                elapsed = time.perf_counter() - t0
+                with self._cond:
+                    self._running.discard(job_id)
+                    self.completed += 1
+                    if self._avg_duration is None:
+                        self._avg_duration = elapsed
+                    else:
+                        self._avg_duration = 0.8 * self._avg_duration + 0.2 * elapsed
@@ -0,0 +1,484 @@
+# job_store.py
+# -*- coding: utf-8 -*-
+"""
+Armazenamento persistente de jobs (SQLite em modo WAL)
+
+Substitui o dict `jobs_cache` da API:
+- sobrevive a reinícios (jobs pendentes são reenfileirados no startup)
+- é compartilhado entre workers do uvicorn (mesmo arquivo); cada job não
+  finalizado tem um dono (o processo que o enfileirou) com lease renovado
+  por heartbeat, e só jobs de lease vencido (dono morto) são assumidos por
+  outro processo
+- expira jobs finalizados depois de um TTL
+- consulta por job_id pela chave primária (sub-milissegundo mesmo com
+  milhões de jobs); listagens paginam por cursor (keyset) sobre os índices
+  (status, created_at, job_id) / (created_at, job_id), sem OFFSET
+
+Cada thread usa sua própria conexão (sqlite3 não compartilha conexões
+entre threads com segurança); o WAL permite leituras durante as escritas
+dos workers.
+"""
+
+import base64
+import os
+import socket
+import time
+import uuid
+import heapq
+import json
+import logging
+import sqlite3
+import threading
+from datetime import datetime, timedelta
+from itertools import islice
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    job_id       TEXT PRIMARY KEY,
+    status       TEXT NOT NULL,
+    message      TEXT,
+    files        TEXT,
+    supabase_url TEXT,
+    created_at   TEXT NOT NULL,
+    completed_at TEXT,
+    request      TEXT,
+    batch_id     TEXT,
+    request_hash TEXT,
+    owner        TEXT,
+    lease_until  REAL
+);
+"""
+
+# Colunas acrescentadas depois da primeira versão (bancos já existentes)
+MIGRATIONS = {
+    "batch_id": "ALTER TABLE jobs ADD COLUMN batch_id TEXT",
+    "request_hash": "ALTER TABLE jobs ADD COLUMN request_hash TEXT",
+    "owner": "ALTER TABLE jobs ADD COLUMN owner TEXT",
+    "lease_until": "ALTER TABLE jobs ADD COLUMN lease_until REAL",
+}
+
+INDEXES = """
+DROP INDEX IF EXISTS idx_jobs_status_created;
+DROP INDEX IF EXISTS idx_jobs_created;
+CREATE INDEX IF NOT EXISTS idx_jobs_status_created_id ON jobs (status, created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_created_id ON jobs (created_at, job_id);
+CREATE INDEX IF NOT EXISTS idx_jobs_batch ON jobs (batch_id) WHERE batch_id IS NOT NULL;
+"""
+
+# Colunas expostas pela API (request/request_hash ficam internos: servem para
+# reenfileirar e para juntar envios duplicados)
+PUBLIC_FIELDS = ("job_id", "status", "message", "files", "supabase_url", "created_at",
+                 "completed_at", "batch_id")
+JSON_FIELDS = ("files", "request")
+UNFINISHED = ("pending", "processing")
+FINISHED = ("completed", "failed")
+
+def encode_cursor(created_at, job_id):
+    """Cursor opaco da paginação: posição (created_at, job_id) do último job"""
+    raw = json.dumps([created_at, job_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+def decode_cursor(cursor):
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, job_id = json.loads(raw)
+        return str(created_at), str(job_id)
+    except Exception:
+        raise ValueError("Cursor inválido")
+
+class JobStore:
+    """
+    Jobs da API em SQLite
+
+    Os registros são dicts no mesmo formato do antigo jobs_cache
+    (job_id, status, message, files, supabase_url, created_at, completed_at).
+    """
+
+    def __init__(self, path, ttl_seconds=7 * 24 * 3600, purge_interval=3600, on_expired=None,
+                 lease_seconds=30, owner=None):
+        """
+        Args:
+            ttl_seconds: Idade (created_at) a partir da qual jobs finalizados expiram
+            purge_interval: Intervalo mínimo (s) entre expirações automáticas
+            on_expired: Callback chamado com cada job_id expirado
+            lease_seconds: Validade do lease dos jobs deste processo (renovar
+                com renew_leases() bem antes disso)
+            owner: Identificador deste processo (padrão: host:pid:aleatório)
+        """
+        self.path = str(path)
+        self.lease_seconds = lease_seconds
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.ttl_seconds = ttl_seconds
+        self.purge_interval = purge_interval
+        self.on_expired = on_expired
+        self._local = threading.local()
+        self._purge_lock = threading.Lock()
+        self._last_purge = None
+
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        columns = {row["name"] for row in conn.execute("PRAGMA table_info(jobs)")}
+        for column, ddl in MIGRATIONS.items():
+            if column not in columns:
+                conn.execute(ddl)
+        conn.executescript(INDEXES)
+        conn.commit()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA busy_timeout=30000")
+            self._local.conn = conn
+        return conn
+
+    @staticmethod
+    def _encode(fields):
+        return {
+            k: (json.dumps(v, ensure_ascii=False) if k in JSON_FIELDS and v is not None else v)
+            for k, v in fields.items()
+        }
+
+    @staticmethod
+    def _decode(row, fields=PUBLIC_FIELDS):
+        job = {}
+        for k in fields:
+            v = row[k]
+            job[k] = json.loads(v) if k in JSON_FIELDS and v is not None else v
+        return job
+
+    def create(self, job_id, status="pending", message="Processamento iniciado",
+               request=None, created_at=None, batch_id=None, completed_at=None,
+               request_hash=None):
+        """Cria (ou substitui, no reprocessamento) o registro do job"""
+        job = self._new_job(job_id, status, message, created_at, batch_id, completed_at)
+        conn = self._conn()
+        with conn:
+            self._insert(conn, job, request, request_hash)
+        self._maybe_purge()
+        return job
+
+    def claim(self, job_id, request_hash, request=None, message="Processamento iniciado"):
+        """
+        Cria o job, a menos que o mesmo id ainda esteja pendente/em processamento
+
+        Verificação e criação na mesma transação (BEGIN IMMEDIATE), então
+        envios simultâneos do mesmo id - inclusive de outros workers do
+        uvicorn - nunca criam dois jobs.
+
+        Returns:
+            (job, created); com created False, job é o job em andamento e
+            traz também o request_hash dele
+        """
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(PUBLIC_FIELDS)}, request_hash FROM jobs WHERE job_id = ?",
+                (job_id,),
+            ).fetchone()
+            if row and row["status"] in UNFINISHED:
+                conn.rollback()
+                return self._decode(row, PUBLIC_FIELDS + ("request_hash",)), False
+            job = self._new_job(job_id, "pending", message)
+            self._insert(conn, job, request, request_hash)
+            conn.commit()
+        except BaseException:
+            conn.rollback()
+            raise
+        self._maybe_purge()
+        return job, True
+
+    @staticmethod
+    def _new_job(job_id, status, message, created_at=None, batch_id=None, completed_at=None):
+        return {
+            "job_id": job_id,
+            "status": status,
+            "message": message,
+            "files": None,
+            "supabase_url": None,
+            "created_at": created_at or datetime.now().isoformat(),
+            "completed_at": completed_at,
+            "batch_id": batch_id,
+        }
+
+    def _insert(self, conn, job, request, request_hash):
+        # Job não finalizado nasce com este processo como dono
+        unfinished = job["status"] in UNFINISHED
+        row = self._encode(dict(
+            job, request=request, request_hash=request_hash,
+            owner=self.owner if unfinished else None,
+            lease_until=time.time() + self.lease_seconds if unfinished else None,
+        ))
+        conn.execute(
+            "INSERT OR REPLACE INTO jobs (job_id, status, message, files, supabase_url, "
+            "created_at, completed_at, request, batch_id, request_hash, owner, lease_until) "
+            "VALUES (:job_id, :status, :message, :files, :supabase_url, :created_at, "
+            ":completed_at, :request, :batch_id, :request_hash, :owner, :lease_until)",
+            row,
+        )
+
+    def get(self, job_id):
+        """Job pelo id (dict) ou None"""
+        row = self._conn().execute(
+            f"SELECT {', '.join(PUBLIC_FIELDS)} FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone()
+        return self._decode(row) if row else None
+
+    def batch(self, batch_id):
+        """Jobs de um lote, na ordem de envio"""
+        rows = self._conn().execute(
+            f"SELECT {', '.join(PUBLIC_FIELDS)} FROM jobs WHERE batch_id = ? ORDER BY rowid",
+            (batch_id,),
+        ).fetchall()
+        return [self._decode(r) for r in rows]
+
+    def __contains__(self, job_id):
+        return self._conn().execute(
+            "SELECT 1 FROM jobs WHERE job_id = ?", (job_id,)
+        ).fetchone() is not None
+
+    def update(self, job_id, **fields):
+        """Atualiza campos do job; devolve False se o job não existe"""
+        if not fields:
+            return job_id in self
+        unknown = set(fields) - set(PUBLIC_FIELDS) - {"request"}
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+        row = self._encode(fields)
+        assignments = ", ".join(f"{k} = :{k}" for k in row)
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                f"UPDATE jobs SET {assignments} WHERE job_id = :_job_id",
+                dict(row, _job_id=job_id),
+            )
+        return cur.rowcount > 0
+
+    def delete(self, job_id):
+        conn = self._conn()
+        with conn:
+            cur = conn.execute("DELETE FROM jobs WHERE job_id = ?", (job_id,))
+        return cur.rowcount > 0
+
+    @staticmethod
+    def _filters(statuses=None, created_from=None, created_to=None):
+        where, params = [], []
+        if statuses:
+            where.append(f"status IN ({', '.join('?' for _ in statuses)})")
+            params.extend(statuses)
+        if created_from:
+            where.append("created_at >= ?")
+            params.append(created_from)
+        if created_to:
+            where.append("created_at <= ?")
+            params.append(created_to)
+        return where, params
+
+    def count(self, statuses=None, created_from=None, created_to=None):
+        """Número de jobs (com os mesmos filtros de page)"""
+        where, params = self._filters(statuses, created_from, created_to)
+        sql = "SELECT COUNT(*) FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return self._conn().execute(sql, params).fetchone()[0]
+
+    def page(self, limit=50, cursor=None, statuses=None, created_from=None,
+             created_to=None, fields=None):
+        """
+        Página de jobs, mais recentes primeiro (paginação por cursor)
+
+        Args:
+            cursor: next_cursor da página anterior (None = primeira página)
+            statuses: Filtra por status (lista)
+            created_from, created_to: Intervalo de created_at (ISO, inclusivo)
+            fields: Colunas devolvidas (job_id sempre incluído)
+
+        Returns:
+            (jobs, next_cursor); next_cursor None na última página
+
+        Raises:
+            ValueError: cursor ou campo inválido
+        """
+        fields = tuple(fields or PUBLIC_FIELDS)
+        unknown = set(fields) - set(PUBLIC_FIELDS)
+        if unknown:
+            raise ValueError(f"Campos desconhecidos: {', '.join(sorted(unknown))}")
+        if "job_id" not in fields:
+            fields = ("job_id",) + fields
+        select = fields if "created_at" in fields else fields + ("created_at",)
+
+        after = decode_cursor(cursor) if cursor else None
+
+        # Um SELECT por status: cada um percorre o índice (status, created_at,
+        # job_id) já na ordem e para no LIMIT; vários status são intercalados
+        # aqui, em vez de o SQLite ordenar todos os jobs que batem no filtro
+        groups = [[st] for st in statuses] if statuses else [None]
+        rows = heapq.merge(
+            *(self._page_rows(select, limit + 1, after, group, created_from, created_to)
+              for group in groups),
+            key=lambda r: (r["created_at"], r["job_id"]),
+            reverse=True,
+        )
+        rows = list(islice(rows, limit + 1))
+
+        next_cursor = None
+        if len(rows) > limit:
+            rows = rows[:limit]
+            next_cursor = encode_cursor(rows[-1]["created_at"], rows[-1]["job_id"])
+        return [self._decode(r, fields) for r in rows], next_cursor
+
+    def _page_rows(self, select, limit, after, statuses, created_from, created_to):
+        where, params = self._filters(statuses, created_from, created_to)
+        if after:
+            where.append("(created_at, job_id) < (?, ?)")
+            params.extend(after)
+
+        sql = f"SELECT {', '.join(select)} FROM jobs"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY created_at DESC, job_id DESC LIMIT ?"
+        params.append(limit)
+        return self._conn().execute(sql, params).fetchall()
+
+    def unfinished(self):
+        """Jobs pendentes/em processamento (com o request), mais antigos primeiro"""
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE status IN (?, ?) ORDER BY created_at",
+            UNFINISHED,
+        ).fetchall()
+        return [self._decode(r, PUBLIC_FIELDS + ("request",)) for r in rows]
+
+    def renew_leases(self):
+        """Renova o lease dos jobs não finalizados deste processo; devolve quantos"""
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET lease_until = ? WHERE owner = ? AND status IN (?, ?)",
+                (time.time() + self.lease_seconds, self.owner) + UNFINISHED,
+            )
+        return cur.rowcount
+
+    def expired_leases(self, now=None):
+        """
+        Jobs não finalizados cujo dono parou de renovar o lease (processo
+        morto) ou sem dono, com o request, mais antigos primeiro
+        """
+        rows = self._conn().execute(
+            "SELECT * FROM jobs WHERE status IN (?, ?) AND (owner IS NULL OR lease_until < ?) "
+            "ORDER BY created_at",
+            UNFINISHED + (now or time.time(),),
+        ).fetchall()
+        return [self._decode(r, PUBLIC_FIELDS + ("request",)) for r in rows]
+
+    def take(self, job_id, now=None):
+        """
+        Assume um job de lease vencido para este processo
+
+        UPDATE atômico condicionado ao lease: se dois processos tentam
+        assumir o mesmo job, só um consegue.
+
+        Returns:
+            True se este processo virou o dono
+        """
+        now = now or time.time()
+        conn = self._conn()
+        with conn:
+            cur = conn.execute(
+                "UPDATE jobs SET owner = ?, lease_until = ? WHERE job_id = ? "
+                "AND status IN (?, ?) AND (owner IS NULL OR lease_until < ?)",
+                (self.owner, now + self.lease_seconds, job_id) + UNFINISHED + (now,),
+            )
+        return cur.rowcount > 0
+
+    def release(self, job_id):
+        """Devolve um job assumido (ex: fila cheia) para qualquer processo assumir"""
+        conn = self._conn()
+        with conn:
+            conn.execute(
+                "UPDATE jobs SET owner = NULL, lease_until = NULL WHERE job_id = ? AND owner = ?",
+                (job_id, self.owner),
+            )
+
+    def purge_expired(self, now=None):
+        """
+        Remove jobs finalizados mais antigos que o TTL (chama on_expired)
+
+        Returns:
+            Lista dos job_ids removidos
+        """
+        cutoff = ((now or datetime.now()) - timedelta(seconds=self.ttl_seconds)).isoformat()
+        conn = self._conn()
+        with conn:
+            expired = [
+                r[0] for r in conn.execute(
+                    "SELECT job_id FROM jobs WHERE status IN (?, ?) AND created_at < ?",
+                    FINISHED + (cutoff,),
+                )
+            ]
+            conn.executemany("DELETE FROM jobs WHERE job_id = ?", [(j,) for j in expired])
+        if expired:
+            logger.info(f"🧹 {len(expired)} job(s) expirado(s) removido(s) do banco")
+        if self.on_expired:
+            for job_id in expired:
+                self.on_expired(job_id)
+        return expired
+
+    def _maybe_purge(self):
+        now = datetime.now()
+        with self._purge_lock:
+            if self._last_purge and (now - self._last_purge).total_seconds() < self.purge_interval:
+                return
+            self._last_purge = now
+        try:
+            self.purge_expired(now)
+        except sqlite3.Error as e:
+            logger.warning(f"⚠️ Falha ao expirar jobs: {e}")
+
+    def close(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+class LeaseHeartbeat:
+    """
+    Thread que renova os leases deste processo a cada `interval` segundos
+
+    `on_beat` (opcional) roda depois de cada renovação, ex: assumir jobs de
+    processos que morreram.
+    """
+
+    def __init__(self, store, interval=None, on_beat=None):
+        self.store = store
+        self.interval = interval or store.lease_seconds / 3.0
+        self.on_beat = on_beat
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-lease-heartbeat", daemon=True)
+        self._thread.start()
+
+    def shutdown(self, timeout=None):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.store.renew_leases()
+                if self.on_beat:
+                    self.on_beat()
+            except Exception as e:
+                logger.warning(f"⚠️ Falha no heartbeat dos jobs: {e}")
@@ -0,0 +1,220 @@
+# macro_render.py
+# -*- coding: utf-8 -*-
+"""
+Modo de renderização por macro (uma única chamada COM por cardápio)
+
+Em vez de dezenas/centenas de chamadas COM finas (criar shape, Font, Size,
+Alignment, Fill, um Range por categoria...), o layout inteiro é serializado
+em um payload de texto e enviado ao macro VBA `macros/CardapioRender.bas`
+com um único `GMSManager.RunMacro`.
+
+Formato do payload: registros separados por RS (chr 30), campos por US
+(chr 31). Números sempre com ponto decimal (lidos com Val() no VBA).
+
+    V  versão
+    P  fonte  tamanho                         estilo dos blocos
+    G  páginas                                páginas do documento (cópias da 1ª)
+    T  texto  x  y  fonte  tamanho            título centralizado em x (em cada página)
+    F  idx  left  bottom  right  top  página  caixa de parágrafo
+    L  anterior  idx                          caixa idx continua a anterior (sem B/S)
+    B  idx  texto                             texto da caixa idx
+    S  idx  início  fim  negrito(0/1)  tam    span de estilo (tam 0 = manter)
+"""
+
+import logging
+
+logger = logging.getLogger(__name__)
+
+PAYLOAD_VERSION = 3
+RS = chr(30)
+US = chr(31)
+
+MACRO_PROJECT = "CardapioMacros"
+MACRO_NAME = "CardapioRender.Render"
+
+def _clean(text):
+    """Remove os separadores do payload de um texto livre"""
+    return str(text).replace(RS, " ").replace(US, " ")
+
+def _num(value):
+    return repr(float(value))
+
+def build_render_payload(title, title_x, title_y, columns, font_name="Arial",
+                         font_size_pt=10.0, title_font=None, title_size_pt=24.0):
+    """
+    Monta o payload (dict) com tudo que o macro precisa desenhar
+
+    Args:
+        title: Nome do restaurante
+        title_x, title_y: Centro horizontal e linha de base do título
+        columns: Saída de builder.compose_columns
+    """
+    return {
+        "version": PAYLOAD_VERSION,
+        "font": font_name,
+        "font_size": float(font_size_pt),
+        "pages": max((col.get("page", 1) for col in columns), default=1),
+        "title": {
+            "text": title,
+            "x": float(title_x),
+            "y": float(title_y),
+            "font": title_font or font_name,
+            "size": float(title_size_pt),
+        },
+        "frames": [
+            {
+                "rect": [float(v) for v in col["frame"]],
+                "page": col.get("page", 1),
+                "linked": col.get("linked", False),
+                "text": col["text"],
+                "spans": col["spans"],
+            }
+            for col in columns
+        ],
+    }
+
+def encode_payload(payload):
+    """Serializa o payload no formato RS/US lido pelo macro VBA"""
+    font_size = payload["font_size"]
+    records = [
+        ["V", str(payload["version"])],
+        ["P", _clean(payload["font"]), _num(font_size)],
+    ]
+    # Páginas antes do título e das caixas: o macro copia a página 1 do
+    # template enquanto ela ainda não tem texto
+    if payload.get("pages", 1) > 1:
+        records.append(["G", str(payload["pages"])])
+
+    title = payload.get("title")
+    if title and title.get("text"):
+        records.append([
+            "T", _clean(title["text"]), _num(title["x"]), _num(title["y"]),
+            _clean(title["font"]), _num(title["size"]),
+        ])
+
+    for idx, frame in enumerate(payload["frames"], 1):
+        records.append(["F", str(idx)] + [_num(v) for v in frame["rect"]] + [str(frame.get("page", 1))])
+        if frame.get("linked"):
+            # Texto e estilo vêm da story da caixa anterior
+            records.append(["L", str(idx - 1), str(idx)])
+            continue
+        records.append(["B", str(idx), _clean(frame["text"])])
+        for span in frame["spans"]:
+            size = font_size + span["size_delta"] if span.get("size_delta") else 0.0
+            records.append([
+                "S", str(idx), str(span["start"]), str(span["end"]),
+                "1" if span.get("bold") else "0", _num(size),
+            ])
+
+    return RS.join(US.join(fields) for fields in records)
+
+def decode_payload(encoded):
+    """Inverso de encode_payload (usado pelo host local)"""
+    payload = {"version": None, "font": "Arial", "font_size": 10.0, "pages": 1, "title": None, "frames": []}
+    frames = {}
+
+    for record in encoded.split(RS):
+        f = record.split(US)
+        kind = f[0]
+        if kind == "V":
+            payload["version"] = int(f[1])
+        elif kind == "P":
+            payload["font"] = f[1]
+            payload["font_size"] = float(f[2])
+        elif kind == "G":
+            payload["pages"] = int(f[1])
+        elif kind == "T":
+            payload["title"] = {
+                "text": f[1], "x": float(f[2]), "y": float(f[3]),
+                "font": f[4], "size": float(f[5]),
+            }
+        elif kind == "F":
+            # Payload v1 não tem o campo da página: tudo na página 1
+            page = int(f[6]) if len(f) > 6 else 1
+            frame = {"rect": [float(v) for v in f[2:6]], "page": page, "linked": False,
+                     "text": "", "spans": []}
+            frames[f[1]] = frame
+            payload["frames"].append(frame)
+        elif kind == "L":
+            frames[f[2]]["linked"] = True
+        elif kind == "B":
+            frames[f[1]]["text"] = f[2]
+        elif kind == "S":
+            size = float(f[5])
+            frames[f[1]]["spans"].append({
+                "start": int(f[2]),
+                "end": int(f[3]),
+                "bold": f[4] == "1",
+                "size_delta": size - payload["font_size"] if size else 0.0,
+            })
+
+    return payload
+
+def run_render_macro(corel, payload, project=MACRO_PROJECT, macro=MACRO_NAME):
+    """
+    Desenha o payload no documento ativo com UMA chamada COM
+
+    Returns:
+        Valor devolvido pelo macro (número de shapes criadas)
+    """
+    encoded = encode_payload(payload)
+    logger.info(f"📦 RunMacro {project}.{macro} ({len(encoded)} bytes)")
+    return corel.GMSManager.RunMacro(project, macro, encoded)
+
+def render_payload(doc, payload):
+    """
+    Executa o payload em Python, com as mesmas operações do macro VBA
+
+    Referência do que o macro faz; usado pelo LocalMacroHost.
+    """
+    import build_cardapio_dinamico as builder
+
+    pages = builder.add_pages(doc, payload.get("pages", 1))
+    created = 0
+
+    title = payload.get("title")
+    if title and title.get("text"):
+        for page in pages:
+            builder.create_title(page.ActiveLayer, title["text"], title["x"], title["y"],
+                                 font_name=title["font"], font_size_pt=title["size"])
+            created += 1
+
+    shape = None
+    for idx, frame in enumerate(payload["frames"], 1):
+        layer = pages[frame.get("page", 1) - 1].ActiveLayer
+        previous, shape = shape, builder.create_paragraph_text(layer, *frame["rect"],
+                                                               name=builder.column_shape_name(idx))
+        created += 1
+        if frame.get("linked"):
+            builder.link_text_frame(previous, shape)
+            continue
+        builder.fill_paragraph(shape, frame["text"])
+        tr = shape.Text.Story
+        tr.Font = payload["font"]
+        tr.Size = payload["font_size"]
+        tr.Alignment = 0
+        try:
+            tr.Fill.UniformColor.CMYKAssign(0, 0, 0, 100)
+        except Exception:
+            pass
+        builder.apply_spans(tr, frame["spans"], payload["font_size"])
+
+    return created
+
+class LocalMacroHost:
+    """
+    Substituto de GMSManager que roda o "macro" em Python
+
+    Permite exercitar o modo macro sem CorelDRAW/VBA:
+        app.GMSManager = LocalMacroHost(app)
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.calls = []
+
+    def RunMacro(self, project, macro, encoded):
+        self.calls.append((project, macro, len(encoded)))
+        if (project, macro) != (MACRO_PROJECT, MACRO_NAME):
+            raise RuntimeError(f"Macro não encontrado: {project}.{macro}")
+        return render_payload(self.app.ActiveDocument, decode_payload(encoded))
@@ -0,0 +1,108 @@
+Attribute VB_Name = "CardapioRender"
+' CardapioRender.bas
+' Macro do modo de renderização "macro" da API (ver macro_render.py)
+'
+' Instalação: importar este módulo em um projeto GMS chamado "CardapioMacros"
+' (Ferramentas > Scripts > Editor de Macros > Arquivo > Importar) e salvar
+' o projeto em GMS\CardapioMacros.gms.
+'
+' Payload: registros separados por Chr(30), campos por Chr(31).
+'   V versão | P fonte tamanho | G páginas | T texto x y fonte tamanho
+'   F idx left bottom right top página | L anterior idx | B idx texto
+'   S idx início fim negrito tamanho
+' G (opcional) vem antes de T/F: as páginas novas são cópias da página 1 do
+' template (tamanho e shapes); o título é criado em todas as páginas.
+' L vincula a caixa idx à anterior (caixas vinculadas): o CorelDRAW continua
+' nela o texto que não cabe na anterior; caixas vinculadas não têm B/S.
+Option Explicit
+
+Public Function Render(ByVal payload As String) As Long
+    Dim doc As Document
+    Dim lyr As Layer
+    Dim recs() As String
+    Dim f() As String
+    Dim i As Long
+    Dim p As Long
+    Dim pg As Long
+    Dim tpl As ShapeRange
+    Dim created As Long
+    Dim frames As New Collection
+    Dim fontName As String
+    Dim fontSize As Double
+    Dim s As Shape
+    Dim tr As TextRange
+
+    Set doc = ActiveDocument
+    Set lyr = doc.ActivePage.ActiveLayer
+    fontName = "Arial"
+    fontSize = 10
+
+    Optimization = True
+    On Error GoTo Falha
+
+    recs = Split(payload, Chr(30))
+    For i = LBound(recs) To UBound(recs)
+        f = Split(recs(i), Chr(31))
+        Select Case f(0)
+            Case "P"
+                fontName = f(1)
+                fontSize = Val(f(2))
+
+            Case "G"
+                If CLng(f(1)) > doc.Pages.Count Then
+                    Set tpl = doc.Pages(1).Shapes.All
+                    doc.AddPages CLng(f(1)) - doc.Pages.Count
+                    For p = 2 To doc.Pages.Count
+                        doc.Pages(p).SetSize doc.Pages(1).SizeWidth, doc.Pages(1).SizeHeight
+                        If tpl.Count > 0 Then tpl.CopyToLayer doc.Pages(p).ActiveLayer
+                    Next p
+                End If
+
+            Case "T"
+                For p = 1 To doc.Pages.Count
+                    Set s = doc.Pages(p).ActiveLayer.CreateArtisticText(0, Val(f(3)), f(1))
+                    s.Text.Story.Font = f(4)
+                    s.Text.Story.Size = Val(f(5))
+                    s.Text.Story.Bold = True
+                    s.Text.Story.Fill.UniformColor.CMYKAssign 0, 0, 0, 100
+                    s.LeftX = Val(f(2)) - s.SizeWidth / 2
+                    created = created + 1
+                Next p
+
+            Case "F"
+                pg = 1
+                If UBound(f) >= 6 Then pg = CLng(f(6))
+                Set lyr = doc.Pages(pg).ActiveLayer
+                Set s = lyr.CreateParagraphText(Val(f(2)), Val(f(3)), Val(f(4)), Val(f(5)), "")
+                s.Text.FitToFrame = False
+                s.Name = "CardapioCol" & f(1)
+                frames.Add s, f(1)
+                created = created + 1
+
+            Case "L"
+                frames(f(1)).Text.Frame.LinkTo frames(f(2))
+
+            Case "B"
+                Set tr = frames(f(1)).Text.Story
+                tr.Text = f(2)
+                tr.Font = fontName
+                tr.Size = fontSize
+                tr.Alignment = cdrLeftAlignment
+                tr.Fill.UniformColor.CMYKAssign 0, 0, 0, 100
+
+            Case "S"
+                Set tr = frames(f(1)).Text.Story.Characters.Range(CLng(f(2)), CLng(f(3)))
+                If f(4) = "1" Then tr.Bold = True
+                If Val(f(5)) > 0 Then tr.Size = Val(f(5))
+        End Select
+    Next i
+
+    Optimization = False
+    ActiveWindow.Refresh
+    Render = created
+    Exit Function
+
+Falha:
+    Optimization = False
+    Err.Raise Err.Number, "CardapioRender.Render", Err.Description
+End Function
@@ -0,0 +1,229 @@
+# pdf_renderer.py
+# -*- coding: utf-8 -*-
+"""
+Renderizador PDF nativo (Python puro, sem CorelDRAW)
+
+Desenha o mesmo layout do CorelDRAW direto em PDF: mesmos frames de
+ensure_area_frames/compute_area_frames, mesmas colunas de compose_columns,
+categorias em negrito e pontilhado entre nome e preço. Gera o arquivo em
+milissegundos; o CorelDRAW continua sendo usado quando o cliente precisa
+do CDR.
+
+Fontes: Helvetica / Helvetica-Bold (fontes padrão do PDF, métricas
+compatíveis com Arial), sem embutir arquivos de fonte.
+"""
+
+import zlib
+from pathlib import Path
+
+import build_cardapio_dinamico as builder
+from font_metrics import HELVETICA, HELVETICA_BOLD
+
+# Página padrão (A4 em polegadas), usada quando não há sidecar do template
+DEFAULT_PAGE = (8.27, 11.69)
+LINE_SPACING = builder.LINE_SPACING
+TITLE_SIZE_PT = 24.0
+
+def text_width_pt(text, size_pt, bold=False):
+    """Largura do texto em pontos (métricas Helvetica)"""
+    return (HELVETICA_BOLD if bold else HELVETICA).width(text, size_pt)
+
+def _pdf_string(text):
+    raw = text.encode("cp1252", errors="replace")
+    raw = raw.replace(b"\\", b"\\\\").replace(b"(", b"\\(").replace(b")", b"\\)")
+    return b"(" + raw + b")"
+
+class PDFWriter:
+    """Escritor PDF mínimo: páginas com texto em Helvetica/Helvetica-Bold"""
+
+    FONTS = {"F1": "Helvetica", "F2": "Helvetica-Bold"}
+
+    def __init__(self):
+        self.pages = []
+
+    def add_page(self, width_pt, height_pt):
+        """Nova página; devolve a lista de operações de conteúdo (bytes)"""
+        ops = []
+        self.pages.append((width_pt, height_pt, ops))
+        return ops
+
+    @staticmethod
+    def text(ops, x, y, text, size_pt, bold=False):
+        font = b"/F2" if bold else b"/F1"
+        ops.append(
+            b"BT " + font + b" %.2f Tf %.2f %.2f Td " % (size_pt, x, y)
+            + _pdf_string(text) + b" Tj ET"
+        )
+
+    def to_bytes(self):
+        objects = []  # corpo de cada objeto, na ordem dos números 1..n
+
+        def add(body):
+            objects.append(body)
+            return len(objects)
+
+        catalog = add(None)
+        pages_id = add(None)
+        font_ids = {
+            name: add(b"<< /Type /Font /Subtype /Type1 /BaseFont /" + base.encode()
+                      + b" /Encoding /WinAnsiEncoding >>")
+            for name, base in self.FONTS.items()
+        }
+        fonts = b" ".join(b"/%s %d 0 R" % (name.encode(), oid) for name, oid in font_ids.items())
+
+        page_ids = []
+        for width, height, ops in self.pages:
+            stream = zlib.compress(b"0 g\n" + b"\n".join(ops))
+            content_id = add(
+                b"<< /Length %d /Filter /FlateDecode >>\nstream\n" % len(stream)
+                + stream + b"\nendstream"
+            )
+            page_ids.append(add(
+                b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 %.2f %.2f] "
+                b"/Resources << /Font << %s >> >> /Contents %d 0 R >>"
+                % (pages_id, width, height, fonts, content_id)
+            ))
+
+        objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+        kids = b" ".join(b"%d 0 R" % pid for pid in page_ids)
+        objects[pages_id - 1] = b"<< /Type /Pages /Kids [%s] /Count %d >>" % (kids, len(page_ids))
+
+        out = bytearray(b"%PDF-1.4\n%\xe2\xe3\xcf\xd3\n")
+        offsets = []
+        for number, body in enumerate(objects, 1):
+            offsets.append(len(out))
+            out += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+
+        xref = len(out)
+        out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+        for off in offsets:
+            out += b"%010d 00000 n \n" % off
+        out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (
+            len(objects) + 1, catalog, xref
+        )
+        return bytes(out)
+
+    def save(self, path):
+        Path(path).write_bytes(self.to_bytes())
+
+def layout_column(seq, frame_pt, font_size_pt):
+    """
+    Posiciona uma coluna (categorias/itens) dentro do frame, em pontos
+
+    Returns:
+        Lista de runs (x, y, texto, tamanho, negrito), com y a partir da
+        base da página; linhas que não cabem no frame são descartadas
+    """
+    left, bottom, right, top = frame_pt
+    leading = font_size_pt * LINE_SPACING
+    cat_size = font_size_pt + 1.0
+    dot_w = text_width_pt(".", font_size_pt)
+    gap = text_width_pt(" ", font_size_pt)
+
+    runs = []
+    y = top - cat_size
+    first = True
+    for e in seq:
+        if e["type"] == "cat":
+            if not first:
+                y -= leading  # linha em branco antes da categoria
+            if y < bottom:
+                break
+            runs.append((left, y, e["text"].upper(), cat_size, True))
+            y -= leading
+        else:
+            if y < bottom:
+                break
+            name, price = e["name"], e["price"]
+            price_w = text_width_pt(price, font_size_pt)
+            name_w = text_width_pt(name, font_size_pt)
+            price_x = right - price_w
+            runs.append((left, y, name, font_size_pt, False))
+            runs.append((price_x, y, price, font_size_pt, False))
+
+            # Pontilhado preenchendo exatamente o espaço entre nome e preço
+            dots_from = left + name_w + gap
+            n_dots = int((price_x - gap - dots_from) / dot_w)
+            if n_dots > 0:
+                runs.append((dots_from, y, "." * n_dots, font_size_pt, False))
+            y -= leading
+        first = False
+    return runs
+
+def layout_page(data, font_size_pt=10.0, metadata=None, font_name="Arial"):
+    """
+    Layout completo do cardápio em pontos (título + colunas, por página)
+
+    Returns:
+        dict {"width", "height", "page_width", "columns", "pages"}: largura
+        e altura da página em pontos, page_width nas unidades do template
+        (frames de columns), pages com os runs de cada página no formato
+        de layout_column, título incluído em todas
+    """
+    pw, ph, units_per_mm = page_geometry(metadata)
+    to_pt = 72.0 / 25.4 / units_per_mm
+
+    if metadata is not None:
+        frames = [tuple(f) for f in metadata["frames"][data["model"]]]
+        title_x, title_y = metadata["title"]["x"], metadata["title"]["y"]
+    else:
+        frames = builder.compute_area_frames(pw, ph, units_per_mm, data["model"])
+        title_x, title_y = pw / 2.0, ph - 1.0 * 25.4 * units_per_mm
+
+    # Texto das colunas (o mesmo do CorelDRAW, medido na fonte pedida); o PDF
+    # desenha a partir de seq, com métricas Helvetica
+    columns = builder.compose_columns(
+        data["categories"], frames, font_size_pt, font_name=font_name, units_per_mm=units_per_mm
+    )
+
+    title_runs = []
+    title = data.get("restaurant") or ""
+    if title:
+        title_w = text_width_pt(title, TITLE_SIZE_PT, bold=True)
+        title_runs.append((title_x * to_pt - title_w / 2.0, title_y * to_pt, title, TITLE_SIZE_PT, True))
+
+    pages = [list(title_runs) for _ in range(max(col["page"] for col in columns))]
+    for col in columns:
+        frame_pt = tuple(v * to_pt for v in col["frame"])
+        pages[col["page"] - 1].extend(layout_column(col["seq"], frame_pt, font_size_pt))
+
+    return {
+        "width": pw * to_pt,
+        "height": ph * to_pt,
+        "page_width": pw,
+        "columns": columns,
+        "pages": pages,
+    }
+
+def page_geometry(metadata=None):
+    """(largura, altura, unidades por mm) da página do template"""
+    if metadata is not None:
+        return metadata["page_width"], metadata["page_height"], metadata["units_per_mm"]
+    pw, ph = DEFAULT_PAGE
+    return pw, ph, 1 / 25.4
+
+def render_menu_pdf(data, out_path, font_name="Arial", font_size_pt=10.0, metadata=None):
+    """
+    Gera o PDF do cardápio sem CorelDRAW
+
+    Args:
+        data: Saída de builder.parse_txt
+        out_path: Arquivo PDF de saída
+        font_name: Fonte em que as colunas são medidas e compostas (a mesma
+            do CorelDRAW); o PDF desenha em Helvetica
+        metadata: Sidecar do template (builder.load_template_metadata); sem
+            ele, usa a página A4 padrão
+
+    Returns:
+        Path do PDF gerado
+    """
+    layout = layout_page(data, font_size_pt, metadata, font_name=font_name)
+
+    writer = PDFWriter()
+    for runs in layout["pages"]:
+        ops = writer.add_page(layout["width"], layout["height"])
+        for x, y, text, size, bold in runs:
+            PDFWriter.text(ops, x, y, text, size, bold=bold)
+
+    writer.save(out_path)
+    return Path(out_path)
@@ -0,0 +1,227 @@
+# render_cache.py
+# -*- coding: utf-8 -*-
+"""
+Cache em disco dos cardápios já renderizados
+
+O mesmo relatório de preços é reenviado com frequência (mesmo texto, job ids
+diferentes). A chave do cache é o hash do cardápio parseado + fonte, tamanho,
+renderizador e hash do template; num acerto o job termina na hora, copiando
+o PDF guardado e reaproveitando a URL do Supabase.
+
+O tamanho total é limitado: ao passar de `max_bytes`, as entradas usadas há
+mais tempo são apagadas (LRU; o "último uso" é o mtime do meta.json).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+# Mudou o layout/renderizadores de forma visível? Incrementar para invalidar
+RENDER_CACHE_VERSION = 6
+
+def render_key(data, font, font_size, renderer, template_sha=None, linked=False):
+    """Chave (SHA-256) do resultado de renderização de um cardápio"""
+    menu = {
+        "restaurant": data["restaurant"],
+        "model": data["model"],
+        "categories": [
+            {"category": c["category"], "items": [[it["name"], it["price"]] for it in c["items"]]}
+            for c in data["categories"]
+        ],
+    }
+    payload = {
+        "v": RENDER_CACHE_VERSION,
+        "menu": menu,
+        "font": font,
+        "font_size": float(font_size),
+        "renderer": renderer,
+        "template": template_sha,
+    }
+    # Caixas vinculadas mudam o CDR; chaves antigas continuam valendo sem elas
+    if linked:
+        payload["linked"] = True
+    raw = json.dumps(payload, ensure_ascii=False, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+class RenderCache:
+    """
+    Entradas em `root/<kk>/<key>/`: os arquivos gerados + meta.json
+
+    meta.json: {"files": {tipo: nome}, "supabase_url", "size", "created_at"}
+    """
+
+    META = "meta.json"
+
+    def __init__(self, root, max_bytes=1024 ** 3):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = OrderedDict()  # key -> tamanho (bytes), do menos ao mais usado
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.root.mkdir(parents=True, exist_ok=True)
+        self._scan()
+
+    def _entry_dir(self, key):
+        return self.root / key[:2] / key
+
+    def _scan(self):
+        entries = []
+        for meta_path in self.root.glob(f"*/*/{self.META}"):
+            try:
+                meta = json.loads(meta_path.read_text(encoding="utf-8"))
+                entries.append((meta_path.stat().st_mtime, meta_path.parent.name, int(meta["size"])))
+            except Exception:
+                shutil.rmtree(meta_path.parent, ignore_errors=True)
+        # Sobras de put() interrompido
+        for tmp in self.root.glob("*/.tmp-*"):
+            shutil.rmtree(tmp, ignore_errors=True)
+        for _, key, size in sorted(entries):
+            self._index[key] = size
+            self.total_bytes += size
+        # Limite pode ter diminuído desde a última execução
+        self._evict_locked()
+        if entries:
+            logger.info(f"🗃️ Cache de renderização: {len(self._index)} entrada(s), "
+                        f"{self.total_bytes / 1024 / 1024:.1f} MB")
+
+    def get(self, key):
+        """
+        Entrada do cache (marca como usada agora) ou None
+
+        Returns:
+            dict {"files", "supabase_url", "dir"}
+        """
+        with self._lock:
+            if key not in self._index:
+                self.misses += 1
+                return None
+            entry_dir = self._entry_dir(key)
+            try:
+                meta = json.loads((entry_dir / self.META).read_text(encoding="utf-8"))
+                os.utime(entry_dir / self.META)
+            except Exception:
+                # Entrada apagada/corrompida por fora: esquecer
+                self.total_bytes -= self._index.pop(key)
+                self.misses += 1
+                return None
+            self._index.move_to_end(key)
+            self.hits += 1
+        return {"files": meta["files"], "supabase_url": meta.get("supabase_url"), "dir": entry_dir}
+
+    def file(self, key, kind):
+        """
+        Caminho de um arquivo guardado (ex: o CDR de uma versão anterior do
+        cardápio) ou None; marca a entrada como usada, sem contar acerto
+        """
+        with self._lock:
+            if key not in self._index:
+                return None
+            entry_dir = self._entry_dir(key)
+            try:
+                meta = json.loads((entry_dir / self.META).read_text(encoding="utf-8"))
+                os.utime(entry_dir / self.META)
+            except Exception:
+                return None
+            self._index.move_to_end(key)
+        name = meta["files"].get(kind)
+        return entry_dir / name if name else None
+
+    def restore(self, entry, dest_dir, kinds=None):
+        """
+        Copia os arquivos da entrada para a pasta do job
+
+        Cópia, nunca hardlink: o job pode regravar a própria saída no mesmo
+        lugar (reprocessamento do id com outro template), e isso não pode
+        alterar o arquivo guardado no cache.
+
+        Args:
+            kinds: Tipos a copiar (ex: ["pdf"]); None = todos
+
+        Returns:
+            dict tipo -> nome dos arquivos copiados
+        """
+        dest_dir = Path(dest_dir)
+        dest_dir.mkdir(parents=True, exist_ok=True)
+        restored = {}
+        for kind, name in entry["files"].items():
+            if kinds is not None and kind not in kinds:
+                continue
+            dst = dest_dir / name
+            if dst.exists():
+                dst.unlink()
+            shutil.copy2(entry["dir"] / name, dst)
+            restored[kind] = name
+        return restored
+
+    def put(self, key, files, supabase_url=None):
+        """
+        Guarda o resultado de um job
+
+        Args:
+            files: dict tipo -> Path dos arquivos gerados
+        """
+        if self.max_bytes <= 0:
+            return
+        entry_dir = self._entry_dir(key)
+        tmp_dir = entry_dir.parent / f".tmp-{uuid.uuid4().hex}"
+        tmp_dir.mkdir(parents=True)
+        try:
+            size = 0
+            names = {}
+            for kind, path in files.items():
+                path = Path(path)
+                # Cópia própria do cache (ver restore)
+                shutil.copy2(path, tmp_dir / path.name)
+                names[kind] = path.name
+                size += path.stat().st_size
+            meta = {
+                "files": names,
+                "supabase_url": supabase_url,
+                "size": size,
+                "created_at": time.time(),
+            }
+            (tmp_dir / self.META).write_text(json.dumps(meta, ensure_ascii=False), encoding="utf-8")
+
+            with self._lock:
+                if key in self._index:
+                    shutil.rmtree(entry_dir, ignore_errors=True)
+                    self.total_bytes -= self._index.pop(key)
+                os.replace(tmp_dir, entry_dir)
+                self._index[key] = size
+                self.total_bytes += size
+                evicted = self._evict_locked()
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        if evicted:
+            logger.info(f"🗃️ Cache de renderização: {evicted} entrada(s) antiga(s) removida(s)")
+
+    def _evict_locked(self):
+        evicted = 0
+        while self.total_bytes > self.max_bytes and len(self._index) > 1:
+            key, size = self._index.popitem(last=False)
+            shutil.rmtree(self._entry_dir(key), ignore_errors=True)
+            self.total_bytes -= size
+            evicted += 1
+        return evicted
+
+    def status(self):
+        with self._lock:
+            return {
+                "entries": len(self._index),
+                "bytes": self.total_bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+            }
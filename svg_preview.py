@@ -0,0 +1,71 @@
+# svg_preview.py
+# -*- coding: utf-8 -*-
+"""
+Pré-visualização SVG do cardápio (sem CorelDRAW)
+
+Usa o mesmo layout do renderizador PDF (pdf_renderer.layout_page), só
+trocando a saída: cada run vira um <text>, com y invertido (SVG cresce
+para baixo). Cardápios de várias páginas saem com as páginas empilhadas. Serve para o usuário conferir o cardápio em milissegundos
+antes de enfileirar o render no CorelDRAW.
+"""
+
+from xml.sax.saxutils import escape
+
+import pdf_renderer
+
+# Espaço entre páginas empilhadas, em pontos
+PAGE_GAP_PT = 18.0
+
+def _fmt(value):
+    return f"{value:.2f}".rstrip("0").rstrip(".")
+
+def layout_to_svg(layout, font_family="Arial", show_frames=True):
+    """
+    Converte a saída de pdf_renderer.layout_page em SVG (string)
+
+    Args:
+        show_frames: Desenha o contorno das caixas de texto (tracejado)
+    """
+    width, height = layout["width"], layout["height"]
+    # Topo de cada página no SVG (páginas uma abaixo da outra)
+    offsets = [n * (height + PAGE_GAP_PT) for n in range(len(layout["pages"]))]
+    total = offsets[-1] + height
+    family = escape(font_family, {'"': "&quot;"})
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{_fmt(width)}pt" '
+        f'height="{_fmt(total)}pt" viewBox="0 0 {_fmt(width)} {_fmt(total)}" '
+        f'font-family="{family}, Helvetica, sans-serif">',
+    ]
+    for off in offsets:
+        parts.append(f'<rect y="{_fmt(off)}" width="{_fmt(width)}" height="{_fmt(height)}" fill="#fff"/>')
+
+    if show_frames and layout["columns"]:
+        to_pt = layout["width"] / layout["page_width"]
+        for col in layout["columns"]:
+            left, bottom, right, top = (v * to_pt for v in col["frame"])
+            parts.append(
+                f'<rect x="{_fmt(left)}" y="{_fmt(offsets[col["page"] - 1] + height - top)}" '
+                f'width="{_fmt(right - left)}" height="{_fmt(top - bottom)}" '
+                f'fill="none" stroke="#bbb" stroke-dasharray="4 2"/>'
+            )
+
+    for off, runs in zip(offsets, layout["pages"]):
+        for x, y, text, size, bold in runs:
+            weight = ' font-weight="bold"' if bold else ""
+            parts.append(
+                f'<text x="{_fmt(x)}" y="{_fmt(off + height - y)}" font-size="{_fmt(size)}"'
+                f'{weight} xml:space="preserve">{escape(text)}</text>'
+            )
+
+    parts.append("</svg>")
+    return "\n".join(parts)
+
+def render_menu_svg(data, font_name="Arial", font_size_pt=10.0, metadata=None):
+    """
+    Layout + SVG do cardápio
+
+    Returns:
+        (layout, svg): layout de pdf_renderer.layout_page e o SVG em string
+    """
+    layout = pdf_renderer.layout_page(data, font_size_pt, metadata, font_name=font_name)
+    return layout, layout_to_svg(layout, font_family=font_name)
@@ -0,0 +1,209 @@
+# template_cache.py
+# -*- coding: utf-8 -*-
+"""
+Cache em memória dos templates CDR (tplA/tplB)
+
+Cada sessão CorelDRAW abre cada template uma única vez, remove os textos e
+mantém esse documento "pristino" aberto. Os jobs recebem um documento novo
+duplicado em memória pela própria API COM (unidade, páginas com
+tamanho/orientação, camadas e página mestre copiadas do pristino), em vez de
+abrir o template do disco, aguardar o carregamento e varrer todas as shapes
+a cada cardápio.
+
+O cache é invalidado quando o hash (SHA-256) do arquivo .cdr muda.
+"""
+
+import hashlib
+import logging
+import os
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CDR_TEXT_SHAPE = 6  # cdrTextShape (artistic text e paragraph text)
+
+_hash_memo = {}
+
+def template_hash(tpl_path):
+    """
+    SHA-256 do arquivo de template
+
+    O hash só é recalculado quando mtime/tamanho do arquivo mudam.
+    """
+    path = os.path.abspath(str(tpl_path))
+    st = os.stat(path)
+    signature = (st.st_mtime_ns, st.st_size)
+    memo = _hash_memo.get(path)
+    if memo and memo[0] == signature:
+        return memo[1]
+
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    digest = h.hexdigest()
+    _hash_memo[path] = (signature, digest)
+    return digest
+
+def remove_text_shapes(page):
+    """Remove todas as shapes de texto da página. Retorna quantas foram removidas"""
+    removed = 0
+    shapes = page.Shapes
+    for i in range(shapes.Count, 0, -1):
+        try:
+            s = shapes.Item(i)
+            if s.Type == CDR_TEXT_SHAPE:
+                s.Delete()
+                removed += 1
+        except Exception as e:
+            logger.debug(f"Não foi possível remover shape {i}: {e}")
+    return removed
+
+def copy_page(src, dst):
+    """
+    Copia tamanho, camadas (com visibilidade/impressão/edição) e shapes de
+    uma página para outra, casando as camadas pelo nome
+    """
+    dst.SetSize(src.SizeWidth, src.SizeHeight)
+    names = set()
+    layers = src.Layers
+    for i in range(1, layers.Count + 1):
+        layer = layers.Item(i)
+        name = layer.Name
+        names.add(name)
+        target = dst.Layers.Find(name)
+        if target is None:
+            target = dst.CreateLayer(name)
+        if not layer.IsSpecialLayer:
+            target.Visible = layer.Visible
+            target.Printable = layer.Printable
+            target.Editable = layer.Editable
+        shapes = layer.Shapes.All()
+        if shapes.Count:
+            shapes.CopyToLayer(target)
+
+    # Camada padrão do documento novo que o template não tem (ex.: "Layer 1")
+    layers = dst.Layers
+    for i in range(layers.Count, 0, -1):
+        layer = layers.Item(i)
+        if not layer.IsSpecialLayer and layer.Name not in names:
+            layer.Delete()
+
+    active = src.ActiveLayer
+    if active is not None:
+        dst.Layers.Find(active.Name).Activate()
+
+def clone_document(corel, src):
+    """Documento novo com unidade, página mestre e páginas iguais às de src"""
+    doc = corel.CreateDocument()
+    try:
+        doc.Unit = src.Unit
+        # Página mestre primeiro: define o tamanho padrão das páginas novas
+        copy_page(src.MasterPage, doc.MasterPage)
+        pages = src.Pages
+        if pages.Count > 1:
+            doc.AddPages(pages.Count - 1)
+        for i in range(1, pages.Count + 1):
+            copy_page(pages.Item(i), doc.Pages.Item(i))
+        doc.Pages.Item(1).Activate()
+        return doc
+    except Exception:
+        try:
+            doc.Close()
+        except Exception:
+            pass
+        raise
+
+class TemplateCache:
+    """Templates pristinos abertos em uma instância CorelDRAW"""
+
+    def __init__(self, load_wait=0.5):
+        self.load_wait = load_wait
+        self._entries = {}
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, corel, path):
+        digest = template_hash(path)
+        entry = self._entries.get(path)
+        if entry is not None:
+            if entry["sha256"] == digest:
+                self.hits += 1
+                return entry
+            logger.info(f"📄 Template alterado, recarregando: {Path(path).name}")
+            self.invalidate(path)
+
+        self.misses += 1
+        doc = corel.OpenDocument(path)
+        # Aguardar documento carregar (apenas na primeira abertura)
+        time.sleep(self.load_wait)
+
+        page = doc.ActivePage
+        removed = remove_text_shapes(page)
+        logger.info(f"📄 Template em cache: {Path(path).name} ({removed} textos removidos)")
+
+        # Sidecar com a geometria do template (compilado uma vez por hash)
+        import build_cardapio_dinamico as builder
+        meta = builder.load_template_metadata(path)
+        if meta is None:
+            try:
+                meta = builder.compile_template_metadata(doc, path)
+                logger.info(f"📄 Metadata compilada: {builder.template_metadata_path(path).name}")
+            except Exception as e:
+                logger.warning(f"📄 Não foi possível compilar metadata do template: {e}")
+
+        entry = {
+            "sha256": digest,
+            "doc": doc,
+            "meta": meta,
+        }
+        self._entries[path] = entry
+        return entry
+
+    def checkout(self, corel, tpl_path):
+        """
+        Devolve um documento novo, clone do template pristino
+
+        O documento pertence ao job: quem chamou deve fechá-lo (doc.Close()).
+        O template em cache nunca é alterado.
+        """
+        path = os.path.abspath(str(tpl_path))
+        try:
+            entry = self._load(corel, path)
+            return clone_document(corel, entry["doc"])
+        except Exception as e:
+            # Cópia falhou: descartar o cache e abrir do disco para este job
+            logger.warning(f"📄 Falha ao duplicar template em cache ({e}), abrindo do disco")
+            self.invalidate(path)
+            doc = corel.OpenDocument(path)
+            time.sleep(self.load_wait)
+            remove_text_shapes(doc.ActivePage)
+            return doc
+
+    def metadata(self, tpl_path):
+        """Metadata (sidecar) do template em cache, ou None"""
+        entry = self._entries.get(os.path.abspath(str(tpl_path)))
+        return entry["meta"] if entry else None
+
+    def invalidate(self, tpl_path=None):
+        """Fecha e remove do cache um template (ou todos, se tpl_path=None)"""
+        if tpl_path is None:
+            paths = list(self._entries)
+        else:
+            paths = [os.path.abspath(str(tpl_path))]
+        for path in paths:
+            entry = self._entries.pop(path, None)
+            if entry is None:
+                continue
+            try:
+                entry["doc"].Close()
+            except Exception:
+                pass
+
+    def clear(self):
+        """Esquece os templates sem fechá-los (instância CorelDRAW já morreu)"""
+        self._entries.clear()
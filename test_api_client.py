@@ -4,8 +4,8 @@
 Cliente de exemplo para testar a API de Cardápio Dinâmico
 """
 
+import json
 import requests
-import time
 from pathlib import Path
 
 # Configuração
@@ -59,33 +59,41 @@ def check_status(job_id: str):
     return response.json()
 
 def wait_for_completion(job_id: str, timeout: int = 300):
-    """Aguardar conclusão do processamento"""
+    """Aguardar conclusão do processamento (stream SSE, sem polling)"""
     print("\n⏳ Aguardando processamento...")
-    
-    start_time = time.time()
-    while time.time() - start_time < timeout:
-        status = check_status(job_id)
-        
-        if not status:
-            print("   ❌ Erro ao verificar status")
-            return False
-        
-        print(f"   📊 Status: {status['status']} - {status['message']}")
-        
-        if status['status'] == 'completed':
-            print("\n✅ Processamento concluído!")
-            print(f"   📁 Arquivos disponíveis:")
-            for file_type, filename in status['files'].items():
-                print(f"      - {file_type}: {filename}")
-            return True
-        
-        elif status['status'] == 'failed':
-            print(f"\n❌ Processamento falhou: {status['message']}")
-            return False
-        
-        time.sleep(2)
-    
-    print("\n⏰ Timeout excedido")
+
+    try:
+        with requests.get(
+            f"{API_URL}/cardapio/eventos/{job_id}", stream=True, timeout=timeout
+        ) as response:
+            if response.status_code != 200:
+                print(f"   ❌ Erro ao abrir stream de eventos: {response.status_code}")
+                return False
+
+            for line in response.iter_lines(decode_unicode=True):
+                if not line or not line.startswith("data:"):
+                    continue
+                event = json.loads(line[len("data:"):])
+                print(f"   📊 Etapa: {event['stage']} - {event.get('message')}")
+                if event["stage"] in ("done", "failed"):
+                    break
+    except requests.exceptions.Timeout:
+        print("\n⏰ Timeout excedido")
+        return False
+
+    status = check_status(job_id)
+    if not status:
+        print("   ❌ Erro ao verificar status")
+        return False
+
+    if status['status'] == 'completed':
+        print("\n✅ Processamento concluído!")
+        print(f"   📁 Arquivos disponíveis:")
+        for file_type, filename in status['files'].items():
+            print(f"      - {file_type}: {filename}")
+        return True
+
+    print(f"\n❌ Processamento falhou: {status['message']}")
     return False
 
 def download_files(job_id: str, output_dir: str = "downloads"):
@@ -127,7 +135,7 @@ def download_files(job_id: str, output_dir: str = "downloads"):
 def list_jobs():
     """Listar todos os jobs"""
     print("\n📋 Listando jobs...")
-    response = requests.get(f"{API_URL}/cardapio/listar")
+    response = requests.get(f"{API_URL}/cardapio/listar", params={"include_total": "true"})
     
     if response.status_code == 200:
         data = response.json()
@@ -0,0 +1,8 @@
+# conftest.py
+# -*- coding: utf-8 -*-
+"""Módulos do projeto ficam na raiz do repositório"""
+
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
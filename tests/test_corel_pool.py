@@ -0,0 +1,158 @@
+# test_corel_pool.py
+# -*- coding: utf-8 -*-
+"""
+Testes do pool de sessões CorelDRAW contra o backend fake (roda no Linux)
+"""
+
+import threading
+
+import pytest
+
+import corel_pool
+import fake_corel
+from corel_pool import CorelPool
+
+class CountingFactory:
+    """Fábrica de apps fake que guarda cada instância criada"""
+
+    def __init__(self):
+        self.apps = []
+        self.threads = []
+
+    def __call__(self):
+        app = fake_corel.create_app()
+        self.apps.append(app)
+        self.threads.append(threading.current_thread().name)
+        return app
+
+def app_of(session):
+    return session.app
+
+@pytest.fixture
+def factory():
+    return CountingFactory()
+
+@pytest.fixture
+def make_pool(factory):
+    pools = []
+
+    def make(**kwargs):
+        pool = CorelPool(app_factory=factory, **kwargs)
+        pool.start(warm_timeout=5)
+        pools.append(pool)
+        return pool
+
+    yield make
+    for pool in pools:
+        pool.shutdown(timeout=5)
+
+def test_session_reused_across_jobs(make_pool, factory):
+    pool = make_pool(size=1)
+    apps = []
+    for _ in range(5):
+        with pool.lease(timeout=1) as session:
+            apps.append(session.call(app_of))
+
+    # Aquecido uma vez no startup; nenhum job paga a inicialização de novo
+    assert len(factory.apps) == 1
+    assert all(app is factory.apps[0] for app in apps)
+    assert pool.status()["sessions"][0]["jobs_done"] == 5
+
+def test_recycles_after_max_jobs(make_pool, factory):
+    pool = make_pool(size=1, max_jobs=2)
+    apps = []
+    for _ in range(5):
+        with pool.lease(timeout=1) as session:
+            apps.append(session.call(app_of))
+
+    assert len(factory.apps) == 3
+    assert apps == [factory.apps[0]] * 2 + [factory.apps[1]] * 2 + [factory.apps[2]]
+    assert factory.apps[0]._quit and factory.apps[1]._quit
+    assert not factory.apps[2]._quit
+    assert pool.status()["sessions"][0]["restarts"] == 2
+
+def test_recycles_after_com_failure(make_pool, factory):
+    pool = make_pool(size=1)
+    with pool.lease(timeout=1) as session:
+        first = session.call(app_of)
+        # CorelDRAW caiu entre dois jobs: a próxima chamada COM falha
+        first.Quit()
+        second = session.call(app_of)
+
+    assert second is not first
+    assert len(factory.apps) == 2
+    assert session.restarts == 1
+    assert session.alive
+
+def test_job_error_keeps_session(make_pool, factory):
+    pool = make_pool(size=1)
+
+    def broken(session):
+        raise ValueError("falha no job")
+
+    with pool.lease(timeout=1) as session:
+        with pytest.raises(ValueError):
+            session.call(broken)
+        assert session.call(app_of) is factory.apps[0]
+    assert len(factory.apps) == 1
+
+def test_pool_size_and_lease_timeout(make_pool, factory):
+    pool = make_pool(size=2)
+    assert len(factory.apps) == 2
+    assert pool.status()["idle"] == 2
+
+    with pool.lease(timeout=1) as a, pool.lease(timeout=1) as b:
+        assert a is not b
+        assert a.call(app_of) is not b.call(app_of)
+        assert pool.status()["idle"] == 0
+        with pytest.raises(TimeoutError):
+            with pool.lease(timeout=0.05):
+                pass
+    assert pool.status()["idle"] == 2
+
+def test_shutdown_quits_every_session(factory):
+    pool = CorelPool(size=2, app_factory=factory)
+    pool.start(warm_timeout=5)
+    sessions = list(pool.sessions)
+    pool.shutdown(timeout=5)
+
+    assert all(app._quit for app in factory.apps)
+    assert not any(s.alive for s in sessions)
+    assert pool.status() == {"size": 2, "idle": 0, "sessions": []}
+
+    # Pool reaproveitável: novo start aquece sessões novas
+    pool.start(warm_timeout=5)
+    assert len(factory.apps) == 4
+    pool.shutdown(timeout=5)
+
+def test_calls_run_on_sta_thread(make_pool, factory, monkeypatch):
+    initialized = []
+    uninitialized = []
+
+    class FakePythoncom:
+        @staticmethod
+        def CoInitialize():
+            initialized.append(threading.current_thread().name)
+
+        @staticmethod
+        def CoUninitialize():
+            uninitialized.append(threading.current_thread().name)
+
+    monkeypatch.setattr(corel_pool, "pythoncom", FakePythoncom)
+    pool = make_pool(size=1)
+
+    def thread_name(session):
+        return threading.current_thread().name
+
+    with pool.lease(timeout=1) as session:
+        names = {session.call(thread_name) for _ in range(3)}
+
+    # COM inicializado, CorelDRAW criado e jobs executados na mesma thread
+    # dedicada, nunca na thread de quem pediu
+    assert names == {"corel-sta-0"}
+    assert initialized == ["corel-sta-0"]
+    assert factory.threads == ["corel-sta-0"]
+    assert threading.current_thread().name not in names
+
+    pool.shutdown(timeout=5)
+    assert uninitialized == ["corel-sta-0"]
@@ -0,0 +1,36 @@
+# test_fit_layout.py
+# -*- coding: utf-8 -*-
+"""
+Testes da escolha de modelo/tamanho de fonte (fit_layout) com métricas offline
+"""
+
+import random
+
+import pytest
+
+import build_cardapio_dinamico as builder
+from benchmark_text_recovery import random_menu
+
+LAYOUTS = {
+    model: (builder.compute_area_frames(8.27, 11.69, 1 / 25.4, model), 1 / 25.4)
+    for model in ("A", "B")
+}
+
+def menus(count, seed):
+    rng = random.Random(seed)
+    return [builder.parse_text(random_menu(rng))["categories"] for _ in range(count)]
+
+@pytest.mark.parametrize("max_size", [4.0, 5.6, 5.9, 6.0, 6.3, 7.25, 10.0, 14.2])
+@pytest.mark.parametrize("min_size", [builder.FIT_MIN_SIZE_PT, 5.0, 8.0])
+def test_size_stays_within_bounds(min_size, max_size):
+    for categories in menus(20, seed=int(max_size * 100 + min_size)):
+        for linked in (False, True):
+            _, size, _, _ = builder.fit_layout(categories, LAYOUTS, max_size_pt=max_size,
+                                               min_size_pt=min_size, linked=linked)
+            assert min(min_size, max_size) <= size <= max_size
+
+def test_ceiling_below_minimum_is_used_as_is():
+    categories = menus(1, seed=7)[0]
+    for max_size in (5.6, 5.9):
+        _, size, _, _ = builder.fit_layout(categories, LAYOUTS, max_size_pt=max_size)
+        assert size == max_size
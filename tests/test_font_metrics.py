@@ -0,0 +1,58 @@
+# test_font_metrics.py
+# -*- coding: utf-8 -*-
+"""
+Testes da varredura das fontes instaladas (só diretório + tabela name)
+"""
+
+from pathlib import Path
+
+import pytest
+
+import font_metrics
+
+def installed_fonts():
+    return [
+        path
+        for root in font_metrics.font_dirs() if root.is_dir()
+        for path in sorted(root.rglob("*"))
+        if path.suffix.lower() in font_metrics.FONT_EXTENSIONS and path.is_file()
+    ]
+
+def test_read_font_names_matches_full_parse():
+    fonts = installed_fonts()
+    if not fonts:
+        pytest.skip("Nenhuma fonte instalada")
+    for path in fonts:
+        buf = path.read_bytes()
+        expected = font_metrics._names(buf, font_metrics._table_directory(buf))
+        assert font_metrics.read_font_names(path)[0] == (0,) + expected
+
+def test_scan_does_not_load_whole_files(monkeypatch):
+    fonts = installed_fonts()
+    if not fonts:
+        pytest.skip("Nenhuma fonte instalada")
+
+    def no_read_bytes(self):
+        raise AssertionError(f"Arquivo lido inteiro: {self}")
+
+    monkeypatch.setattr(Path, "read_bytes", no_read_bytes)
+    assert font_metrics.scan_fonts()
+
+def test_scan_skips_broken_files(tmp_path):
+    (tmp_path / "vazia.ttf").write_bytes(b"")
+    (tmp_path / "truncada.ttc").write_bytes(b"ttcf\x00\x01\x00\x00\x00\x00\x00\x09")
+    assert font_metrics.scan_fonts([tmp_path]) == {}
+
+def test_build_index_runs_once(monkeypatch):
+    calls = []
+
+    def fake_scan(dirs=None):
+        calls.append(dirs)
+        return {("arial", False): (Path("arial.ttf"), 0)}
+
+    monkeypatch.setattr(font_metrics, "scan_fonts", fake_scan)
+    monkeypatch.setattr(font_metrics, "_index", None)
+    font_metrics.build_index()
+    assert font_metrics.find_font("Arial") == (Path("arial.ttf"), 0)
+    assert font_metrics.find_font("Verdana") is None
+    assert len(calls) == 1
@@ -0,0 +1,67 @@
+# test_job_store.py
+# -*- coding: utf-8 -*-
+"""
+Testes dos leases de jobs entre processos (dois JobStore no mesmo banco)
+"""
+
+import time
+
+import pytest
+
+from job_store import JobStore
+
+@pytest.fixture
+def stores(tmp_path):
+    db = tmp_path / "jobs.db"
+    a = JobStore(db, lease_seconds=30, owner="worker-a")
+    b = JobStore(db, lease_seconds=30, owner="worker-b")
+    yield a, b
+    a.close()
+    b.close()
+
+def test_live_owner_keeps_its_jobs(stores):
+    a, b = stores
+    a.create("j1", request={"kind": "text", "text": "x"})
+
+    assert b.expired_leases() == []
+    assert not b.take("j1")
+
+def test_expired_lease_is_taken_by_one_worker(stores):
+    a, b = stores
+    a.create("j1")
+    later = time.time() + 60  # worker-a parou de renovar
+
+    assert [j["job_id"] for j in b.expired_leases(now=later)] == ["j1"]
+    assert b.take("j1", now=later)
+    # Já tem dono novo com lease válido: ninguém mais assume
+    assert not a.take("j1", now=later)
+    assert b.expired_leases(now=later) == []
+
+def test_renew_extends_only_own_unfinished_jobs(stores):
+    a, b = stores
+    a.create("j1")
+    a.create("j2", status="completed")
+    b.create("j3")
+
+    assert a.renew_leases() == 1
+    assert b.renew_leases() == 1
+
+def test_finished_and_released_jobs(stores):
+    a, b = stores
+    a.create("j1")
+    a.update("j1", status="completed")
+    assert b.expired_leases(now=time.time() + 60) == []
+
+    a.create("j2")
+    a.release("j2")
+    assert [j["job_id"] for j in b.expired_leases()] == ["j2"]
+    assert b.take("j2")
+
+def test_jobs_without_owner_are_adoptable(stores):
+    a, b = stores
+    a.create("j1")
+    # Banco anterior aos leases: coluna owner vazia
+    conn = a._conn()
+    with conn:
+        conn.execute("UPDATE jobs SET owner = NULL, lease_until = NULL")
+    assert b.take("j1")
@@ -0,0 +1,116 @@
+# test_macro_render.py
+# -*- coding: utf-8 -*-
+"""
+Testes do modo macro (render_mode="macro") contra o backend fake
+
+O "macro" roda no LocalMacroHost: o payload RS/US precisa ir e voltar sem
+perdas e desenhar o mesmo documento que as chamadas COM finas; se o
+RunMacro falhar, render_with_corel cai para as chamadas COM.
+"""
+
+import json
+
+import pytest
+
+import api_cardapio as api
+import build_cardapio_dinamico as builder
+import fake_corel
+import macro_render
+from corel_pool import CorelPool
+from macro_render import LocalMacroHost
+
+def menu_text():
+    """Cardápio grande o bastante para 2 páginas em 14pt"""
+    lines = ["RELATÓRIO DE PREÇOS Bar do Teste", ""]
+    for c in range(8):
+        lines.append(f"*Categoria {c}*")
+        for i in range(15):
+            lines.append(f"Item {c}.{i} - R$ {i + 1},50")
+        lines.append("")
+    return "\n".join(lines)
+
+DATA = builder.parse_text(menu_text())
+TEMPLATE = str(api.TEMPLATES_DIR / f"tpl{DATA['model']}.cdr")
+
+class BrokenMacroHost:
+    """GMSManager sem o projeto de macros instalado"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def RunMacro(self, project, macro, encoded):
+        self.calls += 1
+        raise RuntimeError("Projeto GMS não encontrado")
+
+@pytest.fixture
+def session(tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "TEMP_DIR", tmp_path)
+    monkeypatch.setattr(builder, "TEMPLATE_META_DIR", tmp_path / "meta")
+    pool = CorelPool(size=1, app_factory=fake_corel.create_app)
+    pool.start(warm_timeout=5)
+    with pool.lease(timeout=5) as leased:
+        yield leased
+    pool.shutdown(timeout=5)
+
+def render(session, tmp_path, render_mode, text_flow):
+    """Renderiza DATA e devolve o CDR exportado (JSON do fake)"""
+    config = api.CardapioConfig(render_mode=render_mode, text_flow=text_flow, font_size=14)
+    job_output = tmp_path / f"{render_mode}-{text_flow}"
+    job_output.mkdir(exist_ok=True)
+    _, cdr_saved, out_cdr_temp = session.call(
+        api.render_with_corel, f"macro-{render_mode}", DATA, config, TEMPLATE, job_output
+    )
+    assert cdr_saved
+    doc = json.loads(out_cdr_temp.read_text(encoding="utf-8"))
+    out_cdr_temp.unlink()
+    # O caminho COM também ajusta o entrelinhamento; o macro não
+    for page in doc["pages"]:
+        for shape in page["shapes"]:
+            shape.get("attrs", {}).pop("LineSpacing", None)
+    return doc
+
+def set_macro_host(session, host):
+    session.call(lambda s: setattr(s.app, "_gms", host))
+
+@pytest.mark.parametrize("text_flow", ["columns", "linked"])
+def test_payload_round_trip(text_flow):
+    frames = builder.compute_area_frames(8.27, 11.69, 1 / 25.4, DATA["model"])
+    columns = builder.compose_columns(DATA["categories"], frames, 14.0, font_name="Arial",
+                                      linked=text_flow == "linked")
+    payload = macro_render.build_render_payload(
+        f"Bar{macro_render.RS}do{macro_render.US}Teste", 4.13, 10.69, columns,
+        font_name="Arial", font_size_pt=14.0
+    )
+    assert payload["pages"] == 2
+
+    decoded = macro_render.decode_payload(macro_render.encode_payload(payload))
+
+    # Separadores viram espaço; caixas vinculadas não levam texto nem spans
+    payload["title"]["text"] = "Bar do Teste"
+    for frame in payload["frames"]:
+        frame["spans"] = [dict(s, size_delta=s.get("size_delta") or 0.0) for s in frame["spans"]]
+        if frame["linked"]:
+            frame["text"], frame["spans"] = "", []
+    assert decoded == payload
+
+@pytest.mark.parametrize("text_flow", ["columns", "linked"])
+def test_macro_host_draws_same_document_as_com(session, tmp_path, text_flow):
+    host = LocalMacroHost(session.app)
+    set_macro_host(session, host)
+
+    via_macro = render(session, tmp_path, "macro", text_flow)
+    via_com = render(session, tmp_path, "com", text_flow)
+
+    assert [(c[0], c[1]) for c in host.calls] == [(macro_render.MACRO_PROJECT, macro_render.MACRO_NAME)]
+    assert len(via_macro["pages"]) == 2
+    assert via_macro == via_com
+
+def test_falls_back_to_com_when_run_macro_raises(session, tmp_path):
+    host = BrokenMacroHost()
+    set_macro_host(session, host)
+
+    via_fallback = render(session, tmp_path, "macro", "columns")
+    via_com = render(session, tmp_path, "com", "columns")
+
+    assert host.calls == 1
+    assert via_fallback == via_com
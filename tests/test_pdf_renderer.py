@@ -0,0 +1,26 @@
+# test_pdf_renderer.py
+# -*- coding: utf-8 -*-
+"""
+Testes do renderizador PDF nativo
+"""
+
+import build_cardapio_dinamico as builder
+import pdf_renderer
+
+DATA = builder.parse_text(
+    "RELATÓRIO DE PREÇOS Bar\n\n*Cervejas*\nBrahma - R$ 11,00\nSkol - R$ 9,50\n"
+)
+
+def test_columns_measured_in_requested_font(tmp_path, monkeypatch):
+    fonts = []
+    compose_columns = builder.compose_columns
+
+    def spy(*args, **kwargs):
+        fonts.append(kwargs.get("font_name"))
+        return compose_columns(*args, **kwargs)
+
+    monkeypatch.setattr(builder, "compose_columns", spy)
+    out = pdf_renderer.render_menu_pdf(DATA, tmp_path / "cardapio.pdf", font_name="Verdana")
+
+    assert fonts == ["Verdana"]
+    assert out.read_bytes().startswith(b"%PDF")
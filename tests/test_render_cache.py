@@ -0,0 +1,47 @@
+# test_render_cache.py
+# -*- coding: utf-8 -*-
+"""
+Testes do cache de renderização em disco
+"""
+
+from render_cache import RenderCache, render_key
+
+MENU = {
+    "restaurant": "Bar",
+    "model": "A",
+    "categories": [{"category": "Cervejas", "items": [{"name": "Brahma", "price": "R$ 11,00"}]}],
+}
+
+def render(job_dir, template):
+    """Como os renderizadores: regrava a saída do job no mesmo caminho"""
+    job_dir.mkdir(parents=True, exist_ok=True)
+    pdf = job_dir / "cardapio.pdf"
+    pdf.write_bytes(f"%PDF {template}".encode())
+    return {"pdf": pdf}
+
+def test_job_output_rewrite_does_not_touch_cache(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    key_t1 = render_key(MENU, "Arial", 10.0, "corel", template_sha="t1")
+    key_t2 = render_key(MENU, "Arial", 10.0, "corel", template_sha="t2")
+
+    # Job A com o template T1, depois o mesmo job A com T2
+    cache.put(key_t1, render(tmp_path / "A", "T1"))
+    cache.put(key_t2, render(tmp_path / "A", "T2"))
+
+    # Job B com T1: acerto no cache precisa devolver o PDF de T1
+    entry = cache.get(key_t1)
+    restored = cache.restore(entry, tmp_path / "B")
+    assert (tmp_path / "B" / restored["pdf"]).read_bytes() == b"%PDF T1"
+    assert (tmp_path / "A" / "cardapio.pdf").read_bytes() == b"%PDF T2"
+
+def test_restored_output_rewrite_does_not_touch_cache(tmp_path):
+    cache = RenderCache(tmp_path / "cache")
+    key = render_key(MENU, "Arial", 10.0, "pdf")
+    cache.put(key, render(tmp_path / "A", "T1"))
+
+    # Job B servido do cache e depois reprocessado com outro conteúdo
+    cache.restore(cache.get(key), tmp_path / "B")
+    render(tmp_path / "B", "T2")
+
+    cache.restore(cache.get(key), tmp_path / "C")
+    assert (tmp_path / "C" / "cardapio.pdf").read_bytes() == b"%PDF T1"
@@ -0,0 +1,79 @@
+# test_report_stream.py
+# -*- coding: utf-8 -*-
+"""
+Parse em streaming (iter_report_lines): relatórios cortados em pedaços de
+bytes arbitrários precisam dar o mesmo resultado que o texto inteiro
+"""
+
+import io
+import random
+
+import pytest
+
+import build_cardapio_dinamico as builder
+from benchmark_text_recovery import random_menu
+
+CASES = 500
+
+def random_report(rng):
+    """Relatório com fins de linha LF, CRLF ou misturados, às vezes com 2 restaurantes"""
+    text = random_menu(rng, big_prices=rng.random() < 0.25)
+    if rng.random() < 0.3:
+        text += "\n" + random_menu(rng)
+    ending = rng.choice(["\n", "\r\n", "mixed"])
+    if ending == "mixed":
+        return "".join(ln + rng.choice(["\n", "\r\n", "\r"]) for ln in text.split("\n"))
+    return text.replace("\n", ending)
+
+def random_chunks(data, rng):
+    """Corta em qualquer byte (inclusive no meio de "\r\n" e de caracteres UTF-8)"""
+    chunks = []
+    i = 0
+    while i < len(data):
+        size = rng.choice([1, 2, 3, rng.randint(1, 64)])
+        chunks.append(data[i:i + size])
+        i += size
+    return chunks
+
+def expected_lines(text):
+    return [ln.strip() for ln in text.splitlines()]
+
+def test_random_chunks_match_whole_text():
+    rng = random.Random(19)
+    for _ in range(CASES):
+        text = random_report(rng)
+        chunks = random_chunks(text.encode("utf-8"), rng)
+        assert list(builder.iter_report_lines(iter(chunks))) == expected_lines(text), chunks
+        assert builder.parse_txt(iter(chunks)) == builder.parse_text(text)
+        assert list(builder.iter_menus(iter(chunks))) == list(builder.iter_menus(text))
+
+@pytest.mark.parametrize("chunks", [
+    # CRLF cortado entre dois pedaços: uma quebra só, sem linha vazia extra
+    [b"RELAT\xc3\x93RIO DE PRE\xc3\x87OS Bar\r", b"\n*Cervejas*\r", b"\nBrahma - R$ 11,00\r\n"],
+    # "\r" no fim do último pedaço
+    [b"RELAT\xc3\x93RIO DE PRE\xc3\x87OS Bar\r\n*Cervejas*\r\nBrahma - R$ 11,00\r"],
+    # Caractere UTF-8 ("Ó") cortado ao meio e sem fim de linha no final
+    [b"RELAT\xc3", b"\x93RIO DE PRE\xc3\x87OS Bar\r\n*Cervejas*\n", b"Brahma - R$ 11,00"],
+])
+def test_crlf_and_utf8_split_across_chunks(chunks):
+    assert list(builder.iter_report_lines(iter(chunks))) == [
+        "RELATÓRIO DE PREÇOS Bar", "*Cervejas*", "Brahma - R$ 11,00",
+    ]
+
+def test_crlf_split_does_not_add_blank_lines():
+    lines = list(builder.iter_report_lines(iter([b"a\r", b"\nb\r", b"\r\n", b"c"])))
+    assert lines == ["a", "b", "", "c"]
+
+def test_file_sources_read_in_small_chunks(tmp_path, monkeypatch):
+    monkeypatch.setattr(builder, "READ_CHUNK", 5)
+    rng = random.Random(191)
+    for n in range(50):
+        text = random_report(rng)
+        data = text.encode("utf-8")
+        path = tmp_path / f"rel{n}.txt"
+        path.write_bytes(data)
+        expected = builder.parse_text(text)
+        assert builder.parse_txt(path) == expected
+        assert builder.parse_txt(io.BytesIO(data)) == expected
+        # Arquivo texto sem tradução de fim de linha (como o upload)
+        assert builder.parse_txt(io.StringIO(text, newline="")) == expected
@@ -0,0 +1,67 @@
+# test_split_columns.py
+# -*- coding: utf-8 -*-
+"""
+Testes da divisão do cardápio em colunas (split_flat) contra força bruta
+"""
+
+import itertools
+import random
+
+import pytest
+
+import build_cardapio_dinamico as builder
+
+FONT_SIZE = 10.0
+BLANK = FONT_SIZE * builder.LINE_SPACING
+
+def random_flat(rng, empty_ratio=0.4):
+    """Sequência achatada com categorias vazias (cabeçalhos seguidos)"""
+    flat = []
+    for c in range(rng.randint(1, 6)):
+        flat.append({"type": "cat", "text": f"Cat {c}"})
+        if rng.random() < empty_ratio:
+            continue
+        for i in range(rng.randint(1, 4)):
+            flat.append({"type": "item", "name": f"Item {c}.{i}", "price": "R$ 1,00"})
+    return flat
+
+def column_height(column):
+    if not column:
+        return 0.0
+    heights = builder.entry_heights(column, FONT_SIZE)
+    return sum(heights) - (BLANK if column[0]["type"] == "cat" else 0.0)
+
+def tallest(columns):
+    return max(column_height(c) for c in columns)
+
+def brute_force(flat, n_columns):
+    """Menor coluna mais alta entre todos os cortes que não deixam cabeçalho no fim"""
+    n = len(flat)
+    valid = [i for i in range(1, n) if flat[i - 1]["type"] != "cat"]
+    best = column_height(flat)
+    for k in range(1, n_columns):
+        for cuts in itertools.combinations(valid, k):
+            bounds = [0, *cuts, n]
+            best = min(best, tallest([flat[a:b] for a, b in zip(bounds, bounds[1:])]))
+    return best
+
+@pytest.mark.parametrize("n_columns", [2, 3, 4])
+def test_tallest_column_matches_brute_force(n_columns):
+    rng = random.Random(n_columns)
+    for _ in range(400):
+        flat = random_flat(rng)
+        columns = builder.split_flat(flat, n_columns, FONT_SIZE)
+        assert len(columns) == n_columns
+        assert [e for c in columns for e in c] == flat
+        # Só a última coluna usada pode terminar em cabeçalho (fim do cardápio)
+        used = [c for c in columns if c]
+        assert all(c[-1]["type"] != "cat" for c in used[:-1])
+        assert tallest(columns) <= brute_force(flat, n_columns) + 0.02, flat
+
+def test_consecutive_headers_stay_together():
+    cat = lambda t: {"type": "cat", "text": t}
+    item = lambda t: {"type": "item", "name": t, "price": "R$ 1,00"}
+    flat = [cat("A"), item("a1"), item("a2"), item("a3"), cat("Vazia 1"), cat("Vazia 2"), cat("B"), item("b1")]
+    left, right = builder.split_flat(flat, 2, FONT_SIZE)
+    assert left == flat[:4]
+    assert right == flat[4:]
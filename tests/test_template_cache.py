@@ -0,0 +1,142 @@
+# test_template_cache.py
+# -*- coding: utf-8 -*-
+"""
+Testes do cache de templates contra o backend fake (roda no Linux)
+"""
+
+import pytest
+
+import fake_corel
+from template_cache import TemplateCache
+
+@pytest.fixture(autouse=True)
+def meta_dir(tmp_path, monkeypatch):
+    import build_cardapio_dinamico as builder
+    monkeypatch.setattr(builder, "TEMPLATE_META_DIR", tmp_path / "meta")
+
+@pytest.fixture
+def corel():
+    app = fake_corel.create_app()
+    yield app
+    app.Quit()
+
+@pytest.fixture
+def template(tmp_path, corel):
+    """
+    Template com 2 páginas em paisagem, camada de fundo travada, página
+    mestre com logo, uma forma e um texto de exemplo
+    """
+    doc = corel.CreateDocument()
+    doc.Unit = 3  # cdrMillimeter
+    doc.ActivePage.SetSize(11.69, 8.27)
+    doc.AddPages(1)
+    page = doc.ActivePage
+    fundo = page.CreateLayer("Fundo")
+    fundo.Editable = False
+    fundo.CreateRectangle(0.0, 8.27, 11.69, 0.0)
+    page.ActiveLayer.CreateRectangle(1.0, 7.0, 10.0, 1.0)
+    page.ActiveLayer.CreateArtisticText(5.0, 7.5, "NOME DO RESTAURANTE")
+    doc.MasterPage.CreateLayer("Logo").CreateRectangle(0.5, 8.0, 1.5, 7.0)
+    path = tmp_path / "tplX.cdr"
+    doc.SaveAs(str(path))
+    doc.Close()
+    return path
+
+def page_summary(page):
+    layers = page.Layers
+    return (
+        page.SizeWidth,
+        page.SizeHeight,
+        [
+            (layers.Item(i).Name, layers.Item(i).Editable, layers.Item(i).Shapes.Count)
+            for i in range(1, layers.Count + 1)
+        ],
+    )
+
+def doc_summary(doc):
+    pages = doc.Pages
+    return (
+        doc.Unit,
+        page_summary(doc.MasterPage)[2],
+        [page_summary(pages.Item(i)) for i in range(1, pages.Count + 1)],
+    )
+
+EXPECTED = (
+    3,
+    [("Logo", True, 1)],
+    [
+        (11.69, 8.27, [("Camada 1", True, 1), ("Fundo", False, 1)]),
+        (11.69, 8.27, [("Camada 1", True, 0)]),
+    ],
+)
+
+def test_checkout_clones_whole_document(corel, template):
+    cache = TemplateCache(load_wait=0)
+    doc = cache.checkout(corel, template)
+
+    # Páginas, camadas, página mestre e unidade do template; só o texto removido
+    assert doc_summary(doc) == EXPECTED
+    assert doc.ActivePage.Index == 1
+    assert doc.ActivePage.ActiveLayer.Name == "Camada 1"
+    assert doc.FileName == ""
+    doc.Close()
+    cache.clear()
+
+def test_checkout_does_not_reopen_from_disk(corel, template, monkeypatch):
+    cache = TemplateCache(load_wait=0)
+    cache.checkout(corel, template).Close()
+
+    def no_open(path):
+        raise AssertionError(f"Template reaberto do disco: {path}")
+
+    monkeypatch.setattr(corel, "OpenDocument", no_open)
+    for _ in range(3):
+        doc = cache.checkout(corel, template)
+        assert doc_summary(doc) == EXPECTED
+        doc.Close()
+    assert (cache.misses, cache.hits) == (1, 3)
+
+def test_job_changes_do_not_leak(corel, template, tmp_path):
+    cache = TemplateCache(load_wait=0)
+    first = cache.checkout(corel, template)
+    first.ActivePage.ActiveLayer.CreateArtisticText(1.0, 1.0, "texto do job")
+    first.Pages.Item(2).ActiveLayer.CreateRectangle(1.0, 2.0, 2.0, 1.0)
+    first.SaveAs(str(tmp_path / "job.cdr"))
+    first.Close()
+
+    second = cache.checkout(corel, template)
+    assert doc_summary(second) == EXPECTED
+    second.Close()
+
+    pristine = cache._entries[str(template)]["doc"]
+    cache.invalidate()
+    assert len(cache) == 0
+    assert pristine._closed
+
+def test_template_change_reloads(corel, template):
+    cache = TemplateCache(load_wait=0)
+    cache.checkout(corel, template).Close()
+
+    doc = corel.OpenDocument(str(template))
+    doc.AddPages(1)
+    doc.Save()
+    doc.Close()
+
+    changed = cache.checkout(corel, template)
+    assert cache.misses == 2
+    assert changed.Pages.Count == 3
+    changed.Close()
+    cache.clear()
+
+def test_clone_failure_opens_from_disk(corel, template, monkeypatch):
+    cache = TemplateCache(load_wait=0)
+
+    def broken():
+        raise RuntimeError("CreateDocument falhou")
+
+    monkeypatch.setattr(corel, "CreateDocument", broken)
+    doc = cache.checkout(corel, template)
+    assert doc.FileName == str(template)
+    assert doc_summary(doc) == EXPECTED
+    assert len(cache) == 0
+    doc.Close()
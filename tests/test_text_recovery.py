@@ -0,0 +1,67 @@
+# test_text_recovery.py
+# -*- coding: utf-8 -*-
+"""
+Fuzz da recuperação de relatórios em linha única (recover_report_lines)
+
+Usa o mesmo corpus do benchmark_text_recovery.py: cardápios aleatórios
+achatados em uma linha precisam voltar exatamente ao texto multi-linha
+original. A linearidade nas entradas adversárias (tempo por caractere) é
+medida no benchmark, fora da suíte, para não depender da carga da máquina.
+"""
+
+import random
+
+import pytest
+
+import build_cardapio_dinamico as builder
+from benchmark_text_recovery import adversarial_inputs, flatten, legacy_recover, random_menu
+
+CASES = 1000
+
+def test_fuzz_recovers_original_lines():
+    rng = random.Random(1234)
+    for n in range(CASES):
+        text = random_menu(rng, big_prices=n % 4 == 0)
+        flat = flatten(text, rng)
+        recovered = builder.recover_report_lines(flat)
+        assert recovered == text.rstrip("\n"), flat
+        assert builder.parse_text(recovered) == builder.parse_text(text)
+
+def test_fuzz_matches_legacy_regex():
+    # As regex antigas não entendem milhar ("R$ 1.234,56"): só preços pequenos
+    rng = random.Random(4321)
+    for _ in range(CASES // 4):
+        flat = flatten(random_menu(rng), rng)
+        assert builder.parse_text(builder.recover_report_lines(flat)) == \
+            builder.parse_text(legacy_recover(flat))
+
+@pytest.mark.parametrize("flat, expected", [
+    # Categoria depois de preço com 2+ espaços: linha em branco antes
+    (
+        "RELATÓRIO DE PREÇOS Bar  *Cervejas* Brahma - R$ 11,00  *Lanches* X-Tudo - R$ 3,00",
+        "RELATÓRIO DE PREÇOS Bar\n\n*Cervejas*\nBrahma - R$ 11,00\n\n*Lanches*\nX-Tudo - R$ 3,00",
+    ),
+    # Com um espaço só, apenas quebra de linha
+    (
+        "RELATÓRIO DE PREÇOS Bar *Cervejas* Brahma - R$ 11,00 *Lanches* X-Tudo - R$ 3,00",
+        "RELATÓRIO DE PREÇOS Bar\n\n*Cervejas*\nBrahma - R$ 11,00\n*Lanches*\nX-Tudo - R$ 3,00",
+    ),
+    # Categoria vazia seguida de outra com 2+ espaços
+    (
+        "RELATÓRIO DE PREÇOS Bar  *Vazia*   *Porções* Isca - R$ 1.234,56",
+        "RELATÓRIO DE PREÇOS Bar\n\n*Vazia*\n\n*Porções*\nIsca - R$ 1.234,56",
+    ),
+    # "R$" sem centavos e '*' solto ficam no texto do item
+    (
+        "RELATÓRIO DE PREÇOS Bar  *A* Dose R$ 5 * Gelo - R$ 2,00",
+        "RELATÓRIO DE PREÇOS Bar\n\n*A*\nDose R$ 5 * Gelo - R$ 2,00",
+    ),
+])
+def test_recover_edge_cases(flat, expected):
+    assert builder.recover_report_lines(flat) == expected
+
+@pytest.mark.parametrize("label", list(adversarial_inputs(10)))
+def test_adversarial_inputs_keep_every_word(label):
+    # Só quebras de linha entram ou saem: nenhuma palavra perdida ou colada
+    text = adversarial_inputs(32000)[label]
+    assert builder.recover_report_lines(text).split() == text.split()